@@ -30,6 +30,8 @@ else:
 
 
     import json
+    import logging
+    import os
 
     import bpy
     from bpy.props import *
@@ -41,6 +43,16 @@ else:
 
     from . import blendergltf
 
+    class ReportHandler(logging.Handler):
+        """Passes log records on to an operator's report()."""
+        def __init__(self, operator):
+            super().__init__(logging.WARNING)
+            self.operator = operator
+
+        def emit(self, record):
+            self.operator.report({'WARNING'}, self.format(record))
+
+
     GLTFOrientationHelper = orientation_helper_factory(
         "GLTFOrientationHelper", axis_forward='-Z', axis_up='Y'
     )
@@ -49,6 +61,18 @@ else:
         ('WEB', 'Web', 'Export shaders for WebGL 1.0 use (shader version 100)'),
         ('DESKTOP', 'Desktop', 'Export shaders for OpenGL 3.0 use (shader version 130)')
     )
+    normal_type_items = (
+        ('SHORT', '16-bit', 'Store normals as shorts'),
+        ('BYTE', '8-bit', 'Store normals as bytes'),
+    )
+    resize_filter_items = (
+        ('LANCZOS', 'Lanczos', 'Sharp resampling with a Lanczos filter'),
+        ('BOX', 'Box', 'Average the pixels each new pixel covers'),
+    )
+    format_items = (
+        ('ASCII', 'glTF', 'Export a JSON .gltf file'),
+        ('BINARY', 'Binary glTF', 'Export a binary .glb file (KHR_binary_glTF)')
+    )
     class ExportGLTF(bpy.types.Operator, ExportHelper, GLTFOrientationHelper):
         """Save a Khronos glTF File"""
 
@@ -57,17 +81,117 @@ else:
 
         filename_ext = ".gltf"
         filter_glob = StringProperty(
-                default="*.gltf",
+                default="*.gltf;*.glb",
                 options={'HIDDEN'},
                 )
 
         check_extension = True
 
+        export_format = EnumProperty(items=format_items, name='Format', default='ASCII')
+
         #blendergltf settings
         materials_export_shader = BoolProperty(name='Export Shaders', default=False)
         meshes_apply_modifiers = BoolProperty(name='Apply Modifiers', default=True)
+        meshes_weld_normal_epsilon = FloatProperty(
+            name='Normal Weld Epsilon',
+            description='Merge vertices whose normals differ by less than this (0 only merges exact matches)',
+            default=0.0,
+            min=0.0,
+            )
+        meshes_worker_processes = IntProperty(
+            name='Mesh Export Processes',
+            description='Process meshes in this many worker processes (0 or 1 exports serially). '
+                        'Needs fork, so meshes are always exported serially on Windows',
+            default=0,
+            min=0,
+            )
+        meshes_quantize_attributes = BoolProperty(
+            name='Quantize Attributes',
+            description='Store normals, UVs and skin weights as integers (WEB3D_quantized_attributes)',
+            default=False,
+            )
+        meshes_quantize_normals = EnumProperty(
+            items=normal_type_items,
+            name='Quantized Normals',
+            default='SHORT',
+            )
+        meshes_split_primitives = BoolProperty(
+            name='Split Large Primitives',
+            description='Split primitives with more than 65536 vertices, instead of using 32-bit indices (OES_element_index_uint)',
+            default=True,
+            )
+        meshes_rebase_indices = BoolProperty(
+            name='Rebase Indices',
+            description='Give every primitive attributes covering only the vertices it uses, so its indices start at 0',
+            default=False,
+            )
+        meshes_optimize_vertex_cache = BoolProperty(
+            name='Optimize Vertex Cache',
+            description='Reorder triangles and vertices so GPUs reuse more transformed vertices',
+            default=False,
+            )
+        actions_sparse = BoolProperty(
+            name='Sparse Actions',
+            description='Export only the keyframes needed to reproduce actions, instead of every frame',
+            default=False,
+            )
+        actions_sparse_tolerance = FloatProperty(
+            name='Sparse Action Tolerance',
+            description='Largest error allowed when leaving out keyframes (in units, or radians for rotations)',
+            default=0.001,
+            min=0.0,
+            )
         images_embed_data = BoolProperty(name='Embed Image Data', default=False)
+        images_resize = BoolProperty(
+            name='Limit Texture Size',
+            description='Resize images to fit the texture size budget of the profile',
+            default=False,
+            )
+        images_max_size = IntProperty(
+            name='Max Texture Size',
+            description='Largest width or height of exported images (0 uses the profile\'s budget)',
+            default=0,
+            min=0,
+            )
+        images_resize_filter = EnumProperty(
+            items=resize_filter_items,
+            name='Resize Filter',
+            default='LANCZOS',
+            )
+        images_worker_threads = IntProperty(
+            name='Image Encoding Threads',
+            description='Encode embedded images in this many threads (0 or 1 encodes them one at a time)',
+            default=4,
+            min=0,
+            )
+        buffers_embed_data = BoolProperty(
+            name='Embed Buffer Data',
+            description='Embed buffers as base64 data URIs instead of writing .bin files',
+            default=True,
+            )
+        buffers_combine_data = BoolProperty(
+            name='Combine Buffers',
+            description='Pack all geometry and animation data into a single buffer',
+            default=False,
+            )
         asset_profile = EnumProperty(items=profile_items, name='Profile', default='WEB')
+        cache_dir = StringProperty(
+            name='Cache Directory',
+            description='Reuse unchanged meshes, actions, images and shaders from earlier exports stored here (empty disables the cache)',
+            default='',
+            subtype='DIR_PATH',
+            )
+        cache_max_mb = IntProperty(
+            name='Cache Size (MB)',
+            description='Delete the least recently used cache entries beyond this size',
+            default=512,
+            min=1,
+            )
+        profile = BoolProperty(
+            name='Write Profiling Report',
+            description='Time each export stage and write a .profile.json report next to the file',
+            default=False,
+            )
 
         pretty_print = BoolProperty(
             name="Pretty-print / indent JSON",
@@ -75,6 +199,17 @@ else:
             default=True
             )
 
+        def _update_filename_ext(self):
+            self.filename_ext = '.glb' if self.export_format == 'BINARY' else '.gltf'
+
+        def invoke(self, context, event):
+            self._update_filename_ext()
+            return ExportHelper.invoke(self, context, event)
+
+        def check(self, context):
+            self._update_filename_ext()
+            return ExportHelper.check(self, context)
+
         def execute(self, context):
             scene = {
                 'actions': list(bpy.data.actions),
@@ -98,26 +233,52 @@ else:
                 to_up=self.axis_up
             ).to_4x4()
 
-            gltf = blendergltf.export_gltf(scene, settings)
-            with open(self.filepath, 'w') as fout:
-                # Figure out indentation
-                if self.pretty_print:
-                    indent = 4
-                else:
-                    indent = None
-
-                # Dump the JSON
-                json.dump(gltf, fout, indent=indent, sort_keys=True,
-                          check_circular=False)
-
-                if self.pretty_print:
-                    # Write a newline to the end of the file
-                    fout.write('\n')
+            # External files (e.g. .bin buffers) are written next to the glTF
+            settings['gltf_output_dir'] = os.path.dirname(self.filepath)
+
+            if self.cache_dir:
+                settings['cache_dir'] = bpy.path.abspath(self.cache_dir)
+
+            # Show the warnings of the exporter's modules in Blender's info
+            # header
+            handler = ReportHandler(self)
+            logger = logging.getLogger(__name__)
+            logger.addHandler(handler)
+            try:
+                self.write(scene, settings)
+            finally:
+                logger.removeHandler(handler)
             return {'FINISHED'}
 
+        def write(self, scene, settings):
+            if self.export_format == 'BINARY':
+                with open(self.filepath, 'wb') as fout:
+                    blendergltf.export_glb(scene, settings, fout)
+            else:
+                with open(self.filepath, 'w') as fout:
+                    # Figure out indentation
+                    if self.pretty_print:
+                        indent = 4
+                    else:
+                        indent = None
+
+                    # Stream the JSON
+                    blendergltf.write_gltf(scene, settings, fout, indent=indent)
+
+                    if self.pretty_print:
+                        # Write a newline to the end of the file
+                        fout.write('\n')
+
+            if self.profile:
+                report_path = os.path.splitext(self.filepath)[0] + '.profile.json'
+                with open(report_path, 'w') as fout:
+                    json.dump(settings['profile_stats'], fout, indent=4, sort_keys=True)
+
 
     def menu_func_export(self, context):
         self.layout.operator(ExportGLTF.bl_idname, text="glTF (.gltf)")
+        op = self.layout.operator(ExportGLTF.bl_idname, text="glTF Binary (.glb)")
+        op.export_format = 'BINARY'
 
 
     def register():
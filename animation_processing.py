@@ -0,0 +1,235 @@
+"""Keyframe reduction for sampled animation channels.
+
+Like mesh_processing, nothing in here touches bpy. Channels are sequences
+of samples, each sample a tuple of components (a location, a scale or a
+w, x, y, z quaternion). NumPy is used when it is available, otherwise the
+functions fall back to plain Python.
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def make_quaternions_continuous(quats):
+    """Flip the sign of quaternions where needed so that every quaternion
+    is in the same hemisphere as the one before it.
+
+    q and -q are the same rotation, but interpolating between neighbours
+    of opposite sign takes the long way around.
+    """
+    if np is not None:
+        quats = np.array(quats, dtype=np.float64).reshape(-1, 4)
+        if len(quats) > 1:
+            dots = np.einsum('ij,ij->i', quats[1:], quats[:-1])
+            flips = np.concatenate(([False], np.logical_xor.accumulate(dots < 0)))
+            quats[flips] *= -1
+        return quats
+
+    result = []
+    for quat in quats:
+        if result and sum(a * b for a, b in zip(quat, result[-1])) < 0:
+            quat = tuple(-c for c in quat)
+        result.append(tuple(quat))
+    return result
+
+
+def _matrices_to_quaternions(rot):
+    """Convert an (N, 3, 3) array of rotation matrices to w, x, y, z
+    quaternions, choosing per matrix the most stable of the four ways."""
+    m00, m11, m22 = rot[:, 0, 0], rot[:, 1, 1], rot[:, 2, 2]
+    trace = m00 + m11 + m22
+    quats = np.empty((len(rot), 4))
+
+    cases = [trace > 0]
+    cases.append(~cases[0] & (m00 > m11) & (m00 > m22))
+    cases.append(~cases[0] & ~cases[1] & (m11 > m22))
+    cases.append(~cases[0] & ~cases[1] & ~cases[2])
+
+    m = rot[cases[0]]
+    s = 0.5 / np.sqrt(m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2] + 1.0)
+    quats[cases[0]] = np.stack((
+        0.25 / s,
+        (m[:, 2, 1] - m[:, 1, 2]) * s,
+        (m[:, 0, 2] - m[:, 2, 0]) * s,
+        (m[:, 1, 0] - m[:, 0, 1]) * s,
+    ), axis=1)
+
+    m = rot[cases[1]]
+    s = 2.0 * np.sqrt(1.0 + m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2])
+    quats[cases[1]] = np.stack((
+        (m[:, 2, 1] - m[:, 1, 2]) / s,
+        0.25 * s,
+        (m[:, 0, 1] + m[:, 1, 0]) / s,
+        (m[:, 0, 2] + m[:, 2, 0]) / s,
+    ), axis=1)
+
+    m = rot[cases[2]]
+    s = 2.0 * np.sqrt(1.0 + m[:, 1, 1] - m[:, 0, 0] - m[:, 2, 2])
+    quats[cases[2]] = np.stack((
+        (m[:, 0, 2] - m[:, 2, 0]) / s,
+        (m[:, 0, 1] + m[:, 1, 0]) / s,
+        0.25 * s,
+        (m[:, 1, 2] + m[:, 2, 1]) / s,
+    ), axis=1)
+
+    m = rot[cases[3]]
+    s = 2.0 * np.sqrt(1.0 + m[:, 2, 2] - m[:, 0, 0] - m[:, 1, 1])
+    quats[cases[3]] = np.stack((
+        (m[:, 1, 0] - m[:, 0, 1]) / s,
+        (m[:, 0, 2] + m[:, 2, 0]) / s,
+        (m[:, 1, 2] + m[:, 2, 1]) / s,
+        0.25 * s,
+    ), axis=1)
+
+    quats[quats[:, 0] < 0] *= -1
+    return quats
+
+
+def decompose_matrices(matrices):
+    """Split affine matrices into translations, rotations and scales.
+
+    matrices is anything that converts to an (N, 4, 4) array of row major
+    matrices. Returns (N, 3) translations, (N, 4) w, x, y, z rotations and
+    (N, 3) scales, matching mathutils.Matrix.decompose() for each matrix:
+    matrices that mirror get all three scales negated. The rotations are
+    made continuous with make_quaternions_continuous.
+
+    Requires NumPy.
+    """
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    locs = matrices[:, :3, 3].copy()
+    basis = matrices[:, :3, :3]
+
+    scales = np.linalg.norm(basis, axis=1)
+    scales[np.linalg.det(basis) < 0] *= -1
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rot = np.where(scales[:, None, :] != 0, basis / scales[:, None, :], 0.0)
+
+    rots = make_quaternions_continuous(_matrices_to_quaternions(rot))
+    return locs, rots, scales
+
+
+def _rotation_errors_numpy(start, end, t, samples):
+    dot = np.clip(np.dot(start, end), -1.0, 1.0)
+    theta = math.acos(dot)
+    if theta < 1e-6:
+        interp = start + np.outer(t, end - start)
+    else:
+        interp = (np.outer(np.sin((1 - t) * theta), start) + np.outer(np.sin(t * theta), end)) / math.sin(theta)
+    interp /= np.linalg.norm(interp, axis=1)[:, None]
+    return _rotation_angles_numpy(interp, samples)
+
+
+def _rotation_angles_numpy(a, b):
+    # See _rotation_error
+    w = np.abs(np.einsum('ij,ij->i', a, b))
+    vec = a[:, :1] * b[:, 1:] - b[:, :1] * a[:, 1:] - np.cross(a[:, 1:], b[:, 1:])
+    return 2 * np.arctan2(np.linalg.norm(vec, axis=1), w)
+
+
+def _segment_errors_numpy(times, values, first, last, slerp):
+    t = (times[first + 1:last] - times[first]) / (times[last] - times[first])
+    samples = values[first + 1:last]
+    if slerp:
+        return _rotation_errors_numpy(values[first], values[last], t, samples)
+    interp = values[first] + np.outer(t, values[last] - values[first])
+    return np.abs(interp - samples).max(axis=1)
+
+
+def _rotation_error(a, b):
+    # The angle of the rotation conj(a) * b. Taking it from the atan2 of
+    # its vector and scalar parts keeps small angles accurate, which the
+    # acos of the dot product does not: float32 rounding alone would make it
+    # around 4e-4.
+    aw, ax, ay, az = a
+    bw, bx, by, bz = b
+    w = aw * bw + ax * bx + ay * by + az * bz
+    x = aw * bx - bw * ax - (ay * bz - az * by)
+    y = aw * by - bw * ay - (az * bx - ax * bz)
+    z = aw * bz - bw * az - (ax * by - ay * bx)
+    return 2 * math.atan2(math.sqrt(x * x + y * y + z * z), abs(w))
+
+
+def _slerp(start, end, t):
+    dot = max(-1.0, min(1.0, sum(a * b for a, b in zip(start, end))))
+    theta = math.acos(dot)
+    if theta < 1e-6:
+        quat = [a + (b - a) * t for a, b in zip(start, end)]
+    else:
+        wa = math.sin((1 - t) * theta) / math.sin(theta)
+        wb = math.sin(t * theta) / math.sin(theta)
+        quat = [a * wa + b * wb for a, b in zip(start, end)]
+    length = math.sqrt(sum(c * c for c in quat))
+    return [c / length for c in quat]
+
+
+def _segment_errors(times, values, first, last, slerp):
+    errors = []
+    span = times[last] - times[first]
+    start = values[first]
+    end = values[last]
+    for i in range(first + 1, last):
+        t = (times[i] - times[first]) / span
+        if slerp:
+            errors.append(_rotation_error(_slerp(start, end, t), values[i]))
+        else:
+            errors.append(max(abs(a + (b - a) * t - v) for a, b, v in zip(start, end, values[i])))
+    return errors
+
+
+def channel_error(a, b, slerp=False):
+    """Return the difference between two samples: the largest component
+    difference, or the angle between two rotations if slerp is set."""
+    if slerp:
+        return _rotation_error(a, b)
+    return max(abs(x - y) for x, y in zip(a, b))
+
+
+def reduce_keyframes(times, values, tolerance, slerp=False):
+    """Pick the samples needed to reproduce a channel within tolerance.
+
+    Interpolating linearly (or with slerp for quaternions, which should be
+    made continuous first) between the picked samples stays within
+    tolerance of every sample, measured as in channel_error. Samples are
+    picked by recursively splitting at the worst error, as in the
+    Ramer-Douglas-Peucker algorithm.
+
+    Returns the sorted indices of the picked samples. A channel that does
+    not change by more than tolerance is reduced to its first sample.
+    """
+    count = len(values)
+    if count == 0:
+        return []
+
+    if np is not None:
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64).reshape(count, -1)
+        segment_errors = _segment_errors_numpy
+    else:
+        values = [tuple(value) for value in values]
+        segment_errors = _segment_errors
+
+    keep = {0, count - 1}
+    segments = [(0, count - 1)]
+    while segments:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+
+        errors = segment_errors(times, values, first, last, slerp)
+        worst = max(range(len(errors)), key=errors.__getitem__)
+        if errors[worst] > tolerance:
+            split = first + 1 + worst
+            keep.add(split)
+            segments.append((first, split))
+            segments.append((split, last))
+
+    keep = sorted(keep)
+    if len(keep) == 2 and channel_error(values[0], values[-1], slerp) <= tolerance:
+        keep = [0]
+    return keep
@@ -0,0 +1,33 @@
+"""Import the exporter against the stand-in modules in stubs/.
+
+The repository is the add-on package itself, so it is imported under the
+name in PACKAGE for the relative imports in blendergltf.py to work. Set
+BLENDERGLTF_ROOT to benchmark another checkout, and NO_NUMPY to measure
+the pure Python code paths.
+"""
+
+import importlib
+import os
+import sys
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.environ.get('BLENDERGLTF_ROOT', os.path.dirname(HERE))
+PACKAGE = 'blendergltf_bench'
+
+sys.path.insert(0, os.path.join(HERE, 'stubs'))
+sys.path.insert(0, HERE)
+
+if os.environ.get('NO_NUMPY'):
+    sys.modules['numpy'] = None
+
+
+def load():
+    """Return the blendergltf module, importing it on first use."""
+    if PACKAGE + '.blendergltf' in sys.modules:
+        return sys.modules[PACKAGE + '.blendergltf']
+
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [ROOT]
+    sys.modules[PACKAGE] = package
+    return importlib.import_module(PACKAGE + '.blendergltf')
@@ -0,0 +1,270 @@
+"""Time the exporter on synthetic scenes.
+
+Usage:
+
+    python benchmarks/run.py [--scales small,medium] [--repeat 3]
+                             [--output results.json] [--compare baseline.json]
+
+Every benchmark builds its scene once per scale, runs the exported function
+--repeat times and keeps the fastest run. Besides the time, each benchmark
+reports throughput in the unit that matters for it (loops/sec for meshes,
+frames/sec for actions, Mpixels/sec for images, MB/sec for buffer and
+document output), so runs on different scales and machines can be compared.
+--output saves the results as JSON and --compare prints the speedup against
+a previous --output file.
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import harness
+
+blendergltf = harness.load()
+
+import bpy
+import mathutils
+
+import synthetic
+
+
+SCALES = {
+    'small': dict(num_objects=4, grid_size=16, num_bones=8, num_frames=50, buffer_mb=1, image_size=128),
+    'medium': dict(num_objects=8, grid_size=48, num_bones=32, num_frames=100, buffer_mb=8, image_size=512),
+    'large': dict(num_objects=16, grid_size=96, num_bones=64, num_frames=250, buffer_mb=32, image_size=1024),
+}
+
+MB = 1024 * 1024
+
+
+def _settings(**overrides):
+    settings = dict(blendergltf.default_settings)
+    settings['global_matrix'] = mathutils.Matrix.Rotation(-1.5707963267948966, 4, 'X')
+    settings.update(overrides)
+    return settings
+
+
+def _best_of(repeat, setup, func):
+    """Return the fastest of repeat runs of func(setup()) and its result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _buffer_bytes():
+    return sum(buf.bytelength for buf in blendergltf.g_buffers)
+
+
+def bench_export_meshes(scale, repeat):
+    synthetic.build_scene(num_objects=scale['num_objects'], grid_size=scale['grid_size'],
+                          uv_layers=2, materials=3)
+    meshes = list(bpy.data.meshes)
+    mesh_names = {mesh.name: mesh.name for mesh in meshes}
+    loops = sum(len(mesh.loops) for mesh in meshes)
+
+    def setup():
+        blendergltf.g_buffers = []
+        return _settings(), meshes, {}, mesh_names
+
+    elapsed, _ = _best_of(repeat, setup, blendergltf.export_meshes)
+    output = _buffer_bytes()
+    blendergltf.g_buffers = []
+    return elapsed, {'loops': loops, 'loops/sec': loops / elapsed, 'MB/sec': output / MB / elapsed}
+
+
+def bench_export_skins(scale, repeat):
+    synthetic.build_scene(num_objects=scale['num_objects'], grid_size=4,
+                          num_bones=scale['num_bones'])
+    skinned_meshes = {obj.data.name: obj for obj in bpy.data.objects if obj.type == 'MESH'}
+    joints = sum(len(obj.vertex_groups) for obj in skinned_meshes.values())
+
+    def setup():
+        blendergltf.g_buffers = []
+        return skinned_meshes,
+
+    elapsed, _ = _best_of(repeat, setup, blendergltf.export_skins)
+    blendergltf.g_buffers = []
+    return elapsed, {'joints': joints, 'joints/sec': joints / elapsed}
+
+
+def bench_export_actions(scale, repeat, **settings):
+    synthetic.build_scene(num_objects=1, grid_size=2, num_bones=scale['num_bones'],
+                          num_frames=scale['num_frames'])
+    objects = list(bpy.data.objects)
+    actions = list(bpy.data.actions)
+    frames = scale['num_frames'] * len(actions)
+    channels = frames * (scale['num_bones'] + 1)
+
+    def setup():
+        blendergltf.g_buffers = []
+        return _settings(**settings), objects, actions
+
+    elapsed, _ = _best_of(repeat, setup, blendergltf.export_actions)
+    output = _buffer_bytes()
+    blendergltf.g_buffers = []
+    return elapsed, {
+        'frames': frames,
+        'frames/sec': frames / elapsed,
+        'channel frames/sec': channels / elapsed,
+        'MB': output / MB,
+    }
+
+
+def bench_export_actions_sparse(scale, repeat):
+    return bench_export_actions(scale, repeat, actions_sparse=True)
+
+
+def bench_export_images(scale, repeat):
+    synthetic.build_scene(num_objects=1, grid_size=2, image_size=scale['image_size'])
+    images = list(bpy.data.images)
+    pixels = sum(image.size[0] * image.size[1] for image in images)
+
+    def setup():
+        return _settings(images_embed_data=True), images
+
+    elapsed, _ = _best_of(repeat, setup, blendergltf.export_images)
+    return elapsed, {'pixels': pixels, 'Mpixels/sec': pixels / 1e6 / elapsed}
+
+
+def _make_buffer(size):
+    buf = blendergltf.Buffer('bench')
+    view = buf.add_view(size, None)
+    buf.buffer_views[view]['data'][:] = os.urandom(size)
+    return buf
+
+
+def bench_export_buffer_embedded(scale, repeat):
+    size = scale['buffer_mb'] * MB
+    buf = _make_buffer(size)
+    settings = _settings(buffers_embed_data=True)
+
+    elapsed, _ = _best_of(repeat, lambda: (settings,), buf.export_buffer)
+    return elapsed, {'MB': size / MB, 'MB/sec': size / MB / elapsed}
+
+
+def bench_export_buffer_file(scale, repeat):
+    size = scale['buffer_mb'] * MB
+    buf = _make_buffer(size)
+    with tempfile.TemporaryDirectory() as output_dir:
+        settings = _settings(buffers_embed_data=False, gltf_output_dir=output_dir)
+        elapsed, _ = _best_of(repeat, lambda: (settings,), buf.export_buffer)
+    return elapsed, {'MB': size / MB, 'MB/sec': size / MB / elapsed}
+
+
+def _scene_kwargs(scale):
+    return dict(num_objects=scale['num_objects'], grid_size=scale['grid_size'], uv_layers=1,
+                materials=2, num_bones=scale['num_bones'] // 4, num_frames=scale['num_frames'] // 2)
+
+
+def bench_export_gltf(scale, repeat):
+    scene_delta = synthetic.build_scene(**_scene_kwargs(scale))
+    loops = sum(len(mesh.loops) for mesh in bpy.data.meshes)
+
+    def export(settings):
+        return json.dumps(blendergltf.export_gltf(scene_delta, settings), sort_keys=True)
+
+    elapsed, document = _best_of(repeat, lambda: (_settings(),), export)
+    return elapsed, {
+        'loops/sec': loops / elapsed,
+        'MB': len(document) / MB,
+        'MB/sec': len(document) / MB / elapsed,
+    }
+
+
+def bench_write_gltf(scale, repeat):
+    scene_delta = synthetic.build_scene(**_scene_kwargs(scale))
+    loops = sum(len(mesh.loops) for mesh in bpy.data.meshes)
+
+    def export(settings):
+        output = io.StringIO()
+        blendergltf.write_gltf(scene_delta, settings, output)
+        return output.tell()
+
+    elapsed, size = _best_of(repeat, lambda: (_settings(),), export)
+    return elapsed, {'loops/sec': loops / elapsed, 'MB': size / MB, 'MB/sec': size / MB / elapsed}
+
+
+def bench_export_glb(scale, repeat):
+    scene_delta = synthetic.build_scene(**_scene_kwargs(scale))
+    loops = sum(len(mesh.loops) for mesh in bpy.data.meshes)
+
+    def export(settings):
+        output = io.BytesIO()
+        blendergltf.export_glb(scene_delta, settings, output)
+        return output.tell()
+
+    elapsed, size = _best_of(repeat, lambda: (_settings(),), export)
+    return elapsed, {'loops/sec': loops / elapsed, 'MB': size / MB, 'MB/sec': size / MB / elapsed}
+
+
+BENCHMARKS = [
+    ('export_meshes', bench_export_meshes),
+    ('export_skins', bench_export_skins),
+    ('export_actions', bench_export_actions),
+    ('export_actions (sparse)', bench_export_actions_sparse),
+    ('export_images (embedded)', bench_export_images),
+    ('Buffer.export_buffer (embedded)', bench_export_buffer_embedded),
+    ('Buffer.export_buffer (.bin)', bench_export_buffer_file),
+    ('export_gltf', bench_export_gltf),
+    ('write_gltf', bench_write_gltf),
+    ('export_glb', bench_export_glb),
+]
+
+
+def _format_metrics(metrics):
+    return ', '.join('{} {:.4g}'.format(key, value) for key, value in metrics.items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='small,medium',
+                        help='comma separated scales to run ({})'.format(', '.join(SCALES)))
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark, the fastest is kept')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='print speedups against a previous --output file')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as fin:
+            baseline = json.load(fin)['results']
+
+    results = {}
+    for scale_name in args.scales.split(','):
+        scale = SCALES[scale_name]
+        for name, bench in BENCHMARKS:
+            if args.filter not in name:
+                continue
+
+            key = '{} [{}]'.format(name, scale_name)
+            elapsed, metrics = bench(scale, args.repeat)
+            results[key] = dict(metrics, time=elapsed)
+
+            line = '{:<42} {:>9.4f}s  {}'.format(key, elapsed, _format_metrics(metrics))
+            if key in baseline:
+                line += '  ({:.2f}x)'.format(baseline[key]['time'] / elapsed)
+            print(line)
+            sys.stdout.flush()
+
+    if args.output:
+        with open(args.output, 'w') as fout:
+            json.dump({
+                'numpy': blendergltf.np is not None,
+                'python': sys.version.split()[0],
+                'results': results,
+            }, fout, indent=4, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+"""Check and time shader_converter against the regex converter it replaced.
+
+Usage:
+
+    python benchmarks/shaders.py [--size 131072] [--repeat 5] [captured ...]
+
+Every shader in the corpus is converted for both asset profiles by
+shader_converter and by legacy_shader_converter, and the results have to be
+identical. captured are JSON files holding what gpu.export_shader returned
+for a material, or directories of them, for example saved from Blender's
+Python console with
+
+    json.dump(gpu.export_shader(scene, material), open(path, 'w'))
+
+Without any, a synthetic corpus resembling the shaders Blender 2.7x
+generates is used: the gpu stand-in's shader and shaders of about --size
+bytes with Unix, Windows and doubled carriage return line endings.
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+
+import harness
+
+blendergltf = harness.load()
+
+import gpu
+
+import legacy_shader_converter
+
+shader_converter = sys.modules[harness.PACKAGE + '.shader_converter']
+
+
+VERTEX_SOURCE = """\
+#ifdef USE_OPENSUBDIV
+in block {
+	VertexData v;
+} inpt;
+#endif
+
+varying vec3 varposition;
+varying vec3 varnormal;
+
+#ifdef CLIP_WORKAROUND
+varying float gl_ClipDistance[6];
+#endif
+
+float srgb_to_linearrgb(float c)
+{
+	if (c < 0.04045)
+		return (c < 0.0) ? 0.0 : c * (1.0 / 12.92);
+	else
+		return pow((c + 0.055) * (1.0 / 1.055), 2.4);
+}
+
+{attributes}
+void main()
+{
+#ifndef USE_OPENSUBDIV
+	vec4 position = gl_Vertex;
+	vec3 normal = gl_Normal;
+#endif
+
+	vec4 co = gl_ModelViewMatrix * position;
+
+	varposition = co.xyz;
+	varnormal = normalize(gl_NormalMatrix * normal);
+	gl_Position = gl_ProjectionMatrix * co;
+
+#ifdef CLIP_WORKAROUND
+	int i;
+	for (i = 0; i < 6; i++)
+		gl_ClipDistance[i] = dot(co, gl_ClipPlane[i]);
+#elif !defined(GPU_ATI)
+	// Setting gl_ClipVertex is necessary to get glClipPlane working on NVIDIA
+	// graphic cards, while on ATI it can cause a software fallback.
+	gl_ClipVertex = co;
+#endif
+
+{assignments}
+}
+"""
+
+# Functions of the kinds found in Blender's material GLSL library, with
+# {n} replaced to make each copy unique
+LIBRARY_FUNCTIONS = [
+    """\
+void math_add_{n}(float val1, float val2, out float outval)
+{
+	outval = val1 + val2;
+}
+""",
+    """\
+void mtex_rgb_blend_{n}(vec3 outcol, vec3 texcol, float fact, float facg, out vec3 incol)
+{
+	float facm;
+
+	fact *= facg;
+	facm = 1.0 - fact;
+
+	incol = fact * texcol + facm * outcol;
+}
+""",
+    """\
+void shade_view_{n}(vec3 co, out vec3 view)
+{
+	/* handle perspective/orthographic */
+	view = (gl_ProjectionMatrix[3][3] == 0.0) ? normalize(co) : vec3(0.0, 0.0, -1.0);
+}
+""",
+    """\
+void node_tex_gradient_{n}(vec3 vec, out vec4 color, out float fac)
+{
+	float blend = (normalize(vec).z + 1) / 2.0;
+	fac = clamp(blend, 0.0, 1.0);
+	color = vec4(fac, fac, fac, 1.0);
+}
+""",
+    """\
+void test_shadowbuf_{n}(vec3 rco, sampler2DShadow shadowmap, mat4 shadowpersmat, float shadowbias, float inp, out float result)
+{
+	if (inp <= 0.0) {
+		result = 0.0;
+	}
+	else {
+		vec4 co = shadowpersmat * vec4(rco, 1.0);
+
+		co.z -= shadowbias * co.w;
+
+		if (co.w > 0.0 && co.x > 0.0 && co.x / co.w < 1.0 && co.y > 0.0 && co.y / co.w < 1.0)
+			result = shadow2DProj(shadowmap, co).x;
+		else
+			result = 1.0;
+	}
+}
+""",
+    """\
+void node_bsdf_diffuse_{n}(vec4 color, float roughness, vec3 N, out vec4 result)
+{
+	/* ambient light */
+	vec3 L = vec3(0.2);
+
+	/* directional lights */
+	for (int i = 0; i < NUM_LIGHTS; i++) {
+		vec3 light_position = gl_LightSource[i].position.xyz;
+		vec3 light_diffuse = gl_LightSource[i].diffuse.rgb;
+
+		float bsdf = max(dot(N, light_position), 0.0);
+		L += light_diffuse * bsdf;
+	}
+
+	result = vec4(L * color.rgb, 1.0);
+}
+""",
+    """\
+void node_subsurface_scattering_{n}(vec4 color, float scale, vec3 radius, float sharpen, float texture_blur, vec3 N, out vec4 result)
+{
+	node_bsdf_diffuse(color, 0.0, N, result);
+}
+""",
+    """\
+void node_geometry_{n}(vec3 I, vec3 N, mat4 toworld, out vec3 position, out vec3 normal, out float backfacing)
+{
+	position = (toworld * vec4(I, 1.0)).xyz;
+	normal = (toworld * vec4(N, 0.0)).xyz;
+	backfacing = (gl_FrontFacing) ? 0.0 : 1.0;
+}
+""",
+    """\
+void set_rgb_{n}(in vec3 col, out vec3 outcol)
+{
+	outcol = col;
+	gl_FragColor = vec4(outcol, 1.0);
+}
+""",
+]
+
+FRAGMENT_HEADER = """\
+#define M_PI 3.14159265358979323846
+#define NUM_LIGHTS 3
+
+varying vec3 varposition;
+varying vec3 varnormal;
+
+"""
+
+FRAGMENT_MAIN = """\
+void main()
+{
+	vec3 facingnormal = gl_FrontFacing ? varnormal : -varnormal;
+	vec4 tmp0 = unf0;
+{calls}
+	gl_FragColor = tmp{last};
+}
+"""
+
+
+def make_shader(size, line_ending='\n', seed=0):
+    """Return shader data like gpu.export_shader returns, with a fragment
+    shader of about size bytes."""
+    rng = random.Random(seed)
+    attributes = ['attribute vec3 att{0};\nvarying vec3 var{0};\n'.format(i) for i in range(4)]
+    assignments = ['\tvar{0} = att{0};\n'.format(i) for i in range(4)]
+    vertex = VERTEX_SOURCE.replace('{attributes}', ''.join(attributes))
+    vertex = vertex.replace('{assignments}', ''.join(assignments))
+
+    parts = [FRAGMENT_HEADER]
+    parts.extend('varying vec3 var{};\n'.format(i) for i in range(4))
+    parts.extend('uniform vec4 unf{};\n'.format(i) for i in range(8))
+    parts.append('uniform sampler2DShadow samp0;\n\n')
+    calls = []
+    length = sum(map(len, parts))
+    while length < size:
+        function = rng.choice(LIBRARY_FUNCTIONS).replace('{n}', str(len(calls)))
+        parts.append(function + '\n')
+        calls.append('\tvec4 tmp{} = tmp{} * unf{};\n'.format(len(calls) + 1, len(calls), len(calls) % 8))
+        length += len(function) + len(calls[-1]) + 1
+    parts.append(FRAGMENT_MAIN.replace('{calls}', ''.join(calls)).replace('{last}', str(len(calls))))
+    fragment = ''.join(parts)
+
+    return {
+        'vertex': vertex.replace('\n', line_ending),
+        'fragment': fragment.replace('\n', line_ending),
+        'attributes': [],
+        'uniforms': [],
+    }
+
+
+def load_corpus(paths, size):
+    corpus = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(name for name in os.listdir(path) if name.endswith('.json'))
+            corpus.extend(load_corpus([os.path.join(path, name) for name in names], size))
+        else:
+            with open(path) as fin:
+                corpus.append((path, json.load(fin)))
+    if not paths:
+        corpus.append(('gpu stand-in', gpu.export_shader(None, None)))
+        for name, line_ending in (('LF', '\n'), ('CRLF', '\r\n'), ('CRCRLF', '\r\r\n')):
+            corpus.append(('synthetic ' + name, make_shader(size, line_ending)))
+    return corpus
+
+
+def _best_of(repeat, func, data):
+    best = None
+    for _ in range(repeat):
+        converted = copy.deepcopy(data)
+        start = time.perf_counter()
+        func(converted)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, converted
+
+
+def _first_difference(expected, actual):
+    for key in ('vertex', 'fragment', 'attributes'):
+        if expected[key] != actual[key]:
+            if key == 'attributes':
+                return key, 0
+            index = next((i for i, (a, b) in enumerate(zip(expected[key], actual[key])) if a != b),
+                         min(len(expected[key]), len(actual[key])))
+            return key, index
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('captured', nargs='*', help='JSON files or directories of captured shaders')
+    parser.add_argument('--size', type=int, default=128 * 1024,
+                        help='size of the synthetic fragment shaders in bytes')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per conversion, the fastest is kept')
+    args = parser.parse_args(argv)
+
+    mismatches = 0
+    for name, data in load_corpus(args.captured, args.size):
+        for profile in ('DESKTOP', 'WEB'):
+            function = 'to_130' if profile == 'DESKTOP' else 'to_web'
+            legacy_time, expected = _best_of(args.repeat, getattr(legacy_shader_converter, function), data)
+            new_time, actual = _best_of(args.repeat, getattr(shader_converter, function), data)
+
+            difference = _first_difference(expected, actual)
+            status = 'ok'
+            if difference:
+                mismatches += 1
+                key, index = difference
+                status = 'MISMATCH in {} at {}: {!r} != {!r}'.format(
+                    key, index, expected[key][index:index + 40], actual[key][index:index + 40])
+
+            print('{:<20} {:<8} {:>8} bytes  legacy {:8.3f}ms  new {:8.3f}ms  ({:.2f}x)  {}'.format(
+                name, profile, len(data['fragment']), legacy_time * 1000, new_time * 1000,
+                legacy_time / new_time, status))
+            sys.stdout.flush()
+
+    if mismatches:
+        sys.exit('{} conversions differ from the legacy converter'.format(mismatches))
+
+
+if __name__ == '__main__':
+    main()
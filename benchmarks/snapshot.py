@@ -0,0 +1,55 @@
+"""Export a fixed set of synthetic scenes to one JSON file.
+
+Usage:
+
+    python benchmarks/snapshot.py output.json ['{"setting": value, ...}']
+
+Optimizations are expected to leave the exported data unchanged. Taking a
+snapshot before and after a change and comparing the two files (for example
+with cmp) catches anything that does not. The optional second argument is
+a JSON object of export settings to use for every scene.
+"""
+
+import json
+import sys
+import time
+
+import harness
+
+blendergltf = harness.load()
+
+import mathutils
+
+import synthetic
+
+
+CASES = {
+    'basic': dict(num_objects=3, grid_size=6, uv_layers=2, materials=2),
+    'skinned': dict(num_objects=2, grid_size=5, uv_layers=1, materials=1, num_bones=6, num_frames=12),
+    'big': dict(num_objects=1, grid_size=140, uv_layers=1, materials=3),
+    'nomat': dict(num_objects=1, grid_size=4, uv_layers=0, materials=0),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        sys.exit(__doc__)
+    overrides = json.loads(argv[1]) if len(argv) > 1 else {}
+
+    snapshot = {}
+    for name, kwargs in CASES.items():
+        scene_delta = synthetic.build_scene(**kwargs)
+        settings = dict(overrides)
+        settings.setdefault('global_matrix', mathutils.Matrix.Rotation(-1.5707963267948966, 4, 'X'))
+
+        start = time.perf_counter()
+        snapshot[name] = blendergltf.export_gltf(scene_delta, settings)
+        print('{:<8} {:.3f}s'.format(name, time.perf_counter() - start), file=sys.stderr)
+
+    with open(argv[0], 'w') as fout:
+        json.dump(snapshot, fout, indent=1, sort_keys=True, default=str)
+
+
+if __name__ == '__main__':
+    main()
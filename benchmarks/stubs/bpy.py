@@ -0,0 +1,549 @@
+"""Minimal pure-Python stand-in for Blender's ``bpy`` module.
+
+The stand-in models just enough of the 2.7x data API (meshes, objects,
+armatures, actions and images) for blendergltf to run headless.  Datablocks
+are built by :mod:`synthetic`; nothing here touches a real Blender install.
+"""
+
+import math
+import types as _types
+
+import mathutils
+
+
+class Collection(list):
+    """List with the ``foreach_get`` and name lookup of bpy_prop_collection."""
+
+    def foreach_get(self, attr, seq):
+        flat = []
+        for item in self:
+            value = getattr(item, attr)
+            if isinstance(value, (int, float, bool)):
+                flat.append(value)
+            else:
+                flat.extend(value)
+        if len(flat) != len(seq):
+            raise RuntimeError('foreach_get: size mismatch ({} != {})'.format(len(flat), len(seq)))
+        seq[:] = flat
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            for item in self:
+                if item.name == key:
+                    return item
+            raise KeyError(key)
+        return list.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        if isinstance(key, str):
+            return any(item.name == key for item in self)
+        return list.__contains__(self, key)
+
+    def remove(self, item):
+        list.remove(self, item)
+
+
+class IDCollection(Collection):
+    """A bpy.data collection whose new() makes names unique like Blender."""
+
+    def __init__(self, factory=None):
+        Collection.__init__(self)
+        self._factory = factory
+
+    def unique_name(self, name):
+        names = {item.name for item in self}
+        unique = name
+        index = 1
+        while unique in names:
+            unique = '{}.{:03d}'.format(name, index)
+            index += 1
+        return unique
+
+    def new(self, name):
+        item = self._factory(self.unique_name(name))
+        self.append(item)
+        return item
+
+
+class ID:
+    def __init__(self, name):
+        self.name = name
+        self.users = 1
+
+
+class RNAProperty:
+    def __init__(self, identifier, type):
+        self.identifier = identifier
+        self.type = type
+
+
+class RNAStruct:
+    """Expose the plain attributes of an instance through bl_rna."""
+
+    @property
+    def bl_rna(self):
+        properties = [RNAProperty('rna_type', 'POINTER')]
+        for key, value in sorted(vars(self).items()):
+            if isinstance(value, bool):
+                properties.append(RNAProperty(key, 'BOOLEAN'))
+            elif isinstance(value, int):
+                properties.append(RNAProperty(key, 'INT'))
+            elif isinstance(value, float):
+                properties.append(RNAProperty(key, 'FLOAT'))
+            elif isinstance(value, str):
+                properties.append(RNAProperty(key, 'STRING'))
+            elif isinstance(value, (ID, Object)):
+                properties.append(RNAProperty(key, 'POINTER'))
+        return _types.SimpleNamespace(properties=properties)
+
+
+# Mesh data
+
+class VertexGroupElement:
+    __slots__ = ('group', 'weight')
+
+    def __init__(self, group, weight):
+        self.group = group
+        self.weight = weight
+
+
+class MeshVertex:
+    __slots__ = ('index', 'co', 'normal', 'groups')
+
+    def __init__(self, index, co, normal, groups=()):
+        self.index = index
+        self.co = mathutils.Vector(co)
+        self.normal = mathutils.Vector(normal)
+        self.groups = Collection(groups)
+
+
+class MeshLoop:
+    __slots__ = ('index', 'vertex_index', 'normal')
+
+    def __init__(self, index, vertex_index, normal):
+        self.index = index
+        self.vertex_index = vertex_index
+        self.normal = mathutils.Vector(normal)
+
+
+class MeshLoopUV:
+    __slots__ = ('uv',)
+
+    def __init__(self, uv):
+        self.uv = mathutils.Vector(uv)
+
+
+class MeshUVLoopLayer:
+    def __init__(self, name, uvs):
+        self.name = name
+        self.data = Collection(MeshLoopUV(uv) for uv in uvs)
+
+
+class MeshPolygon:
+    __slots__ = ('index', 'loop_start', 'loop_total', 'material_index', 'vertices')
+
+    def __init__(self, index, loop_start, loop_total, material_index, vertices):
+        self.index = index
+        self.loop_start = loop_start
+        self.loop_total = loop_total
+        self.material_index = material_index
+        self.vertices = vertices
+
+    @property
+    def loop_indices(self):
+        return range(self.loop_start, self.loop_start + self.loop_total)
+
+
+class Mesh(ID):
+    def __init__(self, name):
+        ID.__init__(self, name)
+        self.vertices = Collection()
+        self.loops = Collection()
+        self.polygons = Collection()
+        self.uv_layers = Collection()
+        self.materials = Collection()
+        self.shape_keys = None
+
+    def calc_normals_split(self):
+        pass
+
+    def calc_tessface(self):
+        pass
+
+    def transform(self, matrix):
+        rot = matrix.to_3x3()
+        for vert in self.vertices:
+            vert.co = matrix * vert.co
+        for loop in self.loops:
+            loop.normal = (rot * loop.normal).normalized()
+
+    def copy(self, name):
+        mesh = Mesh(name)
+        mesh.vertices = Collection(
+            MeshVertex(v.index, v.co, v.normal, [VertexGroupElement(g.group, g.weight) for g in v.groups])
+            for v in self.vertices
+        )
+        mesh.loops = Collection(MeshLoop(l.index, l.vertex_index, l.normal) for l in self.loops)
+        mesh.polygons = Collection(
+            MeshPolygon(p.index, p.loop_start, p.loop_total, p.material_index, p.vertices)
+            for p in self.polygons
+        )
+        mesh.uv_layers = Collection(
+            MeshUVLoopLayer(layer.name, [d.uv for d in layer.data]) for layer in self.uv_layers
+        )
+        mesh.materials = Collection(self.materials)
+        return mesh
+
+
+# Materials, textures and images
+
+class Material(ID):
+    def __init__(self, name, color=(0.8, 0.8, 0.8)):
+        ID.__init__(self, name)
+        self.diffuse_color = mathutils.Vector(color)
+        self.diffuse_intensity = 0.8
+        self.specular_color = mathutils.Vector((1.0, 1.0, 1.0))
+        self.specular_intensity = 0.5
+        self.specular_alpha = 1.0
+        self.specular_hardness = 50
+        self.emit = 0.0
+        self.ambient = 1.0
+        self.alpha = 1.0
+        self.texture_slots = []
+
+
+class ColorspaceSettings:
+    def __init__(self, name):
+        self.name = name
+
+
+class PackedFile:
+    def __init__(self, data):
+        self.data = data
+        self.size = len(data)
+
+
+class Image(ID):
+    def __init__(self, name, size=(4, 4), channels=4, pixels=None, filepath=''):
+        ID.__init__(self, name)
+        self.size = list(size)
+        self.channels = channels
+        self.filepath = filepath
+        self.filepath_raw = filepath
+        self.file_format = 'PNG'
+        self.colorspace_settings = ColorspaceSettings('sRGB')
+        self.packed_file = None
+        self.is_dirty = False
+        self.source = 'FILE' if filepath else 'GENERATED'
+        if pixels is None:
+            width, height = size
+            pixels = [((x * 7 + y * 13 + c * 31) % 256) / 255.0
+                      for y in range(height) for x in range(width) for c in range(channels)]
+        self.pixels = list(pixels)
+
+
+class Texture(ID):
+    type = 'NONE'
+
+
+class ImageTexture(Texture):
+    type = 'IMAGE'
+
+    def __init__(self, name, image):
+        Texture.__init__(self, name)
+        self.image = image
+
+
+# Objects, armatures and animation
+
+class Bone:
+    def __init__(self, name, matrix_local, parent=None):
+        self.name = name
+        self.matrix_local = matrix_local
+        self.parent = parent
+        self.children = []
+        if parent is not None:
+            parent.children.append(self)
+        self.use_inherit_rotation = True
+        self.use_inherit_scale = True
+        self.use_local_location = True
+
+
+class Armature(ID):
+    def __init__(self, name, bones):
+        ID.__init__(self, name)
+        self.bones = Collection(bones)
+
+
+class PoseBone:
+    def __init__(self, bone, parent=None):
+        self.bone = bone
+        self.name = bone.name
+        self.parent = parent
+        self.location = mathutils.Vector((0.0, 0.0, 0.0))
+        self.rotation_quaternion = mathutils.Quaternion((1.0, 0.0, 0.0, 0.0))
+        self.rotation_euler = mathutils.Vector((0.0, 0.0, 0.0))
+        self.rotation_axis_angle = mathutils.Vector((0.0, 0.0, 1.0, 0.0))
+        self.scale = mathutils.Vector((1.0, 1.0, 1.0))
+        self.rotation_mode = 'QUATERNION'
+        self.constraints = Collection()
+        self.matrix = bone.matrix_local
+
+    def _basis(self):
+        loc = mathutils.Matrix.Translation(self.location)
+        rot = mathutils.Quaternion(self.rotation_quaternion).normalized().to_matrix().to_4x4()
+        scale = mathutils.Matrix.Identity(4)
+        for i in range(3):
+            scale._rows[i][i] = self.scale[i]
+        return loc * rot * scale
+
+
+class Pose:
+    def __init__(self, bones):
+        self.bones = Collection(bones)
+
+
+class Keyframe:
+    __slots__ = ('co', 'handle_left', 'handle_right', 'interpolation')
+
+    def __init__(self, frame, value):
+        self.co = mathutils.Vector((frame, value))
+        self.handle_left = mathutils.Vector((frame - 1.0, value))
+        self.handle_right = mathutils.Vector((frame + 1.0, value))
+        self.interpolation = 'LINEAR'
+
+
+class FCurve:
+    def __init__(self, data_path, array_index, keys):
+        self.data_path = data_path
+        self.array_index = array_index
+        self.keyframe_points = Collection(Keyframe(f, v) for f, v in keys)
+        self.modifiers = Collection()
+        self.extrapolation = 'CONSTANT'
+
+    def evaluate(self, frame):
+        points = self.keyframe_points
+        if frame <= points[0].co[0]:
+            return points[0].co[1]
+        for prev, cur in zip(points, points[1:]):
+            if frame <= cur.co[0]:
+                t = (frame - prev.co[0]) / (cur.co[0] - prev.co[0])
+                return prev.co[1] + (cur.co[1] - prev.co[1]) * t
+        return points[-1].co[1]
+
+
+class Action(ID):
+    def __init__(self, name, fcurves):
+        ID.__init__(self, name)
+        self.fcurves = Collection(fcurves)
+
+    @property
+    def frame_range(self):
+        frames = [k.co[0] for fc in self.fcurves for k in fc.keyframe_points]
+        return mathutils.Vector((min(frames), max(frames)))
+
+
+class AnimData:
+    def __init__(self, action=None):
+        self.action = action
+        self.drivers = Collection()
+        self.nla_tracks = Collection()
+
+
+class RigidBody:
+    pass
+
+
+class Modifier(RNAStruct):
+    def __init__(self, name, type, **props):
+        self.name = name
+        self.type = type
+        self.show_viewport = True
+        self.show_render = True
+        for key, value in props.items():
+            setattr(self, key, value)
+
+
+class VertexGroup:
+    def __init__(self, index, name):
+        self.index = index
+        self.name = name
+
+
+class Object(ID):
+    def __init__(self, name, data, type, matrix_world=None):
+        ID.__init__(self, name)
+        self.data = data
+        self.type = type
+        self.matrix_world = matrix_world or mathutils.Matrix.Identity(4)
+        self.matrix_basis = self.matrix_world.copy()
+        self.parent = None
+        self.children = []
+        self.rigid_body = None
+        self.dupli_group = None
+        self.animation_data = None
+        self.vertex_groups = Collection()
+        self.modifiers = Collection()
+        self.constraints = Collection()
+        self.pose = None
+        self.armature = None
+        self.rotation_mode = 'QUATERNION'
+        self.rotation_quaternion = mathutils.Quaternion((1.0, 0.0, 0.0, 0.0))
+        self.rotation_euler = mathutils.Vector((0.0, 0.0, 0.0))
+        self.rotation_axis_angle = mathutils.Vector((0.0, 0.0, 1.0, 0.0))
+        self.scale = mathutils.Vector((1.0, 1.0, 1.0))
+        self.matrix_parent_inverse = mathutils.Matrix.Identity(4)
+        self.delta_location = mathutils.Vector((0.0, 0.0, 0.0))
+        self.delta_rotation_quaternion = mathutils.Quaternion((1.0, 0.0, 0.0, 0.0))
+        self.delta_rotation_euler = mathutils.Vector((0.0, 0.0, 0.0))
+        self.delta_scale = mathutils.Vector((1.0, 1.0, 1.0))
+        if type == 'ARMATURE':
+            pose_bones = {}
+            for bone in data.bones:
+                pose_bones[bone.name] = PoseBone(
+                    bone, pose_bones[bone.parent.name] if bone.parent else None)
+            self.pose = Pose(pose_bones.values())
+
+    @property
+    def matrix_local(self):
+        return self.matrix_basis
+
+    @property
+    def location(self):
+        return self.matrix_basis.translation
+
+    def find_armature(self):
+        return self.armature
+
+    def is_visible(self, scene):
+        return True
+
+    def to_mesh(self, scene, apply_modifiers, settings):
+        meshes = data.meshes
+        index = 1
+        while '{}.{:03d}'.format(self.data.name, index) in {m.name for m in meshes}:
+            index += 1
+        mesh = self.data.copy('{}.{:03d}'.format(self.data.name, index))
+        meshes.append(mesh)
+        return mesh
+
+    def _evaluate(self, frame):
+        if self.animation_data is None or self.animation_data.action is None:
+            return
+        action = self.animation_data.action
+        for fcurve in action.fcurves:
+            value = fcurve.evaluate(frame)
+            path = fcurve.data_path
+            if path.startswith('pose.bones'):
+                if self.pose is None:
+                    continue
+                bone_name = path.split('["')[1].split('"]')[0]
+                pbone = self.pose.bones.get(bone_name)
+                if pbone is None:
+                    continue
+                prop = path.rsplit('.', 1)[1]
+                target = getattr(pbone, prop)
+                data = list(target)
+                data[fcurve.array_index] = value
+                setattr(pbone, prop, type(target)(data))
+            elif path == 'location':
+                self.matrix_basis._rows[fcurve.array_index][3] = value
+        if self.pose is not None:
+            for pbone in self.pose.bones:
+                bone = pbone.bone
+                if bone.parent:
+                    rest = bone.parent.matrix_local.inverted() * bone.matrix_local
+                    pbone.matrix = pbone.parent.matrix * rest * pbone._basis()
+                else:
+                    pbone.matrix = bone.matrix_local * pbone._basis()
+
+
+# Scenes and context
+
+class World:
+    def __init__(self):
+        self.horizon_color = mathutils.Vector((0.05, 0.05, 0.05))
+        self.ambient_color = mathutils.Vector((0.0, 0.0, 0.0))
+        self.mist_settings = _types.SimpleNamespace(
+            use_mist=False, start=5.0, depth=25.0, intensity=0.0, falloff='QUADRATIC')
+
+
+class Render:
+    fps = 24
+
+
+class Scene(ID):
+    def __init__(self, name='Scene'):
+        ID.__init__(self, name)
+        self.objects = Collection()
+        self.world = World()
+        self.camera = None
+        self.render = Render()
+        self.frame_current = 1
+        self.frame_set_calls = 0
+
+    def frame_set(self, frame):
+        self.frame_current = frame
+        self.frame_set_calls += 1
+        for obj in self.objects:
+            obj._evaluate(frame)
+
+
+class BlendData:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.actions = Collection()
+        self.armatures = Collection()
+        self.cameras = Collection()
+        self.images = Collection()
+        self.lamps = Collection()
+        self.materials = Collection()
+        self.meshes = IDCollection(Mesh)
+        self.objects = Collection()
+        self.scenes = Collection()
+        self.textures = Collection()
+        self.filepath = ''
+
+
+data = BlendData()
+context = _types.SimpleNamespace(scene=None)
+
+types = _types.SimpleNamespace(
+    ImageTexture=ImageTexture,
+    Texture=Texture,
+    Object=Object,
+    Mesh=Mesh,
+    ID=ID,
+)
+
+app = _types.SimpleNamespace(
+    version=(2, 78, 0),
+    binary_path_python=None,
+)
+
+
+def _abspath(path, start=None, library=None):
+    return path[2:] if path.startswith('//') else path
+
+
+path = _types.SimpleNamespace(abspath=_abspath)
+
+
+def reset():
+    """Clear all datablocks and start a new, empty scene."""
+    data.reset()
+    scene = Scene()
+    data.scenes.append(scene)
+    context.scene = scene
+    return scene
+
+
+reset()
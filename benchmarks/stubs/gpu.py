@@ -0,0 +1,77 @@
+"""Minimal stand-in for Blender's ``gpu`` module.
+
+Provides the dynamic uniform/attribute constants used by gpu_luts and a
+``export_shader`` that returns a small, deterministic GLSL program.
+"""
+
+_NAMES = (
+    'GPU_DYNAMIC_LAMP_DYNVEC', 'GPU_DYNAMIC_LAMP_DYNCO', 'GPU_DYNAMIC_LAMP_DYNIMAT',
+    'GPU_DYNAMIC_LAMP_DYNPERSMAT', 'GPU_DYNAMIC_LAMP_DYNENERGY', 'GPU_DYNAMIC_LAMP_DYNCOL',
+    'GPU_DYNAMIC_LAMP_DISTANCE', 'GPU_DYNAMIC_LAMP_ATT1', 'GPU_DYNAMIC_LAMP_ATT2',
+    'GPU_DYNAMIC_LAMP_SPOTSIZE', 'GPU_DYNAMIC_LAMP_SPOTBLEND',
+    'GPU_DYNAMIC_MIST_ENABLE', 'GPU_DYNAMIC_MIST_START', 'GPU_DYNAMIC_MIST_DISTANCE',
+    'GPU_DYNAMIC_MIST_INTENSITY', 'GPU_DYNAMIC_MIST_TYPE', 'GPU_DYNAMIC_MIST_COLOR',
+    'GPU_DYNAMIC_HORIZON_COLOR', 'GPU_DYNAMIC_AMBIENT_COLOR',
+    'GPU_DYNAMIC_MAT_DIFFRGB', 'GPU_DYNAMIC_MAT_REF', 'GPU_DYNAMIC_MAT_SPECRGB',
+    'GPU_DYNAMIC_MAT_SPEC', 'GPU_DYNAMIC_MAT_HARD', 'GPU_DYNAMIC_MAT_EMIT',
+    'GPU_DYNAMIC_MAT_AMB', 'GPU_DYNAMIC_MAT_ALPHA',
+    'GPU_DYNAMIC_OBJECT_VIEWMAT', 'GPU_DYNAMIC_OBJECT_MAT', 'GPU_DYNAMIC_OBJECT_VIEWIMAT',
+    'GPU_DYNAMIC_OBJECT_IMAT', 'GPU_DYNAMIC_OBJECT_COLOR', 'GPU_DYNAMIC_OBJECT_AUTOBUMPSCALE',
+    'CD_ORCO',
+    'GPU_DATA_1I', 'GPU_DATA_1F', 'GPU_DATA_2F', 'GPU_DATA_3F', 'GPU_DATA_4F',
+    'GPU_DATA_9F', 'GPU_DATA_16F',
+)
+
+for _i, _name in enumerate(_NAMES):
+    globals()[_name] = 100 + _i
+del _i, _name
+
+
+VERTEX_SOURCE = """\
+varying vec3 varposition;
+varying vec3 varnormal;
+
+#ifdef CLIP_WORKAROUND
+varying float gl_ClipDistance[6];
+#endif
+
+void main()
+{
+    vec4 co = gl_ModelViewMatrix * gl_Vertex;
+    varposition = co.xyz;
+    varnormal = normalize(gl_NormalMatrix * gl_Normal);
+    gl_Position = gl_ProjectionMatrix * co;
+}
+"""
+
+FRAGMENT_SOURCE = """\
+varying vec3 varposition;
+varying vec3 varnormal;
+uniform vec4 unf1;
+
+void node_bsdf_diffuse(vec4 color, float roughness, vec3 N, out vec4 result)
+{
+    result = vec4(0.0);
+}
+
+void main()
+{
+    vec4 tmp = unf1 * max(dot(normalize(varnormal), vec3(0.0, 0.0, 1.0)), 0.0);
+    gl_FragColor = tmp;
+}
+"""
+
+
+def export_shader(scene, material):
+    return {
+        'vertex': VERTEX_SOURCE,
+        'fragment': FRAGMENT_SOURCE,
+        'attributes': [],
+        'uniforms': [
+            {
+                'varname': 'unf1',
+                'type': GPU_DYNAMIC_MAT_DIFFRGB,
+                'datatype': GPU_DATA_3F,
+            },
+        ],
+    }
@@ -0,0 +1,305 @@
+"""Minimal pure-Python stand-in for Blender's ``mathutils`` module.
+
+Only the subset of the API used by blendergltf is provided.  Matrices are
+row-major lists of rows and use ``*`` for multiplication, as in Blender 2.7x.
+"""
+
+import math
+import struct
+
+_F32 = struct.Struct('<f')
+
+
+def _f32(value):
+    """Round to single precision, as mathutils stores floats."""
+    return _F32.unpack(_F32.pack(value))[0]
+
+
+class Vector:
+    __slots__ = ('_data', '_frozen')
+
+    def __init__(self, seq=(0.0, 0.0, 0.0)):
+        self._data = [_f32(v) for v in seq]
+        self._frozen = False
+
+    def freeze(self):
+        self._frozen = True
+        return self
+
+    def copy(self):
+        return Vector(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return tuple(self._data[idx])
+        return self._data[idx]
+
+    def __setitem__(self, idx, value):
+        if self._frozen:
+            raise TypeError('Vector is frozen')
+        self._data[idx] = _f32(value)
+
+    def _get(idx):
+        def getter(self):
+            return self._data[idx]
+
+        def setter(self, value):
+            self[idx] = value
+        return property(getter, setter)
+
+    x = _get(0)
+    y = _get(1)
+    z = _get(2)
+    w = _get(3)
+    del _get
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __hash__(self):
+        if not self._frozen:
+            raise TypeError('Vector must be frozen to be hashed')
+        return hash(tuple(self._data))
+
+    def __add__(self, other):
+        return Vector(a + b for a, b in zip(self, other))
+
+    def __sub__(self, other):
+        return Vector(a - b for a, b in zip(self, other))
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float)):
+            return Vector(a * other for a in self)
+        return sum(a * b for a, b in zip(self, other))
+
+    __rmul__ = __mul__
+
+    @property
+    def length(self):
+        return math.sqrt(sum(a * a for a in self))
+
+    def normalized(self):
+        length = self.length
+        return Vector(a / length for a in self) if length else self.copy()
+
+    def __repr__(self):
+        return 'Vector({})'.format(tuple(self._data))
+
+
+class Quaternion:
+    __slots__ = ('_data',)
+
+    def __init__(self, seq=(1.0, 0.0, 0.0, 0.0)):
+        self._data = [float(v) for v in seq]
+
+    def __len__(self):
+        return 4
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __getitem__(self, idx):
+        return self._data[idx]
+
+    w = property(lambda self: self._data[0])
+    x = property(lambda self: self._data[1])
+    y = property(lambda self: self._data[2])
+    z = property(lambda self: self._data[3])
+
+    def __mul__(self, other):
+        aw, ax, ay, az = self._data
+        bw, bx, by, bz = other
+        return Quaternion((
+            aw * bw - ax * bx - ay * by - az * bz,
+            aw * bx + ax * bw + ay * bz - az * by,
+            aw * by - ax * bz + ay * bw + az * bx,
+            aw * bz + ax * by - ay * bx + az * bw,
+        ))
+
+    def normalized(self):
+        length = math.sqrt(sum(c * c for c in self._data))
+        return Quaternion(c / length for c in self._data) if length else Quaternion(self._data)
+
+    def to_matrix(self):
+        w, x, y, z = self._data
+        return Matrix((
+            (1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)),
+            (2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)),
+            (2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)),
+        ))
+
+    def __repr__(self):
+        return 'Quaternion({})'.format(tuple(self._data))
+
+
+class Euler:
+    __slots__ = ('_data', 'order')
+
+    def __init__(self, angles=(0.0, 0.0, 0.0), order='XYZ'):
+        self._data = [float(v) for v in angles]
+        self.order = order
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def to_quaternion(self):
+        quat = Quaternion()
+        # An XYZ euler rotates about X first, so X ends up rightmost.
+        for axis in reversed(self.order):
+            half = self._data['XYZ'.index(axis)] / 2
+            axis_quat = [math.cos(half), 0.0, 0.0, 0.0]
+            axis_quat['XYZ'.index(axis) + 1] = math.sin(half)
+            quat = quat * Quaternion(axis_quat)
+        return quat
+
+
+class Matrix:
+    __slots__ = ('_rows',)
+
+    def __init__(self, rows=None):
+        if rows is None:
+            rows = ((1.0, 0.0, 0.0, 0.0),
+                    (0.0, 1.0, 0.0, 0.0),
+                    (0.0, 0.0, 1.0, 0.0),
+                    (0.0, 0.0, 0.0, 1.0))
+        self._rows = [[float(v) for v in row] for row in rows]
+
+    @classmethod
+    def Identity(cls, size):
+        return cls([[1.0 if i == j else 0.0 for j in range(size)] for i in range(size)])
+
+    @classmethod
+    def Translation(cls, vec):
+        mat = cls.Identity(4)
+        for i in range(3):
+            mat._rows[i][3] = float(vec[i])
+        return mat
+
+    @classmethod
+    def Scale(cls, factor, size, axis=None):
+        mat = cls.Identity(size)
+        for i in range(min(size, 3)):
+            mat._rows[i][i] = float(factor)
+        return mat
+
+    @classmethod
+    def Rotation(cls, angle, size, axis):
+        c = math.cos(angle)
+        s = math.sin(angle)
+        if axis == 'X':
+            rot = ((1, 0, 0), (0, c, -s), (0, s, c))
+        elif axis == 'Y':
+            rot = ((c, 0, s), (0, 1, 0), (-s, 0, c))
+        else:
+            rot = ((c, -s, 0), (s, c, 0), (0, 0, 1))
+        mat = Matrix(rot)
+        return mat.to_4x4() if size == 4 else mat
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return (Vector(row) for row in self._rows)
+
+    def __getitem__(self, idx):
+        return Vector(self._rows[idx])
+
+    def __eq__(self, other):
+        return self._rows == other._rows
+
+    def copy(self):
+        return Matrix(self._rows)
+
+    @property
+    def col(self):
+        size = len(self._rows)
+        return [Vector(self._rows[r][c] for r in range(size)) for c in range(len(self._rows[0]))]
+
+    @property
+    def row(self):
+        return [Vector(row) for row in self._rows]
+
+    @property
+    def translation(self):
+        return Vector(row[3] for row in self._rows[:3])
+
+    def to_3x3(self):
+        return Matrix([row[:3] for row in self._rows[:3]])
+
+    def to_4x4(self):
+        rows = [list(row) + [0.0] * (4 - len(row)) for row in self._rows]
+        while len(rows) < 4:
+            rows.append([0.0, 0.0, 0.0, 0.0])
+        rows[3][3] = 1.0
+        return Matrix(rows)
+
+    def __mul__(self, other):
+        if isinstance(other, Matrix):
+            cols = list(zip(*other._rows))
+            return Matrix([[sum(a * b for a, b in zip(row, col)) for col in cols] for row in self._rows])
+        if isinstance(other, (int, float)):
+            return Matrix([[v * other for v in row] for row in self._rows])
+        vec = list(other)
+        if len(vec) == 3 and len(self._rows) == 4:
+            vec.append(1.0)
+            return Vector(sum(a * b for a, b in zip(row, vec)) for row in self._rows[:3])
+        return Vector(sum(a * b for a, b in zip(row, vec)) for row in self._rows)
+
+    def determinant(self):
+        m = self.to_3x3()._rows
+        return (m[0][0] * (m[1][1] * m[2][2] - m[1][2] * m[2][1])
+                - m[0][1] * (m[1][0] * m[2][2] - m[1][2] * m[2][0])
+                + m[0][2] * (m[1][0] * m[2][1] - m[1][1] * m[2][0]))
+
+    def inverted(self):
+        size = len(self._rows)
+        aug = [list(row) + [1.0 if i == j else 0.0 for j in range(size)]
+               for i, row in enumerate(self._rows)]
+        for col in range(size):
+            pivot = max(range(col, size), key=lambda r: abs(aug[r][col]))
+            if abs(aug[pivot][col]) < 1e-12:
+                raise ValueError('Matrix is not invertible')
+            aug[col], aug[pivot] = aug[pivot], aug[col]
+            div = aug[col][col]
+            aug[col] = [v / div for v in aug[col]]
+            for r in range(size):
+                if r != col:
+                    factor = aug[r][col]
+                    aug[r] = [a - factor * b for a, b in zip(aug[r], aug[col])]
+        return Matrix([row[size:] for row in aug])
+
+    def to_quaternion(self):
+        return self.decompose()[1]
+
+    def decompose(self):
+        loc = self.translation
+        rot = [row[:3] for row in self._rows[:3]]
+        scale = [math.sqrt(sum(rot[r][c] ** 2 for r in range(3))) for c in range(3)]
+        if self.determinant() < 0:
+            scale = [-s for s in scale]
+        n = [[rot[r][c] / scale[c] if scale[c] else 0.0 for c in range(3)] for r in range(3)]
+        trace = n[0][0] + n[1][1] + n[2][2]
+        if trace > 0:
+            s = 0.5 / math.sqrt(trace + 1.0)
+            quat = (0.25 / s, (n[2][1] - n[1][2]) * s, (n[0][2] - n[2][0]) * s, (n[1][0] - n[0][1]) * s)
+        elif n[0][0] > n[1][1] and n[0][0] > n[2][2]:
+            s = 2.0 * math.sqrt(1.0 + n[0][0] - n[1][1] - n[2][2])
+            quat = ((n[2][1] - n[1][2]) / s, 0.25 * s, (n[0][1] + n[1][0]) / s, (n[0][2] + n[2][0]) / s)
+        elif n[1][1] > n[2][2]:
+            s = 2.0 * math.sqrt(1.0 + n[1][1] - n[0][0] - n[2][2])
+            quat = ((n[0][2] - n[2][0]) / s, (n[0][1] + n[1][0]) / s, 0.25 * s, (n[1][2] + n[2][1]) / s)
+        else:
+            s = 2.0 * math.sqrt(1.0 + n[2][2] - n[0][0] - n[1][1])
+            quat = ((n[1][0] - n[0][1]) / s, (n[0][2] + n[2][0]) / s, (n[1][2] + n[2][1]) / s, 0.25 * s)
+        if quat[0] < 0:
+            quat = tuple(-q for q in quat)
+        return loc, Quaternion(quat), Vector(scale)
+
+    def __repr__(self):
+        return 'Matrix({})'.format(self._rows)
@@ -0,0 +1,174 @@
+"""Builders for synthetic scenes used by the benchmarks.
+
+Every builder registers its datablocks with the ``bpy`` stand-in so that the
+exporter sees them exactly as it would see data in a .blend file.
+"""
+
+import math
+import random
+
+import bpy
+import mathutils
+
+
+def make_grid_mesh(name, size, uv_layers=1, materials=1, vertex_groups=0, seed=0):
+    """Create a ``size`` x ``size`` quad grid with smooth normals.
+
+    Roughly ``4 * size * size`` loops are generated.  Each UV layer uses a
+    different scale so layers do not weld identically.
+    """
+    rng = random.Random(seed)
+    mesh = bpy.Mesh(name)
+    mats = [bpy.Material('{}_mat{}'.format(name, i), (rng.random(), rng.random(), rng.random()))
+            for i in range(materials)]
+    bpy.data.materials.extend(mats)
+    mesh.materials.extend(mats)
+
+    verts = []
+    for y in range(size + 1):
+        for x in range(size + 1):
+            z = 0.25 * math.sin(x * 0.3) * math.cos(y * 0.2)
+            normal = mathutils.Vector((-0.075 * math.cos(x * 0.3) * math.cos(y * 0.2),
+                                       0.05 * math.sin(x * 0.3) * math.sin(y * 0.2),
+                                       1.0)).normalized()
+            groups = []
+            if vertex_groups:
+                picks = rng.sample(range(vertex_groups), min(vertex_groups, 5))
+                groups = [bpy.VertexGroupElement(g, mathutils._f32(rng.random())) for g in picks]
+            verts.append(bpy.MeshVertex(len(verts), (x, y, z), normal, groups))
+    mesh.vertices.extend(verts)
+
+    loop_verts = []
+    for y in range(size):
+        for x in range(size):
+            base = y * (size + 1) + x
+            quad = (base, base + 1, base + size + 2, base + size + 1)
+            start = len(loop_verts)
+            loop_verts.extend(quad)
+            mesh.polygons.append(bpy.MeshPolygon(
+                len(mesh.polygons), start, 4, (x + y) % max(materials, 1), quad))
+
+    for index, vi in enumerate(loop_verts):
+        mesh.loops.append(bpy.MeshLoop(index, vi, verts[vi].normal))
+
+    for layer in range(uv_layers):
+        scale = 1.0 / (size * (layer + 1))
+        uvs = [(verts[vi].co.x * scale, verts[vi].co.y * scale) for vi in loop_verts]
+        mesh.uv_layers.append(bpy.MeshUVLoopLayer('UVMap{}'.format(layer), uvs))
+
+    bpy.data.meshes.append(mesh)
+    return mesh
+
+
+def make_mesh_object(name, mesh, location=(0.0, 0.0, 0.0), armature=None):
+    obj = bpy.Object(name, mesh, 'MESH', mathutils.Matrix.Translation(location))
+    if armature is not None:
+        obj.armature = armature
+        bones = armature.data.bones
+        obj.vertex_groups.extend(bpy.VertexGroup(i, bone.name) for i, bone in enumerate(bones))
+        obj.modifiers.append(bpy.Modifier('Armature', 'ARMATURE', object=armature))
+    _link(obj)
+    return obj
+
+
+def make_armature(name, num_bones, chain_length=8):
+    bones = []
+    for i in range(num_bones):
+        parent = bones[i - 1] if i % chain_length else None
+        mat = mathutils.Matrix.Translation((i // chain_length, 0.0, (i % chain_length) * 0.5))
+        bones.append(bpy.Bone('Bone{:03d}'.format(i), mat, parent))
+    arm = bpy.Armature(name, bones)
+    bpy.data.armatures.append(arm)
+    obj = bpy.Object(name, arm, 'ARMATURE')
+    obj.animation_data = bpy.AnimData()
+    _link(obj)
+    return obj
+
+
+def make_bone_action(name, armature, num_frames, key_step=5, constant_bones=0.5, seed=0):
+    """Create an action keying rotation and location for every bone.
+
+    A ``constant_bones`` fraction of bones only get constant keys, which is
+    typical of mocap clips where fingers and props barely move.
+    """
+    rng = random.Random(seed)
+    fcurves = []
+    bones = list(armature.data.bones)
+    for index, bone in enumerate(bones):
+        path = 'pose.bones["{}"]'.format(bone.name)
+        constant = index < len(bones) * constant_bones
+        frames = list(range(1, num_frames + 1, key_step))
+        if frames[-1] != num_frames:
+            frames.append(num_frames)
+        for axis in range(3):
+            keys = [(f, 0.0 if constant else 0.2 * math.sin(f * 0.05 + axis + rng.random()))
+                    for f in frames]
+            fcurves.append(bpy.FCurve(path + '.location', axis, keys))
+        angles = [0.0 if constant else 0.5 * math.sin(f * 0.03 + rng.random()) for f in frames]
+        quats = [(math.cos(a / 2), 0.0, 0.0, math.sin(a / 2)) for a in angles]
+        for axis in range(4):
+            fcurves.append(bpy.FCurve(path + '.rotation_quaternion', axis,
+                                      [(f, q[axis]) for f, q in zip(frames, quats)]))
+    action = bpy.Action(name, fcurves)
+    bpy.data.actions.append(action)
+    return action
+
+
+def make_object_action(name, num_frames):
+    keys = [(1, 0.0), (num_frames, 10.0)]
+    action = bpy.Action(name, [bpy.FCurve('location', axis, keys) for axis in range(3)])
+    bpy.data.actions.append(action)
+    return action
+
+
+def make_image(name, width, height, channels=4):
+    image = bpy.Image(name, (width, height), channels)
+    bpy.data.images.append(image)
+    texture = bpy.ImageTexture(name, image)
+    bpy.data.textures.append(texture)
+    return image, texture
+
+
+def build_scene(num_objects=4, grid_size=16, uv_layers=1, materials=2, vertex_groups=0,
+                num_bones=0, num_frames=0, image_size=0, instanced=False):
+    """Build a complete scene and return the ``scene_delta`` for export_gltf."""
+    scene = bpy.reset()
+    armature = None
+    if num_bones:
+        armature = make_armature('Armature', num_bones)
+        if num_frames:
+            armature.animation_data.action = make_bone_action('Walk', armature, num_frames)
+
+    shared = make_grid_mesh('Shared', grid_size, uv_layers, materials, vertex_groups) if instanced else None
+    for i in range(num_objects):
+        mesh = shared or make_grid_mesh('Grid{}'.format(i), grid_size, uv_layers, materials,
+                                        num_bones or vertex_groups, seed=i)
+        make_mesh_object('Object{}'.format(i), mesh, (i * 3.0, 0.0, 0.0), armature)
+
+    if image_size:
+        image, texture = make_image('Texture', image_size, image_size)
+        for mat in bpy.data.materials:
+            mat.texture_slots.append(_TextureSlot(texture))
+
+    return {
+        'actions': list(bpy.data.actions),
+        'camera': list(bpy.data.cameras),
+        'lamps': list(bpy.data.lamps),
+        'images': list(bpy.data.images),
+        'materials': list(bpy.data.materials),
+        'meshes': list(bpy.data.meshes),
+        'objects': list(bpy.data.objects),
+        'scenes': list(bpy.data.scenes),
+        'textures': list(bpy.data.textures),
+    }
+
+
+class _TextureSlot:
+    def __init__(self, texture):
+        self.texture = texture
+        self.uv_layer = ''
+
+
+def _link(obj):
+    bpy.data.objects.append(obj)
+    bpy.context.scene.objects.append(obj)
@@ -3,16 +3,53 @@ import mathutils
 import gpu
 
 
+import array
 import json
 import collections
 import base64
+import concurrent.futures
+import contextlib
+import logging
+import multiprocessing
+import os
+import re
 import struct
+import sys
+import time
+import urllib.parse
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Warnings go here, the operator shows them in Blender's interface
+log = logging.getLogger(__name__)
 
 
 default_settings = {
     'materials_export_shader': False,
     'meshes_apply_modifiers': True,
     'images_embed_data': False,
+    'images_worker_threads': 4,
+    'images_resize': False,
+    'images_max_size': 0,
+    'images_resize_filter': 'LANCZOS',
+    'buffers_embed_data': True,
+    'buffers_combine_data': False,
+    'gltf_output_dir': '',
+    'meshes_weld_normal_epsilon': 0.0,
+    'meshes_worker_processes': 0,
+    'meshes_quantize_attributes': False,
+    'meshes_quantize_normals': 'SHORT',
+    'meshes_optimize_vertex_cache': False,
+    'meshes_split_primitives': True,
+    'meshes_rebase_indices': False,
+    'actions_sparse': False,
+    'actions_sparse_tolerance': 0.001,
+    'profile': False,
+    'cache_dir': '',
+    'cache_max_mb': 512,
     'asset_profile': 'WEB',
     'global_matrix': mathutils.Matrix.Identity(4)
 }
@@ -30,73 +67,55 @@ GL_SRGB = 0x8C40
 GL_SRGB_ALPHA = 0x8C42
 
 OES_ELEMENT_INDEX_UINT = 'OES_element_index_uint'
+KHR_BINARY_GLTF = 'KHR_binary_glTF'
+WEB3D_QUANTIZED_ATTRIBUTES = 'WEB3D_quantized_attributes'
+
+# Binary glTF (KHR_binary_glTF) file layout
+GLB_HEADER_SIZE = 20
+GLB_CONTENT_FORMAT_JSON = 0
 
 profile_map = {
     'WEB': {'api': 'WebGL', 'version': '1.0.3'},
     'DESKTOP': {'api': 'OpenGL', 'version': '3.0'}
 }
 
+# Texture size budgets per asset profile: the largest width or height (0 for
+# no limit) and whether sides are rounded to powers of two, which WebGL 1
+# needs for mipmapped and repeating textures
+image_profile_map = {
+    'WEB': {'max_size': 1024, 'power_of_two': True},
+    'DESKTOP': {'max_size': 0, 'power_of_two': False},
+}
+
 g_glExtensionsUsed = []
 
 if 'imported' in locals():
     import imp
     import bpy
+    imp.reload(animation_processing)
+    imp.reload(export_cache)
     imp.reload(gpu_luts)
+    imp.reload(image_processing)
+    imp.reload(mesh_processing)
+    imp.reload(profiling)
     imp.reload(shader_converter)
 else:
     imported = True
+    from . import animation_processing
+    from . import export_cache
     from . import gpu_luts
+    from . import image_processing
+    from . import mesh_processing
+    from . import profiling
     from . import shader_converter
 
 
-class Vertex:
-    __slots__ = (
-        "co",
-        "normal",
-        "uvs",
-        "loop_indices",
-        "index",
-        "weights",
-        "joint_indexes",
-        )
-    def __init__(self, mesh, loop):
-        vi = loop.vertex_index
-        i = loop.index
-        self.co = mesh.vertices[vi].co.freeze()
-        self.normal = loop.normal.freeze()
-        self.uvs = tuple(layer.data[i].uv.freeze() for layer in mesh.uv_layers)
-        self.loop_indices = [i]
-
-        # Take the four most influential groups
-        groups = sorted(mesh.vertices[vi].groups, key=lambda group: group.weight, reverse=True)
-        if len(groups) > 4:
-            groups = groups[:4]
-
-        self.weights = [group.weight for group in groups]
-        self.joint_indexes = [group.group for group in groups]
-
-        if len(self.weights) < 4:
-            for i in range(len(self.weights), 4):
-                self.weights.append(0.0)
-                self.joint_indexes.append(0)
-
-        self.index = 0
-
-    def __hash__(self):
-        return hash((self.co, self.normal, self.uvs))
-
-    def __eq__(self, other):
-        eq = (
-            (self.co == other.co) and
-            (self.normal == other.normal) and
-            (self.uvs == other.uvs)
-            )
+# Collects timings when settings['profile'] is set, see _profiled()
+g_profiler = profiling.Profiler(enabled=False)
+
+# Set while exporting if settings['cache_dir'] names a cache directory
+g_cache = None
 
-        if eq:
-            indices = self.loop_indices + other.loop_indices
-            self.loop_indices = indices
-            other.loop_indices = indices
-        return eq
 
 class Buffer:
     ARRAY_BUFFER = 34962
@@ -130,6 +149,7 @@ class Buffer:
             "max",
             "type",
             "type_size",
+            "extensions",
             "_ctype",
             "_ctype_size",
             "_buffer_data",
@@ -153,6 +173,7 @@ class Buffer:
             self.min = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
             self.max = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
             self.type = type
+            self.extensions = None
 
             if self.type == Buffer.MAT4:
                 self.type_size = 16
@@ -206,12 +227,100 @@ class Buffer:
                 raise TypeError("Expected an integer index")
 
             i = idx % self.type_size
+            ptr = (i * self._ctype_size + idx // self.type_size * self.byte_stride) + self.byte_offset
+
+            struct.pack_into(self._ctype, self._buffer_data, ptr, value)
+
+            # Bounds are of the stored (e.g. float32) value
+            value = struct.unpack_from(self._ctype, self._buffer_data, ptr)[0]
             self.min[i] = value if value < self.min[i] else self.min[i]
             self.max[i] = value if value > self.max[i] else self.max[i]
 
-            ptr = (i * self._ctype_size + idx // self.type_size * self.byte_stride) + self.byte_offset
+        def _update_bounds(self, lows, highs):
+            for i, (lo, hi) in enumerate(zip(lows, highs)):
+                self.min[i] = lo if lo < self.min[i] else self.min[i]
+                self.max[i] = hi if hi > self.max[i] else self.max[i]
+
+        def _stride(self):
+            return self.byte_stride or self.type_size * self._ctype_size
+
+        def as_array(self):
+            """Return a (count, type_size) NumPy view of the accessor's data."""
+            return np.ndarray(
+                (self.count, self.type_size),
+                dtype=self._ctype,
+                buffer=self._buffer_data,
+                offset=self.byte_offset,
+                strides=(self._stride(), self._ctype_size)
+            )
 
-            struct.pack_into(self._ctype, self._buffer_data, ptr, value)
+        def memoryview(self):
+            """Return a flat memoryview of components covering every element.
+
+            Component j of element i lives at index i * step + j, where step is
+            the byte stride divided by the component size.
+            """
+            if self.byte_offset % self._ctype_size or self._stride() % self._ctype_size:
+                raise ValueError("Accessor is not aligned to its component size")
+
+            end = self.byte_offset + (self.count - 1) * self._stride() + self.type_size * self._ctype_size
+            return memoryview(self._buffer_data)[self.byte_offset:end].cast(self._ctype[1])
+
+        def write_array(self, values):
+            """Write every element in one operation and update min and max.
+
+            values is either a flat sequence of count * type_size components or
+            a NumPy array that can be reshaped to (count, type_size).
+            """
+            if np is not None:
+                values = np.asarray(values).reshape(-1, self.type_size)
+                if len(values) != self.count:
+                    raise ValueError("Expected {} elements, got {}".format(self.count, len(values)))
+                if self.count:
+                    # Bounds are taken after conversion to the component
+                    # type, so they match the stored data
+                    stored = self.as_array()
+                    stored[...] = values
+                    self._update_bounds(stored.min(axis=0).tolist(), stored.max(axis=0).tolist())
+                return
+
+            if len(values) != self.count * self.type_size:
+                raise ValueError("Expected {} components, got {}".format(self.count * self.type_size, len(values)))
+            if not self.count:
+                return
+
+            view = self.memoryview()
+            step = self._stride() // self._ctype_size
+            lows = []
+            highs = []
+            for i in range(self.type_size):
+                component = array.array(self._ctype[1], values[i::self.type_size])
+                lows.append(min(component))
+                highs.append(max(component))
+                if sys.byteorder == 'big':
+                    component.byteswap()
+                view[i::step] = component
+            self._update_bounds(lows, highs)
+
+        def read_array(self):
+            """Read every element in one operation.
+
+            Returns a (count, type_size) NumPy array, or a flat list of
+            components when NumPy is not available.
+            """
+            if np is not None:
+                return self.as_array().copy()
+
+            if not self.count:
+                return []
+
+            view = self.memoryview()
+            step = self._stride() // self._ctype_size
+            components = [array.array(self._ctype[1], view[i::step]) for i in range(self.type_size)]
+            if sys.byteorder == 'big':
+                for component in components:
+                    component.byteswap()
+            return [value for element in zip(*components) for value in element]
 
     __slots__ = (
         "name",
@@ -229,32 +338,22 @@ class Buffer:
         self.buffer_views = collections.OrderedDict()
         self.accessors = {}
 
-    def export_buffer(self):
-        data = bytearray()
-        for bn, bv in self.buffer_views.items():
-            data.extend(bv['data'])
-            #print(bn)
-
-            #if bv['target'] == Buffer.ARRAY_BUFFER:
-            #    idx = bv['byteoffset']
-            #    while idx < bv['byteoffset'] + bv['bytelength']:
-            #    	print(struct.unpack_from('<ffffff', data, idx))
-            #    	idx += 24
-            #if bv['target'] == Buffer.ELEMENT_ARRAY_BUFFER:
-            #    idx = bv['byteoffset']
-            #    while idx < bv['byteoffset'] + bv['bytelength']:
-            #    	print(struct.unpack_from('<HHH', data, idx))
-            #    	idx += 6
-
-        uri = 'data:text/plain;base64,' + base64.b64encode(data).decode('ascii')
-        #fname = '{}.bin'.format(self.name)
-        #with open(fname, 'wb') as f:
-        #    for bv in self.buffer_views.values():
-        #    	f.write(bv['data'])
-
-        #uri = 'data:text/plain;base64,'
-        #with open(fname, 'rb') as f:
-        #    uri += str(base64.b64encode(f.read()), 'ascii')
+    def export_buffer(self, settings):
+        if self.uri is not None:
+            # The data is stored elsewhere (e.g. the body of a binary glTF)
+            uri = self.uri
+        elif not settings['buffers_embed_data']:
+            # Stream the views straight to a .bin file next to the glTF
+            fname = _output_file_name(self.name, '.bin')
+            with open(os.path.join(settings['gltf_output_dir'], fname), 'wb') as fout:
+                for chunk in self.iter_data():
+                    fout.write(chunk)
+            uri = urllib.parse.quote(fname)
+        else:
+            data = bytearray()
+            for chunk in self.iter_data():
+                data.extend(chunk)
+            uri = 'data:text/plain;base64,' + base64.b64encode(data).decode('ascii')
 
         return {
             'byteLength': self.bytelength,
@@ -262,8 +361,66 @@ class Buffer:
             'uri': uri,
         }
 
-    def add_view(self, bytelength, target):
+    def iter_data(self):
+        """Yield the bytes of the buffer one view at a time, including any
+        padding between views."""
+        offset = 0
+        for bv in self.buffer_views.values():
+            if bv['byteoffset'] > offset:
+                yield bytes(bv['byteoffset'] - offset)
+            yield bv['data']
+            offset = bv['byteoffset'] + bv['bytelength']
+
+    def iter_base64(self, chunk_size=3 * 65536):
+        """Yield the buffer data base64 encoded, a piece at a time.
+
+        Joining the pieces gives the same string as encoding the whole
+        buffer at once.
+        """
+        pending = bytearray()
+        for data in self.iter_data():
+            view = memoryview(data)
+            if pending:
+                take = -len(pending) % 3
+                pending += view[:take]
+                view = view[take:]
+                if len(pending) % 3:
+                    continue
+                yield base64.b64encode(pending).decode('ascii')
+                pending = bytearray()
+
+            usable = len(view) - len(view) % 3
+            for start in range(0, usable, chunk_size):
+                yield base64.b64encode(view[start:min(start + chunk_size, usable)]).decode('ascii')
+            pending += view[usable:]
+
+        if pending:
+            yield base64.b64encode(pending).decode('ascii')
+
+    def add_buffer(self, other, alignment=4):
+        """Move the views and accessors of another buffer into this one.
+
+        Each view is placed at the next multiple of alignment and its byte
+        offset is rewritten to point into this buffer.
+        """
+        for name, bv in other.buffer_views.items():
+            self.bytelength += -self.bytelength % alignment
+            bv['byteoffset'] = self.bytelength
+            self.buffer_views[name] = bv
+            self.bytelength += bv['bytelength']
+
+        for accessor in other.accessors.values():
+            accessor.buffer = self
+        self.accessors.update(other.accessors)
+
+        other.buffer_views = collections.OrderedDict()
+        other.accessors = {}
+        other.bytelength = 0
+
+    def add_view(self, bytelength, target, alignment=1):
+        """Add a view of bytelength bytes at the next multiple of alignment."""
         buffer_name = '{}_view_{}'.format(self.name, len(self.buffer_views))
+        self.bytelength += -self.bytelength % alignment
         self.buffer_views[buffer_name] = {
                 'data': bytearray(bytelength),
                 'target': target,
@@ -317,16 +474,176 @@ class Buffer:
                 'type': v.type,
             }
 
+            if v.extensions:
+                gltf[k]['extensions'] = v.extensions
+
         return gltf
 
+    def get_state(self):
+        """Return the views, accessors and data of the buffer as plain
+        values that can be pickled. See from_state."""
+        return {
+            'name': self.name,
+            'uri': self.uri,
+            'bytelength': self.bytelength,
+            'views': [
+                (name, bytes(bv['data']), bv['target'], bv['byteoffset'])
+                for name, bv in self.buffer_views.items()
+            ],
+            'accessors': [
+                (a.name, a.buffer_view, a.byte_offset, a.byte_stride, a.component_type, a.count, a.type,
+                 a.min, a.max, a.extensions)
+                for a in self.accessors.values()
+            ],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a buffer from the result of get_state."""
+        buf = cls('', state['uri'])
+        buf.name = state['name']
+        buf.bytelength = state['bytelength']
+
+        for name, data, target, byteoffset in state['views']:
+            buf.buffer_views[name] = {
+                'data': bytearray(data),
+                'target': target,
+                'bytelength': len(data),
+                'byteoffset': byteoffset,
+            }
+
+        for name, view, offset, stride, ctype, count, type, lows, highs, extensions in state['accessors']:
+            accessor = cls.Accessor(name, buf, view, offset, stride, ctype, count, type)
+            accessor.min = list(lows)
+            accessor.max = list(highs)
+            accessor.extensions = extensions
+            buf.accessors[name] = accessor
+
+        return buf
+
 
 g_buffers = []
 
+# Lowercased names of the files written next to the glTF by this export
+g_output_files = set()
+
+
+def _output_file_name(name, extension):
+    """Return a name for a file written next to the glTF, made from a
+    datablock name.
+
+    Anything that is not safe in a file name (path separators, drive
+    letters, ...) is replaced with an underscore, and a number is added if
+    another file of this export already has the name. Names are compared
+    ignoring case, since not every file system tells them apart.
+    """
+    base = re.sub(r'[^\w\-. ]', '_', name).strip('. ') or 'unnamed'
+    fname = base + extension
+    number = 1
+    while fname.lower() in g_output_files:
+        fname = '{}_{}{}'.format(base, number, extension)
+        number += 1
+    g_output_files.add(fname.lower())
+    return fname
+
 
 def togl(matrix):
     return [i for col in matrix.col for i in col]
 
 
+def _code_version():
+    """Fingerprint the exporter's own source, so entries cached by another
+    version of it are never reused."""
+    fingerprint = export_cache.Fingerprint()
+    for module in (sys.modules[__name__], mesh_processing, animation_processing, image_processing,
+                   shader_converter, export_cache):
+        with open(module.__file__, 'rb') as fin:
+            fingerprint.update(fin.read())
+    return fingerprint.hexdigest()
+
+
+def _settings_values(settings, prefix):
+    """Return the settings starting with prefix, e.g. 'meshes_'."""
+    return {key: value for key, value in settings.items() if key.startswith(prefix)}
+
+
+def _matrix_values(matrix):
+    return [tuple(row) for row in matrix]
+
+
+def _foreach_values(collection, attr, width, typecode='f'):
+    """Read attr of every item of a bpy collection in one foreach_get and
+    return the raw bytes of the values."""
+    if np is not None:
+        values = np.empty(len(collection) * width, dtype=np.float32 if typecode == 'f' else np.int32)
+        collection.foreach_get(attr, values)
+        return values.tobytes()
+
+    values = [0] * (len(collection) * width)
+    collection.foreach_get(attr, values)
+    return array.array(typecode, values).tobytes()
+
+
+def _plain_value(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if not isinstance(value, str) and hasattr(value, '__len__'):
+        return [_plain_value(item) for item in value]
+    return value
+
+
+def _fingerprint_object(fingerprint, obj):
+    fingerprint.update(obj.name, _matrix_values(obj.matrix_world))
+    if obj.pose is not None:
+        for pbone in obj.pose.bones:
+            fingerprint.update(pbone.name, _matrix_values(pbone.matrix))
+
+
+def _fingerprint_rna(fingerprint, struct):
+    """Add the simple RNA properties of a modifier, constraint or similar
+    struct to a fingerprint.
+
+    Objects it points to contribute their transform and pose, so a change
+    to e.g. the armature deforming a mesh is noticed. Other datablocks only
+    contribute their name.
+    """
+    for prop in struct.bl_rna.properties:
+        if prop.identifier == 'rna_type' or prop.type == 'COLLECTION':
+            continue
+
+        value = getattr(struct, prop.identifier, None)
+        if prop.type == 'POINTER':
+            if isinstance(value, bpy.types.Object):
+                _fingerprint_object(fingerprint, value)
+            elif isinstance(value, bpy.types.ID):
+                fingerprint.update(value.name)
+        else:
+            fingerprint.update(prop.identifier, _plain_value(value))
+
+
+def _restore_cache_entry(entry):
+    """Add the buffers of a cache entry to g_buffers and return its value."""
+    buffers = [Buffer.from_state(state) for state in entry['buffers']]
+    g_buffers.extend(buffers)
+
+    # 32-bit indices need the extension whether or not they were cached
+    for buf in buffers:
+        for accessor in buf.accessors.values():
+            if accessor.component_type == Buffer.UNSIGNED_INT and \
+                    buf.buffer_views[accessor.buffer_view]['target'] == Buffer.ELEMENT_ARRAY_BUFFER and \
+                    OES_ELEMENT_INDEX_UINT not in g_glExtensionsUsed:
+                g_glExtensionsUsed.append(OES_ELEMENT_INDEX_UINT)
+
+    return entry['value']
+
+
+def _store_cache_entry(kind, key, value, first_buffer, **extra):
+    """Cache value along with the buffers added to g_buffers since
+    g_buffers[first_buffer]."""
+    entry = dict(extra, value=value, buffers=[buf.get_state() for buf in g_buffers[first_buffer:]])
+    g_cache.put(kind, key, entry)
+
+
 def export_cameras(cameras):
     def export_camera(camera):
         if camera.type == 'ORTHO':
@@ -353,6 +670,19 @@ def export_cameras(cameras):
     return {camera.name: export_camera(camera) for camera in cameras}
 
 
+def _convert_shader(shader_data, settings):
+    """Convert the GLSL Blender generated for the asset profile, reusing
+    the conversion of identical source from the cache directory."""
+    profile = settings['asset_profile']
+    key = shader_converter.conversion_key(shader_data, profile)
+    conversion = g_cache.get('shaders', ('shader', key)) if g_cache is not None else None
+    if conversion is None:
+        conversion = shader_converter.convert(shader_data, profile, key)
+        if g_cache is not None:
+            g_cache.put('shaders', ('shader', key), conversion)
+    shader_converter.apply_conversion(shader_data, conversion)
+
+
 def export_materials(settings, materials, shaders, programs, techniques):
     def export_material(material):
         return {
@@ -366,6 +696,17 @@ def export_materials(settings, materials, shaders, programs, techniques):
                     'uv_layers': [ts.uv_layer for ts in material.texture_slots if ts]
                 }
             }
+    # Materials often end up with identical shaders, each is exported once
+    # and shared by their programs
+    shader_names = {}
+
+    def export_shader(name, shader_type, src):
+        if (shader_type, src) not in shader_names:
+            uri = 'data:text/plain;base64,' + base64.b64encode(src.encode()).decode('ascii')
+            shaders[name] = {'type': shader_type, 'uri': uri}
+            shader_names[(shader_type, src)] = name
+        return shader_names[(shader_type, src)]
+
     exp_materials = {}
     for material in materials:
         if settings['materials_export_shader'] == False:
@@ -373,22 +714,15 @@ def export_materials(settings, materials, shaders, programs, techniques):
         else:
             # Handle shaders
             shader_data = gpu.export_shader(bpy.context.scene, material)
-            if settings['asset_profile'] == 'DESKTOP':
-                shader_converter.to_130(shader_data)
-            else:
-                shader_converter.to_web(shader_data)
-            fs_bytes = shader_data['fragment'].encode()
-            fs_uri = 'data:text/plain;base64,' + base64.b64encode(fs_bytes).decode('ascii')
-            shaders[material.name+'FS'] = {'type': 35632, 'uri': fs_uri}
-            vs_bytes = shader_data['vertex'].encode()
-            vs_uri = 'data:text/plain;base64,' + base64.b64encode(vs_bytes).decode('ascii')
-            shaders[material.name+'VS'] = {'type': 35633, 'uri': vs_uri}
+            g_profiler.call(_convert_shader, shader_data, settings)
+            fs_name = export_shader(material.name+'FS', 35632, shader_data['fragment'])
+            vs_name = export_shader(material.name+'VS', 35633, shader_data['vertex'])
 
             # Handle programs
             programs[material.name+'Program'] = {
                 'attributes' : [a['varname'] for a in shader_data['attributes']],
-                'fragmentShader' : material.name+'FS',
-                'vertexShader' : material.name+'VS',
+                'fragmentShader' : fs_name,
+                'vertexShader' : vs_name,
             }
 
             # Handle parameters/values
@@ -458,143 +792,417 @@ def export_materials(settings, materials, shaders, programs, techniques):
     return exp_materials
 
 
-def export_meshes(settings, meshes, skinned_meshes, mesh_names):
-    def export_mesh(me):
+def _top_influences(vertex):
+    """Return the joints and weights of the four most influential groups."""
+    groups = sorted(vertex.groups, key=lambda group: group.weight, reverse=True)[:4]
+    joints = [group.group for group in groups] + [0] * (4 - len(groups))
+    weights = [group.weight for group in groups] + [0.0] * (4 - len(groups))
+    return joints, weights
+
+
+def _extract_mesh(mesh, is_skinned, settings):
+    """Copy everything export_meshes needs out of a mesh into plain arrays.
+
+    Position, normal and UVs of every loop are packed into one record per
+    loop. With NumPy everything is read in bulk using foreach_get, without
+    it the arrays are plain lists. See mesh_processing.process_mesh for the
+    layout of the returned dict.
+    """
+    mesh.calc_normals_split()
+    mesh.calc_tessface()
+
+    num_loops = len(mesh.loops)
+    num_uv_layers = len(mesh.uv_layers)
+
+    data = {
+        'name': mesh.name,
+        'materials': [ma.name if ma else '' for ma in mesh.materials],
+        'uv_layers': [layer.name for layer in mesh.uv_layers],
+        'normal_epsilon': settings['meshes_weld_normal_epsilon'],
+        'optimize_vertex_cache': settings['meshes_optimize_vertex_cache'],
+        'measure_vertex_cache': g_profiler.enabled,
+        # UNSIGNED_SHORT indices reach 65535
+        'max_vertices': 65536 if settings['meshes_split_primitives'] else 0,
+        'joints': None,
+        'weights': None,
+    }
+
+    if np is not None:
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('co', co)
+        loop_vertices = np.empty(num_loops, dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loop_vertices)
+        normals = np.empty(num_loops * 3, dtype=np.float32)
+        mesh.loops.foreach_get('normal', normals)
+
+        records = np.empty((num_loops, 6 + num_uv_layers * 2), dtype=np.float32)
+        records[:, 0:3] = co.reshape(-1, 3)[loop_vertices]
+        records[:, 3:6] = normals.reshape(-1, 3)
+        uvs = np.empty(num_loops * 2, dtype=np.float32)
+        for i, layer in enumerate(mesh.uv_layers):
+            layer.data.foreach_get('uv', uvs)
+            records[:, 6 + i * 2:8 + i * 2] = uvs.reshape(-1, 2)
+
+        num_polygons = len(mesh.polygons)
+        for key, attr in (('loop_starts', 'loop_start'),
+                          ('loop_totals', 'loop_total'),
+                          ('material_indices', 'material_index')):
+            data[key] = np.empty(num_polygons, dtype=np.int32)
+            mesh.polygons.foreach_get(attr, data[key])
+
+        if is_skinned:
+            data['joints'] = np.zeros((len(mesh.vertices), 4), dtype=np.int32)
+            data['weights'] = np.zeros((len(mesh.vertices), 4), dtype=np.float32)
+            for vertex in mesh.vertices:
+                data['joints'][vertex.index], data['weights'][vertex.index] = _top_influences(vertex)
+    else:
+        vertices = mesh.vertices
+        uv_layers = [layer.data for layer in mesh.uv_layers]
+
+        loop_vertices = [loop.vertex_index for loop in mesh.loops]
+        records = []
+        for loop in mesh.loops:
+            record = vertices[loop.vertex_index].co[:] + loop.normal[:]
+            for uvs in uv_layers:
+                record += uvs[loop.index].uv[:]
+            records.append(record)
+
+        data['loop_starts'] = [poly.loop_start for poly in mesh.polygons]
+        data['loop_totals'] = [poly.loop_total for poly in mesh.polygons]
+        data['material_indices'] = [poly.material_index for poly in mesh.polygons]
+
+        if is_skinned:
+            influences = [_top_influences(vertex) for vertex in vertices]
+            data['joints'] = [joints for joints, _ in influences]
+            data['weights'] = [weights for _, weights in influences]
+
+    data['records'] = records
+    data['loop_vertices'] = loop_vertices
+
+    return data
+
+
+def _uses_other_objects(ob, settings):
+    """Return whether the exported mesh of ob depends on other objects,
+    like the armature deforming it, or on where ob itself is."""
+    if ob.find_armature() is not None:
+        return True
+
+    if not settings['meshes_apply_modifiers']:
+        return False
+
+    for modifier in ob.modifiers:
+        # Textures mapped in global or object space read the transform of ob
+        if getattr(modifier, 'texture_coords', None) in ('GLOBAL', 'OBJECT'):
+            return True
+        if getattr(modifier, 'mask_tex_mapping', None) in ('GLOBAL', 'OBJECT'):
+            return True
+        if any(prop.type == 'POINTER' and isinstance(getattr(modifier, prop.identifier, None), bpy.types.Object)
+               for prop in modifier.bl_rna.properties):
+            return True
+
+    return False
+
+
+def _bakes_global_matrix(ob):
+    """Return whether the global matrix is baked into the exported mesh of
+    ob rather than put on its node.
+
+    Joint matrices replace the node transform of skinned meshes, and
+    BLENDER_actions channels and child nodes use the plain transform of
+    ob, so only meshes of static objects outside of a hierarchy can keep
+    the global matrix on their node.
+    """
+    return (ob.find_armature() is not None or ob.parent is not None or bool(ob.children) or
+            ob.animation_data is not None)
+
+
+def _modifier_signature(ob, settings):
+    """Return a key that is equal for users of the same mesh whose
+    modifiers turn it into the same geometry, so they can share it."""
+    if _uses_other_objects(ob, settings) or _bakes_global_matrix(ob):
+        # The result depends on where ob is
+        return ob.name
+
+    fingerprint = export_cache.Fingerprint()
+    if settings['meshes_apply_modifiers']:
+        for modifier in ob.modifiers:
+            fingerprint.update(modifier.type)
+            _fingerprint_rna(fingerprint, modifier)
+    return fingerprint.hexdigest()
+
+
+def _mesh_fingerprint(ob, settings):
+    """Fingerprint everything that goes into the exported mesh of ob:
+    its mesh data, vertex weights if it is skinned, shape keys, modifiers
+    and, if the mesh depends on where ob is, the transform of ob and the
+    global matrix.
+
+    Anything outside of these, like a texture driving a displace
+    modifier, is not noticed. Clear the cache if such changes do not
+    show up in the export.
+    """
+    mesh = ob.data
+    mesh.calc_normals_split()
+    is_skinned = ob.find_armature() is not None
+
+    fingerprint = export_cache.Fingerprint(
+        'mesh',
+        mesh.name,
+        is_skinned,
+        _settings_values(settings, 'meshes_'),
+        [ma.name if ma else '' for ma in mesh.materials],
+        _foreach_values(mesh.vertices, 'co', 3),
+        _foreach_values(mesh.loops, 'vertex_index', 1, 'i'),
+        _foreach_values(mesh.loops, 'normal', 3),
+        _foreach_values(mesh.polygons, 'loop_start', 1, 'i'),
+        _foreach_values(mesh.polygons, 'loop_total', 1, 'i'),
+        _foreach_values(mesh.polygons, 'material_index', 1, 'i'),
+    )
+
+    for layer in mesh.uv_layers:
+        fingerprint.update(layer.name, _foreach_values(layer.data, 'uv', 2))
+
+    if is_skinned:
+        fingerprint.update([(g.group, g.weight) for vertex in mesh.vertices for g in vertex.groups])
+
+    if mesh.shape_keys is not None:
+        for block in mesh.shape_keys.key_blocks:
+            fingerprint.update(block.name, block.value, block.mute, _foreach_values(block.data, 'co', 3))
+
+    fingerprint.update(_modifier_signature(ob, settings))
+    if _uses_other_objects(ob, settings) or _bakes_global_matrix(ob):
+        fingerprint.update(_matrix_values(ob.matrix_world))
+    if _bakes_global_matrix(ob):
+        fingerprint.update(_matrix_values(settings['global_matrix']))
+
+    return fingerprint.hexdigest()
+
+
+def _process_meshes(settings, mesh_data):
+    """Run mesh_processing.process_mesh on every mesh, in a process pool if
+    meshes_worker_processes asks for one. Results keep the input order."""
+    workers = settings['meshes_worker_processes']
+    if workers > 1 and len(mesh_data) > 1:
+        # Workers must not import bpy, so they are forked from Blender
+        # rather than spawned as new interpreters.
+        if 'fork' in multiprocessing.get_all_start_methods():
+            try:
+                context = multiprocessing.get_context('fork')
+                executor = concurrent.futures.ProcessPoolExecutor(workers, mp_context=context)
+            except TypeError:
+                # Before Python 3.7 the pool always uses the default start
+                # method, which is fork wherever fork is available
+                executor = concurrent.futures.ProcessPoolExecutor(workers)
+            with executor:
+                return list(executor.map(mesh_processing.process_mesh, mesh_data))
+
+        log.warning('Process pools need fork, which this platform does not have, exporting meshes serially')
+
+    results = []
+    for data in mesh_data:
+        with g_profiler.stage('process_mesh', data['name']):
+            results.append(mesh_processing.process_mesh(data))
+    return results
+
+
+def _columns(rows, start, end):
+    """Select a range of columns from extracted vertex data.
+
+    Works on both NumPy arrays and the lists of tuples produced without
+    NumPy, returning something Accessor.write_array accepts.
+    """
+    if np is not None:
+        return rows[:, start:end]
+    return [value for row in rows for value in row[start:end]]
+
+
+def _vertex_rows(values, first, count, width):
+    """Select count vertices starting at first from the rows returned by
+    _columns and the mesh_processing.quantize_* functions."""
+    if np is not None:
+        return values[first:first + count]
+    return values[first * width:(first + count) * width]
+
+
+def _write_quantized(accessor, values, offsets, scales):
+    """Write quantized values to accessor and describe how to decode them
+    (offset + value * scale per component) with WEB3D_quantized_attributes.
+    """
+    # decodedMin and decodedMax follow from the bounds, so they have to be
+    # the exact bounds rather than ones that include zero
+    if accessor.count:
+        accessor.min = [float('inf')] * accessor.type_size
+        accessor.max = [float('-inf')] * accessor.type_size
+    accessor.write_array(values)
+
+    size = accessor.type_size
+    decode_matrix = [0.0] * (size + 1) ** 2
+    for i in range(size):
+        decode_matrix[i * (size + 1) + i] = scales[i]
+        decode_matrix[size * (size + 1) + i] = offsets[i]
+    decode_matrix[-1] = 1.0
+
+    accessor.extensions = {
+        WEB3D_QUANTIZED_ATTRIBUTES: {
+            'decodeMatrix': decode_matrix,
+            'decodedMin': [offset + low * scale for offset, low, scale in zip(offsets, accessor.min, scales)],
+            'decodedMax': [offset + high * scale for offset, high, scale in zip(offsets, accessor.max, scales)],
+        },
+    }
+
+
+def export_meshes(settings, meshes, skinned_meshes, mesh_names, cache_entries=None):
+    quantize = settings['meshes_quantize_attributes']
+    rebase = settings['meshes_rebase_indices']
+    if settings['meshes_quantize_normals'] == 'BYTE':
+        normal_type, normal_max, normal_size = Buffer.BYTE, 127, 4
+    else:
+        normal_type, normal_max, normal_size = Buffer.SHORT, 32767, 8
+
+    def export_mesh(data, result):
         # glTF data
         gltf_mesh = {
-                'name': mesh_names[me.name],
+                'name': mesh_names[data['name']],
                 'primitives': [],
             }
 
-        is_skinned = me.name in skinned_meshes
+        is_skinned = data['joints'] is not None
 
-        me.calc_normals_split()
-        me.calc_tessface()
-
-        num_loops = len(me.loops)
-        num_uv_layers = len(me.uv_layers)
-        vertex_size = (3 + 3 + num_uv_layers * 2) * 4
+        num_uv_layers = len(data['uv_layers'])
+        if quantize:
+            # Normals are padded to keep every attribute 4-byte aligned
+            vertex_size = 3 * 4 + normal_size + num_uv_layers * 2 * 2
+        else:
+            vertex_size = (3 + 3 + num_uv_layers * 2) * 4
 
-        buf = Buffer(me.name)
-        skin_buf = Buffer('{}_skin'.format(me.name))
+        buf = Buffer(data['name'])
+        skin_buf = Buffer('{}_skin'.format(data['name']))
 
         # Vertex data
-
-        vert_list = { Vertex(me, loop) : 0 for loop in me.loops}.keys()
-        num_verts = len(vert_list)
+        vertex_data = result['vertex_data']
+        num_verts = len(vertex_data)
         va = buf.add_view(vertex_size * num_verts, Buffer.ARRAY_BUFFER)
-        vdata = buf.add_accessor(va, 0, vertex_size, Buffer.FLOAT, num_verts, Buffer.VEC3)
-        ndata = buf.add_accessor(va, 12, vertex_size, Buffer.FLOAT, num_verts, Buffer.VEC3)
-        tdata = [buf.add_accessor(va, 24 + 8 * i, vertex_size, Buffer.FLOAT, num_verts, Buffer.VEC2) for i in range(num_uv_layers)]
 
-        skin_vertex_size = (4 + 4) * 4
+        if quantize and is_skinned:
+            joints = result['joints']
+            max_joint = int(joints.max()) if np is not None and len(joints) else max(map(max, joints), default=0)
+            joint_type, joint_size = (Buffer.UNSIGNED_BYTE, 1) if max_joint < 256 else (Buffer.UNSIGNED_SHORT, 2)
+            skin_vertex_size = 4 * joint_size + 4
+            weight_type = Buffer.UNSIGNED_BYTE
+        else:
+            joint_type, joint_size = Buffer.FLOAT, 4
+            skin_vertex_size = (4 + 4) * 4
+            weight_type = Buffer.FLOAT
         skin_va = skin_buf.add_view(skin_vertex_size * num_verts, Buffer.ARRAY_BUFFER)
-        jdata = skin_buf.add_accessor(skin_va, 0, skin_vertex_size, Buffer.FLOAT, num_verts, Buffer.VEC4)
-        wdata = skin_buf.add_accessor(skin_va, 16, skin_vertex_size, Buffer.FLOAT, num_verts, Buffer.VEC4)
-
-        # Copy vertex data
-        for i, vtx in enumerate(vert_list):
-            vtx.index = i
-            co = vtx.co
-            normal = vtx.normal
-
-            for j in range(3):
-                vdata[(i * 3) + j] = co[j]
-                ndata[(i * 3) + j] = normal[j]
 
-            for j, uv in enumerate(vtx.uvs):
-                tdata[j][i * 2] = uv.x
-                tdata[j][i * 2 + 1] = uv.y
-
-        if is_skinned:
-            for i, vtx in enumerate(vert_list):
-                joints = vtx.joint_indexes
-                weights = vtx.weights
-
-                for j in range(4):
-                    jdata[(i * 4) + j] = joints[j]
-                    wdata[(i * 4) + j] = weights[j]
-
-        # For each material, make an empty primitive set.
-        # This dictionary maps material names to list of indices that form the
-        # part of the mesh that the material should be applied to.
-        prims = {ma.name if ma else '': [] for ma in me.materials}
-        if not prims:
-            prims = {'': []}
-
-        # Index data
-        # Map loop indices to vertices
-        vert_dict = {i : v for v in vert_list for i in v.loop_indices}
-
-        max_vert_index = 0
-        for poly in me.polygons:
-            # Find the primitive that this polygon ought to belong to (by
-            # material).
-            if len(me.materials) == 0:
-                prim = prims['']
+        # Vertex ranges may overlap, so everything is quantized once and
+        # every range writes the same values
+        if quantize:
+            normals = mesh_processing.quantize_unit(_columns(vertex_data, 3, 6), normal_max)
+            uvs = [
+                mesh_processing.quantize_range(_columns(vertex_data, 6 + i * 2, 8 + i * 2), 2, 65535)
+                for i in range(num_uv_layers)
+            ]
+            if is_skinned:
+                weights = mesh_processing.quantize_weights(_columns(result['weights'], 0, 4), 255)
+
+        def export_attributes(first, count):
+            # Add and fill accessors for count vertices starting at first,
+            # all of them on the interleaved vertex views
+            offset = first * vertex_size
+            rows = vertex_data[first:first + count]
+            vdata = buf.add_accessor(va, offset, vertex_size, Buffer.FLOAT, count, Buffer.VEC3)
+            if quantize:
+                ndata = buf.add_accessor(va, offset + 12, vertex_size, normal_type, count, Buffer.VEC3)
+                tdata = [buf.add_accessor(va, offset + 12 + normal_size + 4 * i, vertex_size, Buffer.UNSIGNED_SHORT, count, Buffer.VEC2) for i in range(num_uv_layers)]
             else:
-                mat = me.materials[poly.material_index]
-                prim = prims[mat.name if mat else '']
-
-            # Find the (vertex) index associated with each loop in the polygon.
-            indices = [vert_dict[i].index for i in poly.loop_indices]
-
-            # Used to determine whether a mesh must be split.
-            max_vert_index = max(max_vert_index, max(indices))
-
-            if len(indices) == 3:
-                # No triangulation necessary
-                prim += indices
-            elif len(indices) > 3:
-                # Triangulation necessary
-                for i in range(len(indices) - 2):
-                    prim += (indices[-1], indices[i], indices[i + 1])
+                ndata = buf.add_accessor(va, offset + 12, vertex_size, Buffer.FLOAT, count, Buffer.VEC3)
+                tdata = [buf.add_accessor(va, offset + 24 + 8 * i, vertex_size, Buffer.FLOAT, count, Buffer.VEC2) for i in range(num_uv_layers)]
+
+            skin_offset = first * skin_vertex_size
+            jdata = skin_buf.add_accessor(skin_va, skin_offset, skin_vertex_size, joint_type, count, Buffer.VEC4)
+            wdata = skin_buf.add_accessor(skin_va, skin_offset + 4 * joint_size, skin_vertex_size, weight_type, count, Buffer.VEC4)
+
+            # Copy vertex data
+            vdata.write_array(_columns(rows, 0, 3))
+            if quantize:
+                _write_quantized(ndata, _vertex_rows(normals, first, count, 3),
+                                 [0.0] * 3, [1.0 / normal_max] * 3)
+                for accessor, (values, offsets, scales) in zip(tdata, uvs):
+                    _write_quantized(accessor, _vertex_rows(values, first, count, 2), offsets, scales)
             else:
-                # Bad polygon
-                raise RuntimeError(
-                    "Invalid polygon with {} vertices.".format(len(indices))
-                )
-
-        if max_vert_index > 65535:
-            # Use the integer index extension
-            if OES_ELEMENT_INDEX_UINT not in g_glExtensionsUsed:
-                g_glExtensionsUsed.append(OES_ELEMENT_INDEX_UINT)
+                ndata.write_array(_columns(rows, 3, 6))
+                for i, accessor in enumerate(tdata):
+                    accessor.write_array(_columns(rows, 6 + i * 2, 8 + i * 2))
 
-        for mat, prim in prims.items():
-            # For each primitive set add an index buffer and accessor.
+            if is_skinned:
+                jdata.write_array(_columns(result['joints'][first:first + count], 0, 4))
+                if quantize:
+                    _write_quantized(wdata, _vertex_rows(weights, first, count, 4), [0.0] * 4, [1.0 / 255] * 4)
+                else:
+                    wdata.write_array(_columns(result['weights'][first:first + count], 0, 4))
 
-            # If we got this far use integers if we have to, if this is not
-            # desirable we would have bailed out by now.
-            if max_vert_index > 65535:
+            attributes = {
+                'POSITION': vdata.name,
+                'NORMAL': ndata.name,
+            }
+            for i, v in enumerate(tdata):
+                attributes['TEXCOORD_' + data['uv_layers'][i]] = v.name
+
+            if is_skinned:
+                attributes['JOINT'] = jdata.name
+                attributes['WEIGHT'] = wdata.name
+            return attributes
+
+        # Index data. Primitives indexing the same vertex range share their
+        # attributes.
+        range_attributes = {}
+        for (mat, prim), vertex_range in zip(result['prims'], result['vertex_ranges']):
+            # For each primitive set add an index buffer and accessor.
+            if not len(prim):
+                low, high = 0, 0
+            elif np is not None:
+                low, high = int(prim.min()), int(prim.max())
+            else:
+                low, high = min(prim), max(prim)
+            if vertex_range is None and rebase and len(prim):
+                # Only expose the vertices the primitive uses, so its
+                # indices start at 0 and may fit a smaller type
+                vertex_range = (low, high - low + 1)
+                prim = [i - low for i in prim] if np is None else prim - low
+                high -= low
+            if vertex_range is None:
+                vertex_range = (0, num_verts)
+            if vertex_range not in range_attributes:
+                range_attributes[vertex_range] = export_attributes(*vertex_range)
+
+            # Use the smallest index type that fits. Primitives too large to
+            # split (with meshes_split_primitives off) need integer indices
+            # and the extension for them.
+            if high > 65535:
                 itype = Buffer.UNSIGNED_INT
                 istride = 4
-            else:
+                if OES_ELEMENT_INDEX_UINT not in g_glExtensionsUsed:
+                    g_glExtensionsUsed.append(OES_ELEMENT_INDEX_UINT)
+            elif high > 255:
                 itype = Buffer.UNSIGNED_SHORT
                 istride = 2
+            else:
+                itype = Buffer.UNSIGNED_BYTE
+                istride = 1
 
-            ib = buf.add_view(istride * len(prim), Buffer.ELEMENT_ARRAY_BUFFER)
+            ib = buf.add_view(istride * len(prim), Buffer.ELEMENT_ARRAY_BUFFER, istride)
             idata = buf.add_accessor(ib, 0, istride, itype, len(prim),
                                      Buffer.SCALAR)
-
-            for i, v in enumerate(prim):
-                idata[i] = v
+            idata.write_array(prim)
 
             gltf_prim = {
-                'attributes': {
-                    'POSITION': vdata.name,
-                    'NORMAL': ndata.name,
-                },
+                'attributes': dict(range_attributes[vertex_range]),
                 'indices': idata.name,
                 'mode': 4,
                 'material': mat,
             }
-            for i, v in enumerate(tdata):
-                gltf_prim['attributes']['TEXCOORD_' + me.uv_layers[i].name] = v.name
-
-            if is_skinned:
-                gltf_prim['attributes']['JOINT'] = jdata.name
-                gltf_prim['attributes']['WEIGHT'] = wdata.name
-
             gltf_mesh['primitives'].append(gltf_prim)
 
         g_buffers.append(buf)
@@ -602,9 +1210,35 @@ def export_meshes(settings, meshes, skinned_meshes, mesh_names):
             g_buffers.append(skin_buf)
         return gltf_mesh
 
+    # cache_entries maps mesh names to their cache key and cached entry, the
+    # entry is None for meshes that still need to be exported
+    cache_entries = cache_entries or {}
+
+    # Pull the geometry out of Blender first, the rest only needs the arrays
+    mesh_data = []
+    for me in meshes:
+        if cache_entries.get(me.name, (None, None))[1] is None:
+            with g_profiler.stage('extract_mesh', me.name):
+                mesh_data.append(_extract_mesh(me, me.name in skinned_meshes, settings))
+    results = g_profiler.call(_process_meshes, settings, mesh_data)
+    processed = {data['name']: (data, result) for data, result in zip(mesh_data, results)}
+    for data, result in zip(mesh_data, results):
+        if result['acmr'] is not None:
+            g_profiler.record('vertex_cache', data['name'], acmr_before=result['acmr'][0],
+                              acmr_after=result['acmr'][1])
+
     exported_meshes = {}
     for me in meshes:
-        gltf_mesh = export_mesh(me)
+        key, entry = cache_entries.get(me.name, (None, None))
+        if entry is not None:
+            gltf_mesh = _restore_cache_entry(entry)
+        else:
+            first_buffer = len(g_buffers)
+            with g_profiler.stage('export_mesh', me.name):
+                gltf_mesh = export_mesh(*processed[me.name])
+            if key is not None:
+                _store_cache_entry('meshes', key, gltf_mesh, first_buffer, name=me.name)
+
         if gltf_mesh != None:
             exported_meshes.update({mesh_names[me.name]: gltf_mesh})
     return exported_meshes
@@ -624,10 +1258,7 @@ def export_skins(skinned_meshes):
         buf_view = buf.add_view(element_size * num_elements, None)
         idata = buf.add_accessor(buf_view, 0, element_size, Buffer.FLOAT, num_elements, Buffer.MAT4)
 
-        for i in range(num_elements):
-            mat = togl(mathutils.Matrix.Identity(4))
-            for j in range(16):
-                idata[(i * 16) + j] = mat[j]
+        idata.write_array(togl(mathutils.Matrix.Identity(4)) * num_elements)
 
         gltf_skin['inverseBindMatrices'] = idata.name
         g_buffers.append(buf)
@@ -696,7 +1327,7 @@ def export_lights(lamps):
 
     return gltf
 
-def export_nodes(objects, skinned_meshes, modded_meshes, mesh_names):
+def export_nodes(settings, objects, skinned_meshes, modded_meshes, mesh_names):
     def export_physics(obj):
         rb = obj.rigid_body
         physics =  {
@@ -719,10 +1350,16 @@ def export_nodes(objects, skinned_meshes, modded_meshes, mesh_names):
         }
 
         if obj.type == 'MESH':
+            # Meshes are exported in object space and may be shared by
+            # several nodes, so the global matrix goes on the node unless
+            # it is baked into the mesh
+            if not _bakes_global_matrix(obj):
+                ob['matrix'] = togl(settings['global_matrix'] * obj.matrix_world)
             mesh = modded_meshes.get(obj.name, obj.data)
             ob['meshes'] = [mesh_names[mesh.name]]
             if obj.find_armature():
                 ob['skeletons'] = ['{}_root'.format(obj.find_armature().data.name)]
+                ob['skin'] = '{}_skin'.format(mesh.name)
                 skinned_meshes[mesh.name] = obj
         elif obj.type == 'LAMP':
             ob['extras'] = {'light': obj.data.name}
@@ -783,7 +1420,17 @@ def export_scenes(scenes):
     return {scene.name: export_scene(scene) for scene in scenes}
 
 
-def export_buffers():
+def _combine_buffers(combined):
+    """Pack the views of every buffer in g_buffers into combined."""
+    global g_buffers
+
+    for buf in g_buffers:
+        combined.add_buffer(buf)
+
+    g_buffers = [combined] if combined.buffer_views else []
+
+
+def export_buffers(settings):
     gltf = {
         'buffers': {},
         'bufferViews': {},
@@ -791,25 +1438,188 @@ def export_buffers():
     }
 
     for buf in g_buffers:
-        gltf['buffers'][buf.name] = buf.export_buffer()
+        gltf['buffers'][buf.name] = buf.export_buffer(settings)
         gltf['bufferViews'].update(buf.export_views())
         gltf['accessors'].update(buf.export_accessors())
 
     return gltf
 
 
+def _image_pixels(image):
+    """Read the pixels of an image as float32 values.
+
+    Pixel arrays have no foreach_get in Blender 2.7x, so they are read with a
+    single slice, which still copies them in one call instead of one Python
+    access per value.
+    """
+    pixels = image.pixels[:]
+    if np is not None:
+        return np.array(pixels, dtype=np.float32)
+    return array.array('f', pixels)
+
+
+def _image_file_data(image):
+    """Return the data of the PNG or JPEG file an unmodified image was
+    loaded from (or packed as) and its MIME type, or (None, None)."""
+    if image.is_dirty:
+        return None, None
+
+    data = None
+    if image.packed_file is not None:
+        data = image.packed_file.data
+    elif image.source == 'FILE':
+        path = bpy.path.abspath(image.filepath)
+        if os.path.isfile(path):
+            with open(path, 'rb') as fin:
+                data = fin.read()
+
+    mime_type = image_processing.sniff_mime_type(data) if data else None
+    if mime_type is None:
+        return None, None
+    return data, mime_type
+
+
+# Extensions left out of the names of resized images, which are always PNG
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tga', '.bmp', '.tif', '.tiff', '.exr', '.hdr')
+
+
+def _image_export_size(image, settings):
+    """Return the size an image has to be resized to, to fit the texture
+    budget of the asset profile, or None to keep its size."""
+    width, height = image.size
+    if not settings['images_resize'] or not width or not height:
+        return None
+
+    budget = image_profile_map[settings['asset_profile']]
+    max_size = settings['images_max_size'] or budget['max_size']
+    size = image_processing.fit_size(width, height, max_size, budget['power_of_two'])
+    if size == (width, height):
+        return None
+
+    if np is None:
+        log.warning('Resizing images requires NumPy, exporting %s at %dx%d', image.name, width, height)
+        return None
+    if not settings['images_embed_data'] and not settings['gltf_output_dir']:
+        # Without a directory to write them to, images are referenced as
+        # they are rather than written to the working directory
+        log.warning('No output directory to write resized images to, exporting %s at %dx%d',
+                    image.name, width, height)
+        return None
+    return size
+
+
+def _image_fingerprint(image, settings, size):
+    """Fingerprint the data of an image: the size and modification time of
+    its file if it is an unmodified image loaded from disk, otherwise its
+    packed file or its pixels."""
+    fingerprint = export_cache.Fingerprint(
+        'image',
+        image.name,
+        image.filepath,
+        image.source,
+        image.size[:],
+        image.channels,
+        _settings_values(settings, 'images_'),
+        size,
+    )
+
+    path = bpy.path.abspath(image.filepath)
+    if image.is_dirty:
+        fingerprint.update(memoryview(_image_pixels(image)))
+    elif image.packed_file is not None:
+        fingerprint.update(image.packed_file.data)
+    elif image.source == 'FILE' and os.path.isfile(path):
+        stat = os.stat(path)
+        fingerprint.update(stat.st_size, stat.st_mtime)
+    else:
+        fingerprint.update(memoryview(_image_pixels(image)))
+
+    return fingerprint.hexdigest()
+
+
+def _encode_image(pixels, width, height, channels, size, resize_filter):
+    """Resize pixels to size (unless it is None) and encode them as PNG,
+    returning the data, its MIME type and the time it took. Runs in worker
+    threads, so it must not touch bpy."""
+    start = time.perf_counter()
+    if size is not None:
+        pixels = image_processing.resize(pixels, width, height, channels, size[0], size[1], resize_filter)
+        width, height = size
+    data = image_processing.encode_png(pixels, width, height, channels)
+    return data, 'image/png', time.perf_counter() - start
+
+
 def export_images(settings, images):
-    def export_image(image):
-        if settings['images_embed_data']:
-            pixels = bytearray([int(p * 255) for p in image.pixels])
-            uri = 'data:text/plain;base64,' + base64.b64encode(pixels).decode('ascii')
-        else:
-            uri = image.filepath.replace('//', '')
+    embed = settings['images_embed_data']
+
+    # Pixels are read from Blender on this thread, encoding them runs in a
+    # thread pool since zlib releases the GIL while it compresses
+    workers = settings['images_worker_threads']
+    executor = concurrent.futures.ThreadPoolExecutor(workers) if workers > 1 else None
+
+    # Only keep a couple of images per thread waiting, so their pixels do
+    # not all have to be in memory at once
+    pending = collections.deque()
+
+    jobs = []
+    exp_images = {}
+    try:
+        for image in images:
+            size = _image_export_size(image, settings)
+            if not embed and size is None:
+                # Reference the image file as it is
+                exp_images[image.name] = {'uri': image.filepath.replace('//', '')}
+                continue
+
+            key = _image_fingerprint(image, settings, size) if g_cache is not None and embed else None
+            entry = g_cache.get('images', key) if key is not None else None
+            if entry is not None:
+                exp_images[image.name] = _restore_cache_entry(entry)
+                g_profiler.record('images', image.name, source='cache', time=0.0)
+                continue
+
+            with g_profiler.stage('read_image', image.name):
+                data, mime_type = _image_file_data(image) if size is None else (None, None)
+                if data is not None:
+                    jobs.append((image.name, key, 'file', (data, mime_type, 0.0)))
+                    continue
+                args = (_image_pixels(image),) + tuple(image.size) + (image.channels, size,
+                                                                       settings['images_resize_filter'])
+
+            if executor is None:
+                jobs.append((image.name, key, 'png', _encode_image(*args)))
+            else:
+                future = executor.submit(_encode_image, *args)
+                jobs.append((image.name, key, 'png', future))
+                pending.append(future)
+                while len(pending) > 2 * workers:
+                    pending.popleft().result()
+
+        for name, key, source, result in jobs:
+            if isinstance(result, concurrent.futures.Future):
+                result = result.result()
+            data, mime_type, elapsed = result
+            if embed:
+                uri = 'data:{};base64,{}'.format(mime_type, base64.b64encode(data).decode('ascii'))
+            else:
+                # Resized images are written next to the glTF file
+                base, extension = os.path.splitext(name)
+                fname = _output_file_name(base if extension.lower() in IMAGE_EXTENSIONS else name, '.png')
+                with open(os.path.join(settings['gltf_output_dir'], fname), 'wb') as fout:
+                    fout.write(data)
+                uri = urllib.parse.quote(fname)
+            exp_images[name] = {
+                'uri': uri,
+            }
+            if key is not None:
+                _store_cache_entry('images', key, exp_images[name], len(g_buffers))
+            g_profiler.record('images', name, source=source, time=elapsed, size=len(data))
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-        return {
-            'uri': uri,
-        }
-    return {image.name: export_image(image) for image in images}
+    # Keep the order images were given in
+    return {image.name: exp_images[image.name] for image in images}
 
 
 def export_textures(textures):
@@ -846,59 +1656,390 @@ def export_textures(textures):
         if type(texture) == bpy.types.ImageTexture}
 
 
-def _can_object_use_action(obj, action):
-    for fcurve in action.fcurves:
-        path = fcurve.data_path
-        if not path.startswith('pose'):
-            return obj.animation_data is not None
+def _object_dependencies(obj):
+    """Return the names of the other objects the constraints (of obj and
+    its pose bones) and drivers of obj read."""
+    structs = [obj] + (list(obj.pose.bones) if obj.pose else [])
+    targets = []
+    for struct in structs:
+        for constraint in struct.constraints:
+            targets.extend(
+                getattr(constraint, prop.identifier, None)
+                for prop in constraint.bl_rna.properties if prop.type == 'POINTER'
+            )
+            # Armature constraints have a list of targets
+            targets.extend(target.target for target in getattr(constraint, 'targets', ()))
 
-        if obj.type == 'ARMATURE':
-            path = path.split('["')[-1]
-            path = path.split('"]')[0]
-            if path in [bone.name for bone in obj.data.bones]:
-                return True
+    if obj.animation_data:
+        for fcurve in obj.animation_data.drivers:
+            for variable in fcurve.driver.variables:
+                targets.extend(target.id for target in variable.targets)
 
-    return False
+    names = {target.name for target in targets if isinstance(target, bpy.types.Object)}
+    names.discard(obj.name)
+    return names
 
 
-def export_actions(actions):
-    def export_action(obj, action):
-        params = []
+def _action_targets(action):
+    """Return whether action animates objects themselves, and the set of
+    bone names its pose channels animate."""
+    animates_object = False
+    bone_names = set()
+    for fcurve in action.fcurves:
+        path = fcurve.data_path
+        if path.startswith('pose'):
+            bone_names.add(path.split('["')[-1].split('"]')[0])
+        else:
+            animates_object = True
+    return animates_object, bone_names
+
+
+def _action_fingerprint(obj, action, settings):
+    """Fingerprint what baking action on obj depends on: the keyframes of
+    the action, the rest pose and constraints of the object, and the
+    current values of the transform channels the action does not key.
+
+    Drivers and constraint targets that are not part of obj itself are not
+    noticed. Clear the cache if such changes do not show up in the export.
+    """
+    fingerprint = export_cache.Fingerprint(
+        'action',
+        obj.name,
+        obj.type,
+        obj.data.name if obj.data else '',
+        action.name,
+        _settings_values(settings, 'actions_'),
+        obj.parent.name if obj.parent else '',
+        _matrix_values(obj.matrix_parent_inverse),
+    )
+
+    keyed_paths = set()
+    for fcurve in action.fcurves:
+        keyed_paths.add(fcurve.data_path)
+        points = fcurve.keyframe_points
+        fingerprint.update(
+            fcurve.data_path,
+            fcurve.array_index,
+            fcurve.extrapolation,
+            _foreach_values(points, 'co', 2),
+            _foreach_values(points, 'handle_left', 2),
+            _foreach_values(points, 'handle_right', 2),
+            [point.interpolation for point in points],
+        )
+        for modifier in fcurve.modifiers:
+            fingerprint.update(modifier.type)
+            _fingerprint_rna(fingerprint, modifier)
+
+    def add_unkeyed_channels(struct, path_prefix):
+        fingerprint.update(struct.rotation_mode)
+        for channel in ('location', 'rotation_quaternion', 'rotation_euler', 'rotation_axis_angle', 'scale'):
+            if path_prefix + channel not in keyed_paths:
+                fingerprint.update(channel, list(getattr(struct, channel)))
+        for constraint in struct.constraints:
+            fingerprint.update(constraint.type)
+            _fingerprint_rna(fingerprint, constraint)
+
+    add_unkeyed_channels(obj, '')
+    if obj.type == 'ARMATURE':
+        for bone in obj.data.bones:
+            fingerprint.update(bone.name, bone.parent.name if bone.parent else '', _matrix_values(bone.matrix_local))
+        for pbone in obj.pose.bones:
+            add_unkeyed_channels(pbone, 'pose.bones["{}"].'.format(pbone.name))
+
+    return fingerprint.hexdigest()
+
+
+_TRANSFORM_CHANNELS = ('location', 'rotation_quaternion', 'rotation_euler', 'scale')
+_EULER_ORDERS = ('XYZ', 'XZY', 'YXZ', 'YZX', 'ZXY', 'ZYX')
+
+
+def _bone_rest_matrix(bone):
+    """Return the rest matrix of bone relative to its parent."""
+    if bone.parent:
+        return bone.parent.matrix_local.inverted() * bone.matrix_local
+    return bone.matrix_local
+
+
+def _can_sample_fcurves(obj, action):
+    """Return whether the transforms action gives obj and its pose bones
+    follow from the fcurves of action alone, so they can be computed
+    without evaluating the scene for every frame.
+
+    Constraints, drivers, NLA tracks, delta transforms, axis angle rotations
+    and bones that do not inherit rotation and scale rule this out, as do
+    fcurves of anything other than the transform channels.
+    """
+    anim_data = obj.animation_data
+    if anim_data.drivers or any(not track.mute for track in anim_data.nla_tracks):
+        return False
+
+    if (tuple(obj.delta_location) != (0.0, 0.0, 0.0) or
+            tuple(obj.delta_rotation_quaternion) != (1.0, 0.0, 0.0, 0.0) or
+            tuple(obj.delta_rotation_euler) != (0.0, 0.0, 0.0) or
+            tuple(obj.delta_scale) != (1.0, 1.0, 1.0)):
+        return False
+
+    structs = {'': obj}
+    if obj.type == 'ARMATURE':
+        for pbone in obj.pose.bones:
+            bone = pbone.bone
+            if not (bone.use_inherit_rotation and bone.use_inherit_scale and bone.use_local_location):
+                return False
+            structs['pose.bones["{}"]'.format(pbone.name)] = pbone
+
+    for struct in structs.values():
+        if struct.constraints:
+            return False
+        if struct.rotation_mode != 'QUATERNION' and struct.rotation_mode not in _EULER_ORDERS:
+            return False
 
-        exported_paths = {}
-        channels = {}
+    for fcurve in action.fcurves:
+        prefix, _, channel = fcurve.data_path.rpartition('.')
+        if prefix not in structs or channel not in _TRANSFORM_CHANNELS:
+            return False
+
+    return True
+
+
+def _sample_fcurves(obj, action, frames):
+    """Compute the same local transforms as baking action on obj at frames,
+    but by evaluating the fcurves of action directly.
+
+    Only valid if _can_sample_fcurves(obj, action) is true. Returns an
+    OrderedDict mapping obj.name and the pose bone names to lists of
+    locations, rotations and scales, one per frame.
+    """
+    fcurves = {(fcurve.data_path, fcurve.array_index): fcurve for fcurve in action.fcurves}
+
+    def evaluate(struct, path, channel, size):
+        current = list(getattr(struct, channel))
+        curves = [fcurves.get((path + channel, i)) for i in range(size)]
+        if not any(curves):
+            return [current] * len(frames)
+        return [
+            [curve.evaluate(frame) if curve else value for curve, value in zip(curves, current)]
+            for frame in frames
+        ]
+
+    def sample(struct, path):
+        locs = evaluate(struct, path, 'location', 3)
+        scales = evaluate(struct, path, 'scale', 3)
+        if struct.rotation_mode == 'QUATERNION':
+            rots = [
+                mathutils.Quaternion(rot).normalized()
+                for rot in evaluate(struct, path, 'rotation_quaternion', 4)
+            ]
+        else:
+            rots = [
+                mathutils.Euler(rot, struct.rotation_mode).to_quaternion()
+                for rot in evaluate(struct, path, 'rotation_euler', 3)
+            ]
+        return locs, rots, scales
+
+    samples = collections.OrderedDict()
+
+    locs, rots, scales = sample(obj, '')
+    if obj.parent:
+        matrices = [
+            obj.matrix_parent_inverse *
+            mathutils.Matrix.Translation(loc) *
+            rot.to_matrix().to_4x4() *
+            mathutils.Matrix(((scale[0], 0, 0, 0), (0, scale[1], 0, 0), (0, 0, scale[2], 0), (0, 0, 0, 1)))
+            for loc, rot, scale in zip(locs, rots, scales)
+        ]
+        locs, rots, scales = zip(*[mat.decompose() for mat in matrices])
+    samples[obj.name] = (locs, rots, scales)
+
+    if obj.type == 'ARMATURE':
+        for pbone in obj.pose.bones:
+            locs, rots, scales = sample(pbone, 'pose.bones["{}"].'.format(pbone.name))
+
+            # Bone rest matrices have no scale, so the rest matrix can be
+            # applied to each part of the pose separately.
+            rest = _bone_rest_matrix(pbone.bone)
+            rest_rot = rest.to_quaternion()
+            locs = [rest * mathutils.Vector(loc) for loc in locs]
+            rots = [rest_rot * rot for rot in rots]
+            samples[pbone.name] = (locs, rots, scales)
+
+    return samples
+
+
+def export_actions(settings, objects, actions):
+    sparse = settings['actions_sparse']
+    tolerance = settings['actions_sparse_tolerance']
+
+    def bake_actions(pairs):
+        """Bake the local transforms of obj and its pose bones for every
+        (key, obj, action) in pairs, keyed by key.
+
+        Objects are baked together: each round assigns one action to every
+        object that still has one to bake and steps through the frames of
+        those actions once. The scene is evaluated once per frame per round
+        rather than once per frame per action.
+
+        Objects whose constraints or drivers read other animated objects
+        are baked one action at a time instead, with every other object
+        playing its own action, as if nothing else was being baked.
+        """
+        animated = {obj.name for _, obj, _ in pairs}
+        dependent = {obj.name for _, obj, _ in pairs if _object_dependencies(obj) & animated}
+
+        rounds = []
+        separate_rounds = []
+        object_rounds = collections.Counter()
+        for key, obj, action in pairs:
+            if obj.name in dependent:
+                separate_rounds.append([(key, obj, action)])
+                continue
+            index = object_rounds[obj.name]
+            object_rounds[obj.name] += 1
+            if index == len(rounds):
+                rounds.append([])
+            rounds[index].append((key, obj, action))
+        rounds.extend(separate_rounds)
 
         sce = bpy.context.scene
         prev_frame = sce.frame_current
-        prev_action = obj.animation_data.action
-
+        baked = {}
+
+        for bake_round in rounds:
+            prev_actions = []
+            frame_ranges = []
+            matrices = {}
+            for key, obj, action in bake_round:
+                prev_actions.append((obj, obj.animation_data.action))
+                obj.animation_data.action = action
+                frame_start, frame_end = [int(x) for x in action.frame_range]
+                frame_ranges.append(range(frame_start, frame_end))
+
+                matrices[key] = collections.OrderedDict()
+                matrices[key][obj.name] = []
+                if obj.type == 'ARMATURE':
+                    for pbone in obj.pose.bones:
+                        matrices[key][pbone.name] = []
+
+            for frame in sorted(set().union(*frame_ranges)):
+                sce.frame_set(frame)
+
+                for (key, obj, action), frames in zip(bake_round, frame_ranges):
+                    if frame not in frames:
+                        continue
+
+                    obj_matrices = matrices[key]
+                    obj_matrices[obj.name].append(obj.matrix_local.copy())
+
+                    if obj.type == 'ARMATURE':
+                        for pbone in obj.pose.bones:
+                            obj_matrices[pbone.name].append(pbone.matrix.copy())
+
+            # Channels an action does not key keep their values, so start
+            # every round from the current frame
+            for obj, prev_action in prev_actions:
+                obj.animation_data.action = prev_action
+            sce.frame_set(prev_frame)
+
+            for key, obj, action in bake_round:
+                baked[key] = decompose_baked(obj, matrices[key])
+
+        return baked
+
+    def decompose_baked(obj, matrices):
+        """Split the matrices baked for obj into locations, rotations and
+        scales, making pose bone matrices relative to their parents."""
+        bones = obj.pose.bones if obj.type == 'ARMATURE' else []
+        channels = collections.OrderedDict()
+
+        if np is not None:
+            arrays = {targetid: np.array(mats, dtype=np.float64).reshape(-1, 4, 4)
+                      for targetid, mats in matrices.items()}
+            parents = {pbone.name: pbone.parent.name for pbone in bones if pbone.parent}
+            for targetid, mats in arrays.items():
+                if targetid in parents:
+                    mats = np.matmul(np.linalg.inv(arrays[parents[targetid]]), mats)
+                channels[targetid] = animation_processing.decompose_matrices(mats)
+            return channels
+
+        local_matrices = dict(matrices)
+        for pbone in bones:
+            if pbone.parent:
+                parent_mats = matrices[pbone.parent.name]
+                local_matrices[pbone.name] = [
+                    parent_mat.inverted() * mat for parent_mat, mat in zip(parent_mats, matrices[pbone.name])
+                ]
+        for targetid in matrices:
+            mats = local_matrices[targetid]
+            locs, rots, scales = tuple(zip(*[mat.decompose() for mat in mats])) or ((), (), ())
+            channels[targetid] = (locs, animation_processing.make_quaternions_continuous(rots), scales)
+        return channels
+
+    def export_sparse_channels(buf, targetid, samples, rest):
+        """Add the keyframes needed to reproduce samples within tolerance to
+        buf. Channels that stay at their rest value are left out."""
+        gltf_channels = []
+        for path, values, rest_value in zip(('translation', 'rotation', 'scale'), samples, rest):
+            slerp = path == 'rotation'
+            if slerp:
+                values = animation_processing.make_quaternions_continuous(values)
+            keys = animation_processing.reduce_keyframes(range(len(values)), values, tolerance, slerp)
+            if not keys:
+                continue
+            if (len(keys) == 1 and rest_value is not None and
+                    animation_processing.channel_error(values[0], rest_value, slerp) <= tolerance):
+                continue
+
+            width = len(values[0])
+            tbv = buf.add_view(len(keys) * 4, None)
+            tdata = buf.add_accessor(tbv, 0, 4, Buffer.FLOAT, len(keys), Buffer.SCALAR)
+            tdata.write_array([float(key) for key in keys])
+            vbv = buf.add_view(len(keys) * width * 4, None)
+            vdata = buf.add_accessor(vbv, 0, width * 4, Buffer.FLOAT, len(keys),
+                                     Buffer.VEC4 if width == 4 else Buffer.VEC3)
+            vdata.write_array([float(component) for key in keys for component in values[key]])
+
+            gltf_channels.append({
+                'id': targetid,
+                'path': path,
+                'time': tdata.name,
+                'data': vdata.name,
+            })
+
+        return gltf_channels
+
+    def export_action(obj, action, channels):
+        """Export the channels baked for action on obj, or sample them from
+        its fcurves if channels is None."""
         frame_start, frame_end = [int(x) for x in action.frame_range]
         num_frames = frame_end - frame_start
-        obj.animation_data.action = action
 
-        channels[obj.name] = []
+        if channels is None:
+            with g_profiler.stage('sample_fcurves'):
+                channels = _sample_fcurves(obj, action, range(frame_start, frame_end))
 
+        # Pose bones that are not keyed are exported at their rest pose, so
+        # sparse channels that never leave it can be dropped. Objects are
+        # exported with their current transform instead.
+        rest = {obj.name: (None, None, None)}
         if obj.type == 'ARMATURE':
             for pbone in obj.pose.bones:
-                channels[pbone.name] = []
-
-        for frame in range(frame_start, frame_end):
-            sce.frame_set(frame)
-
-            channels[obj.name].append(obj.matrix_local)
-
-            if obj.type == 'ARMATURE':
-                for pbone in obj.pose.bones:
-                    if pbone.parent:
-                        mat = pbone.parent.matrix.inverted() * pbone.matrix
-                    else:
-                        mat = pbone.matrix
-                    channels[pbone.name].append(mat)
+                mat = _bone_rest_matrix(pbone.bone)
+                rest[pbone.name] = (mat.translation, mat.to_quaternion(), (1.0, 1.0, 1.0))
 
         gltf_channels = []
 
-        for targetid, chan in channels.items():
+        for targetid, (locs, rots, scales) in channels.items():
             buf = Buffer('{}_{}'.format(targetid, action.name))
+            channel_id = targetid
+            if targetid != obj.name:
+                channel_id = '{}_root_{}'.format(obj.data.name, targetid)
+
+            if sparse:
+                target_channels = export_sparse_channels(buf, channel_id, (locs, rots, scales), rest[targetid])
+                if target_channels:
+                    g_buffers.append(buf)
+                    gltf_channels += target_channels
+                continue
+
             lbv = buf.add_view(num_frames * 3 * 4, None)
             ldata = buf.add_accessor(lbv, 0, 3 * 4, Buffer.FLOAT, num_frames, Buffer.VEC3)
             rbv = buf.add_view(num_frames * 4 * 4, None)
@@ -906,33 +2047,30 @@ def export_actions(actions):
             sbv = buf.add_view(num_frames * 3 * 4, None)
             sdata = buf.add_accessor(sbv, 0, 3 * 4, Buffer.FLOAT, num_frames, Buffer.VEC3)
 
-            for i in range(num_frames):
-                mat = chan[i]
-                loc, rot, scale = mat.decompose()
-                for j in range(3):
-                    ldata[(i * 3) + j] = loc[j]
-                    sdata[(i * 3) + j] = scale[j]
-                for j in range(4):
-                    rdata[(i * 4) + j] = rot[j]
+            if np is None:
+                locs, rots, scales = [
+                    [component for value in values for component in value]
+                    for values in (locs, rots, scales)
+                ]
+            ldata.write_array(locs)
+            rdata.write_array(rots)
+            sdata.write_array(scales)
 
             g_buffers.append(buf)
 
-            if targetid != obj.name:
-                targetid = '{}_root_{}'.format(obj.data.name, targetid)
-
             gltf_channels += [
                 {
-                    'id': targetid,
+                    'id': channel_id,
                     'path': 'translation',
                     'data': ldata.name,
                 },
                 {
-                    'id': targetid,
+                    'id': channel_id,
                     'path': 'rotation',
                     'data': rdata.name,
                 },
                 {
-                    'id': targetid,
+                    'id': channel_id,
                     'path': 'scale',
                     'data': sdata.name,
                 }
@@ -943,26 +2081,198 @@ def export_actions(actions):
             'frames': num_frames,
         }
 
-        obj.animation_data.action = prev_action
-        sce.frame_set(prev_frame)
-
         return gltf_action
 
-    gltf_actions = {}
-    for obj in bpy.data.objects:
+    # An object can use an action if the action animates objects or any of
+    # the object's bones
+    action_targets = [(action, _action_targets(action)) for action in actions]
+    armature_bones = {}
+
+    pairs = []
+    for obj in objects:
+        if obj.animation_data is None:
+            continue
+
+        bone_names = set()
+        if obj.type == 'ARMATURE':
+            if obj.data.name not in armature_bones:
+                armature_bones[obj.data.name] = {bone.name for bone in obj.data.bones}
+            bone_names = armature_bones[obj.data.name]
+
         act_prefix = '{}_root'.format(obj.data.name) if obj.type == 'ARMATURE' else obj.name
-        gltf_actions.update({
-            '{}|{}'.format(act_prefix, action.name): export_action(obj, action)
-            for action in actions
-            if _can_object_use_action(obj, action)
-        })
+        for action, (animates_object, action_bones) in action_targets:
+            if animates_object or not bone_names.isdisjoint(action_bones):
+                pairs.append(('{}|{}'.format(act_prefix, action.name), obj, action))
+
+    # Look cached actions up first, so only the rest are baked
+    cache_entries = {}
+    for key, obj, action in pairs:
+        cache_key = None
+        entry = None
+        if g_cache is not None:
+            cache_key = _action_fingerprint(obj, action, settings)
+            entry = g_cache.get('actions', cache_key)
+        cache_entries[key] = (cache_key, entry)
+
+    with g_profiler.stage('bake_actions'):
+        baked = bake_actions([
+            (key, obj, action) for key, obj, action in pairs
+            if cache_entries[key][1] is None and not (sparse and _can_sample_fcurves(obj, action))
+        ])
+
+    gltf_actions = {}
+    for key, obj, action in pairs:
+        with g_profiler.stage('export_action', key):
+            cache_key, entry = cache_entries[key]
+            if entry is not None:
+                gltf_actions[key] = _restore_cache_entry(entry)
+                continue
+
+            first_buffer = len(g_buffers)
+            gltf_actions[key] = export_action(obj, action, baked.get(key))
+            if cache_key is not None:
+                _store_cache_entry('actions', cache_key, gltf_actions[key], first_buffer)
 
     return gltf_actions
 
 
+@contextlib.contextmanager
+def _profiled(settings):
+    """Profile the export in the with statement if settings['profile'] is
+    set, storing the report in settings['profile_stats']."""
+    global g_profiler
+
+    g_profiler = profiling.Profiler(settings.get('profile', default_settings['profile']))
+    g_profiler.start()
+    try:
+        yield
+    finally:
+        g_profiler.stop()
+        if g_profiler.enabled:
+            settings['profile_stats'] = g_profiler.report()
+        g_profiler = profiling.Profiler(enabled=False)
+
+
 def export_gltf(scene_delta, settings={}):
     global g_buffers
+
+    with _profiled(settings):
+        gltf = _export_gltf(scene_delta, settings)
+    g_buffers = []
+
+    return gltf
+
+
+def export_glb(scene_delta, settings, fileobj):
+    """Export to a binary glTF (KHR_binary_glTF) file.
+
+    The JSON is written as the content of the file and every buffer view is
+    streamed into its body, so the geometry is never base64 encoded.
+    fileobj must be opened in binary mode.
+    """
+    global g_buffers
+
+    with _profiled(settings):
+        gltf = _export_gltf(scene_delta, settings, binary=True)
+        body = g_buffers[0] if g_buffers else None
+        g_buffers = []
+
+        with g_profiler.stage('write_json'):
+            content = json.dumps(gltf, sort_keys=True, check_circular=False).encode('utf-8')
+
+        # Pad the content with spaces so that the body is 4-byte aligned
+        content += b' ' * (-(GLB_HEADER_SIZE + len(content)) % 4)
+        body_length = body.bytelength if body else 0
+
+        fileobj.write(struct.pack(
+            '<4sIIII',
+            b'glTF',
+            1,
+            GLB_HEADER_SIZE + len(content) + body_length,
+            len(content),
+            GLB_CONTENT_FORMAT_JSON
+        ))
+        fileobj.write(content)
+        if body:
+            with g_profiler.stage('write_buffers'):
+                for chunk in body.iter_data():
+                    fileobj.write(chunk)
+
+
+def write_gltf(scene_delta, settings, fileobj, indent=None):
+    """Export to a .gltf file, writing each section as soon as it is ready.
+
+    Unlike dumping the result of export_gltf, the document never exists as a
+    whole in memory, and embedded buffers are base64 encoded a piece at a
+    time straight from their views. Sections are written in the order they
+    are exported rather than sorted.
+    """
+    global g_buffers
+
+    encoder = json.JSONEncoder(indent=indent, sort_keys=True, check_circular=False)
+    separator = ',' if indent is not None else ', '
+    newline = '\n' + ' ' * indent if indent is not None else ''
+
+    def write_key(key):
+        if write_key.count:
+            fileobj.write(separator)
+        fileobj.write(newline + json.dumps(key) + ': ')
+        write_key.count += 1
+    write_key.count = 0
+
+    def write_section(key, value):
+        with g_profiler.stage('write_json', key):
+            write_key(key)
+            for chunk in encoder.iterencode(value):
+                fileobj.write(chunk.replace('\n', newline) if newline else chunk)
+
+    def write_buffers():
+        write_key('buffers')
+        fileobj.write('{')
+        for i, buf in enumerate(g_buffers):
+            if i:
+                fileobj.write(separator)
+            fileobj.write(json.dumps(buf.name) + ': ')
+
+            if buf.uri is None and settings['buffers_embed_data']:
+                # Stream the data URI instead of building it in memory
+                fileobj.write('{')
+                fileobj.write('"byteLength": {}{}"type": {}{}"uri": "data:text/plain;base64,'.format(
+                    buf.bytelength, separator, json.dumps(buf.type), separator))
+                for chunk in buf.iter_base64():
+                    fileobj.write(chunk)
+                fileobj.write('"}')
+            else:
+                fileobj.write(json.dumps(buf.export_buffer(settings), sort_keys=True))
+        fileobj.write('}')
+
+    with _profiled(settings):
+        fileobj.write('{')
+        try:
+            for key, value in _iter_gltf(scene_delta, settings):
+                if value:
+                    write_section(key, value)
+
+            if g_buffers:
+                write_section('bufferViews', {k: v for buf in g_buffers for k, v in buf.export_views().items()})
+                write_section('accessors', {k: v for buf in g_buffers for k, v in buf.export_accessors().items()})
+                g_profiler.call(write_buffers)
+        finally:
+            g_buffers = []
+
+        fileobj.write('\n}' if indent is not None else '}')
+
+
+def _iter_gltf(scene_delta, settings, binary=False):
+    """Export the scene one top-level glTF section at a time.
+
+    Yields (key, value) pairs in dependency order. Buffer data is left in
+    g_buffers for the caller to write out once the generator is exhausted.
+    """
+    global g_buffers
+    global g_cache
     global g_glExtensionsUsed
+    global g_output_files
 
     # Fill in any missing settings with defaults
     for key, value in default_settings.items():
@@ -976,89 +2286,141 @@ def export_gltf(scene_delta, settings={}):
     # Clear globals
     g_buffers = []
     g_glExtensionsUsed = []
+    g_output_files = set()
+    g_cache = None
+
+    if settings['cache_dir']:
+        g_cache = export_cache.ExportCache(
+            settings['cache_dir'],
+            settings['cache_max_mb'] * 1024 * 1024,
+            _code_version()
+        )
 
     object_list = list(scene_delta.get('objects', []))
     mod_meshes = {}
     mesh_names = {}
+    cache_entries = {}
+    mesh_list = []
 
-    global_mat = settings['global_matrix']
     apply_modifiers = settings['meshes_apply_modifiers']
 
-    # Apply modifiers and transform using the global matrix
+    # Apply modifiers once for each group of objects that share a mesh and
+    # equivalent modifiers, every group exports a single mesh
     scene = bpy.context.scene
     for mesh in scene_delta.get('meshes', []):
-        # Find all users of this mesh
-        obj_users = [ob for ob in object_list if ob.data == mesh]
-
-        # For each user of the mesh
-        for ob in obj_users:
-
-            # Apply modifiers
-            mesh_copy = ob.to_mesh(scene, apply_modifiers, 'PREVIEW')
-
-            world_mat = ob.matrix_world
-            inv_world_mat = world_mat.inverted()
-
-            # Transform the new mesh
-            mesh_copy.transform(inv_world_mat * global_mat * world_mat)
-
-            # Link the new mesh to the original object
-            mod_meshes[ob.name] = mesh_copy
-            mesh_names[mesh_copy.name] = mesh.name
-
-    mesh_list = mod_meshes.values()
+        groups = collections.OrderedDict()
+        for ob in object_list:
+            if ob.data == mesh:
+                groups.setdefault(_modifier_signature(ob, settings), []).append(ob)
+
+        for i, obj_users in enumerate(groups.values()):
+            ob = obj_users[0]
+            key = None
+            mesh_copy = None
+            if g_cache is not None:
+                with g_profiler.stage('fingerprint_mesh', ob.name):
+                    key = _mesh_fingerprint(ob, settings)
+                entry = g_cache.get('meshes', key)
+                if entry is not None:
+                    # Skip to_mesh, an empty mesh reserves the name the
+                    # cached data was exported under
+                    mesh_copy = bpy.data.meshes.new(entry['name'])
+                    if mesh_copy.name == entry['name']:
+                        cache_entries[mesh_copy.name] = (key, entry)
+                    else:
+                        bpy.data.meshes.remove(mesh_copy)
+                        mesh_copy = None
+
+            if mesh_copy is None:
+                with g_profiler.stage('to_mesh', ob.name):
+                    # Apply modifiers
+                    mesh_copy = ob.to_mesh(scene, apply_modifiers, 'PREVIEW')
+
+                    if _bakes_global_matrix(ob):
+                        # Transform the mesh using the global matrix, its
+                        # node keeps the plain world matrix
+                        world_mat = ob.matrix_world
+                        mesh_copy.transform(world_mat.inverted() * settings['global_matrix'] * world_mat)
+                cache_entries[mesh_copy.name] = (key, None)
+
+            # Link the new mesh to the original objects. The first group
+            # keeps the name of the mesh, others use the unique copy name.
+            for user in obj_users:
+                mod_meshes[user.name] = mesh_copy
+            mesh_names[mesh_copy.name] = mesh_copy.name if i else mesh.name
+            mesh_list.append(mesh_copy)
+
+    # Only images used by exported textures end up in the file
+    used_images = {
+        texture.image.name for texture in scene_delta.get('textures', [])
+        if type(texture) == bpy.types.ImageTexture and texture.image is not None
+    }
+    images = [image for image in scene_delta.get('images', []) if image.name in used_images]
 
-    gltf = {
-        'asset': {
+    try:
+        yield 'asset', {
             'version': '1.0',
             'profile': profile_map[settings['asset_profile']]
-        },
-        'cameras': export_cameras(scene_delta.get('cameras', [])),
-        'extensions': {
+        }
+        yield 'cameras', g_profiler.call(export_cameras, scene_delta.get('cameras', []))
+        yield 'extensions', {
             'BLENDER_actions': {
-                'actions': export_actions(scene_delta.get('actions', [])),
+                'actions': g_profiler.call(export_actions, settings, object_list,
+                                           scene_delta.get('actions', [])),
             },
-        },
-        'extensionsUsed': [
+        }
+        yield 'extensionsUsed', [
             'BLENDER_actions',
             'BLENDER_physics',
-        ],
-        'extras': {
-            'lights' : export_lights(scene_delta.get('lamps', [])),
-        },
-        'images': export_images(settings, scene_delta.get('images', [])),
-        'materials': export_materials(settings, scene_delta.get('materials', []),
-            shaders, programs, techniques),
-        'nodes': export_nodes(object_list, skinned_meshes, mod_meshes,
-                              mesh_names),
+        ] + ([KHR_BINARY_GLTF] if binary else []) + \
+            ([WEB3D_QUANTIZED_ATTRIBUTES] if settings['meshes_quantize_attributes'] else [])
+        yield 'extras', {
+            'lights' : g_profiler.call(export_lights, scene_delta.get('lamps', [])),
+        }
+        yield 'images', g_profiler.call(export_images, settings, images)
+        yield 'materials', g_profiler.call(export_materials, settings, scene_delta.get('materials', []),
+            shaders, programs, techniques)
+        yield 'nodes', g_profiler.call(export_nodes, settings, object_list, skinned_meshes,
+                                       mod_meshes, mesh_names)
         # Make sure meshes come after nodes to detect which meshes are skinned
-        'meshes': export_meshes(settings, mesh_list, skinned_meshes, mesh_names),
-        'skins': export_skins(skinned_meshes),
-        'programs': programs,
-        'samplers': {'default':{}},
-        'scene': bpy.context.scene.name,
-        'scenes': export_scenes(scene_delta.get('scenes', [])),
-        'shaders': shaders,
-        'techniques': techniques,
-        'textures': export_textures(scene_delta.get('textures', [])),
+        yield 'meshes', g_profiler.call(export_meshes, settings, mesh_list, skinned_meshes, mesh_names,
+                                        cache_entries)
+        yield 'skins', g_profiler.call(export_skins, skinned_meshes)
+        yield 'programs', programs
+        yield 'samplers', {'default':{}}
+        yield 'scene', bpy.context.scene.name
+        yield 'scenes', g_profiler.call(export_scenes, scene_delta.get('scenes', []))
+        yield 'shaders', shaders
+        yield 'techniques', techniques
+        yield 'textures', g_profiler.call(export_textures, scene_delta.get('textures', []))
 
         # TODO
-        'animations': {},
-    }
+        yield 'animations', {}
 
-    # Retroactively add skins attribute to nodes
-    for mesh_name, obj in skinned_meshes.items():
-        gltf['nodes'][obj.name]['skin'] = '{}_skin'.format(mesh_name)
+        yield 'glExtensionsUsed', g_glExtensionsUsed
 
-    gltf.update(export_buffers())
-    gltf.update({'glExtensionsUsed': g_glExtensionsUsed})
-    g_buffers = []
-    g_glExtensionsUsed = []
+        if binary:
+            # Everything goes into the body of the binary glTF file
+            body = Buffer('binary_glTF', uri='data:,')
+            body.name = 'binary_glTF'
+            g_profiler.call(_combine_buffers, body)
+        elif settings['buffers_combine_data']:
+            # Pack every view into a single buffer
+            g_profiler.call(_combine_buffers, Buffer(bpy.context.scene.name))
+    finally:
+        g_glExtensionsUsed = []
 
-    gltf = {key: value for key, value in gltf.items() if value}
+        if g_cache is not None:
+            settings['cache_stats'] = g_cache.close()
+            g_cache = None
 
-    # Remove any temporary meshes from applying modifiers
-    for mesh in mod_meshes.values():
-        bpy.data.meshes.remove(mesh)
+        # Remove any temporary meshes from applying modifiers
+        for mesh in mesh_list:
+            bpy.data.meshes.remove(mesh)
 
-    return gltf
+
+def _export_gltf(scene_delta, settings, binary=False):
+    gltf = dict(_iter_gltf(scene_delta, settings, binary))
+    gltf.update(g_profiler.call(export_buffers, settings))
+
+    return {key: value for key, value in gltf.items() if value}
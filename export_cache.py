@@ -0,0 +1,193 @@
+"""Persistent cache of exported data keyed on content fingerprints.
+
+Entries are pickled to one file each in a cache directory. Reading an entry
+updates its modification time, and once the directory grows past its size
+limit the least recently used entries are deleted. Nothing in here touches
+bpy; what goes into a fingerprint is decided by the exporter.
+
+Only plain Python values (dicts, lists, strings, numbers and bytes) should
+be stored, so entries stay readable across versions of the add-on.
+"""
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+log = logging.getLogger(__name__)
+
+
+ENTRY_SUFFIX = '.entry'
+STATS_FILE = 'stats.json'
+
+
+class Fingerprint:
+    """Incrementally hash a mix of values into a hex digest.
+
+    Strings, numbers, booleans, None, bytes-like objects, NumPy arrays and
+    (nested) lists, tuples and dicts of those are supported. Values are
+    tagged with their type and length, so [1, 2] and [12] differ.
+    """
+    def __init__(self, *values):
+        self._hash = hashlib.sha1()
+        self.update(*values)
+
+    def update(self, *values):
+        for value in values:
+            self._update(value)
+        return self
+
+    def _update(self, value):
+        update = self._hash.update
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            data = bytes(value)
+            update('b{}:'.format(len(data)).encode())
+            update(data)
+        elif np is not None and isinstance(value, np.ndarray):
+            data = np.ascontiguousarray(value).tobytes()
+            update('a{}{}:{}:'.format(value.dtype.str, value.shape, len(data)).encode())
+            update(data)
+        elif isinstance(value, (list, tuple)):
+            update('l{}:'.format(len(value)).encode())
+            for item in value:
+                self._update(item)
+        elif isinstance(value, dict):
+            update('d{}:'.format(len(value)).encode())
+            for key in sorted(value):
+                self._update(key)
+                self._update(value[key])
+        elif isinstance(value, (str, int, float, bool)) or value is None:
+            data = repr(value).encode()
+            update('{}{}:'.format(type(value).__name__, len(data)).encode())
+            update(data)
+        else:
+            raise TypeError("Cannot fingerprint values of type {}".format(type(value).__name__))
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+class ExportCache:
+    """A size bounded, least recently used store of fingerprinted entries.
+
+    salt is mixed into every key, so entries written by a different version
+    of the exporter are never returned. max_size is in bytes.
+    """
+    def __init__(self, directory, max_size, salt=''):
+        self.directory = directory
+        self.max_size = max_size
+        self.salt = salt
+        self.hits = collections.Counter()
+        self.misses = collections.Counter()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        key = Fingerprint(self.salt, key).hexdigest()
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, kind, key):
+        """Return the entry stored under key, or None on a miss.
+
+        kind only groups the hit and miss counts.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fin:
+                value = pickle.load(fin)
+            os.utime(path)
+        except FileNotFoundError:
+            value = None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError) as err:
+            log.warning('Ignoring unreadable cache entry %s: %s', path, err)
+            value = None
+
+        if value is None:
+            self.misses[kind] += 1
+        else:
+            self.hits[kind] += 1
+        return value
+
+    def put(self, kind, key, value):
+        """Store value under key, replacing any previous entry."""
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fout:
+                pickle.dump(value, fout, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(ENTRY_SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_size."""
+        entries = sorted(self._entries())
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    def stats(self):
+        """Return the hit and miss counts of this session per kind of entry,
+        the overall hit rate, and the current size of the cache."""
+        entries = self._entries()
+        kinds = sorted(set(self.hits) | set(self.misses))
+        lookups = sum(self.hits.values()) + sum(self.misses.values())
+        return {
+            'kinds': {
+                kind: {'hits': self.hits[kind], 'misses': self.misses[kind]}
+                for kind in kinds
+            },
+            'hit_rate': sum(self.hits.values()) / lookups if lookups else 0.0,
+            'entries': len(entries),
+            'size': sum(entry[1] for entry in entries),
+        }
+
+    def close(self):
+        """Evict old entries and add this session's counts to the totals
+        kept in the cache directory. Returns the session's stats."""
+        self.evict()
+
+        path = os.path.join(self.directory, STATS_FILE)
+        try:
+            with open(path) as fin:
+                totals = json.load(fin)
+        except (OSError, ValueError):
+            totals = {}
+
+        for kind in set(self.hits) | set(self.misses):
+            counts = totals.setdefault(kind, {'hits': 0, 'misses': 0})
+            counts['hits'] += self.hits[kind]
+            counts['misses'] += self.misses[kind]
+
+        with open(path, 'w') as fout:
+            json.dump(totals, fout, indent=4, sort_keys=True)
+
+        stats = self.stats()
+        stats['totals'] = totals
+        return stats
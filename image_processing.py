@@ -0,0 +1,221 @@
+"""Image resizing and encoding stages that operate on plain pixel arrays.
+
+Like mesh_processing, nothing in here touches bpy. Pixels are given the way
+Blender stores them: a flat sequence of floats from 0 to 1, row by row from
+the bottom of the image up. NumPy is used when it is available, otherwise
+the functions fall back to plain Python.
+"""
+
+import math
+import struct
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+JPEG_SIGNATURE = b'\xff\xd8\xff'
+
+# PNG color types by number of channels: grey, grey and alpha, RGB, RGBA
+_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+
+# Rows are converted, filtered and compressed a strip of about this many
+# bytes at a time, so memory use does not grow with the image
+STRIP_SIZE = 1 << 20
+
+
+def sniff_mime_type(data):
+    """Return the MIME type of PNG or JPEG file data, or None for anything
+    else."""
+    if data.startswith(PNG_SIGNATURE):
+        return 'image/png'
+    if data.startswith(JPEG_SIGNATURE):
+        return 'image/jpeg'
+    return None
+
+
+def to_bytes(values):
+    """Convert floats from 0 to 1 to bytes, rounding to the nearest value
+    and clamping like Blender does when it saves 8-bit images."""
+    if np is not None:
+        values = np.asarray(values, dtype=np.float64)
+        return np.floor(np.clip(values, 0.0, 1.0) * 255 + 0.5).astype(np.uint8)
+    return bytes(int(min(max(value, 0.0), 1.0) * 255 + 0.5) for value in values)
+
+
+def fit_size(width, height, max_size, power_of_two=False):
+    """Return the size to export a width x height image at: scaled down to
+    fit within max_size (0 for no limit) keeping its aspect ratio, and with
+    power_of_two, each side rounded to the nearest power of two that is not
+    larger than max_size."""
+    scale = min(1.0, max_size / max(width, height)) if max_size else 1.0
+    size = [max(1, int(round(side * scale))) for side in (width, height)]
+    if power_of_two:
+        size = [2 ** int(round(math.log2(side))) for side in size]
+        if max_size:
+            largest = 2 ** int(math.log2(max_size))
+            size = [min(side, largest) for side in size]
+    return tuple(size)
+
+
+def _lanczos3(x):
+    return np.where(np.abs(x) < 3, np.sinc(x) * np.sinc(x / 3), 0.0)
+
+
+def _box(x):
+    return ((x >= -0.5) & (x < 0.5)).astype(np.float64)
+
+
+_FILTERS = {
+    'LANCZOS': (_lanczos3, 3.0),
+    'BOX': (_box, 0.5),
+}
+
+
+def _resample_weights(old_size, new_size, kernel, support):
+    """Return the source indices and weights of every target pixel when
+    resampling one axis from old_size to new_size pixels."""
+    scale = old_size / new_size
+    # When shrinking, the filter is stretched to cover every source pixel
+    stretch = max(scale, 1.0)
+    centers = (np.arange(new_size) + 0.5) * scale - 0.5
+    taps = int(math.ceil(2 * support * stretch)) + 1
+    indices = np.floor(centers - support * stretch).astype(np.int64)[:, None] + 1 + np.arange(taps)
+    weights = kernel((indices - centers[:, None]) / stretch)
+    weights /= weights.sum(axis=1, keepdims=True)
+    # Pixels past the edges repeat the edge pixels
+    return np.clip(indices, 0, old_size - 1), weights
+
+
+def _resample_axis(image, axis, new_size, kernel, support):
+    image = np.moveaxis(image, axis, 0)
+    indices, weights = _resample_weights(image.shape[0], new_size, kernel, support)
+    result = np.zeros((new_size,) + image.shape[1:], dtype=np.float32)
+    weights = weights.astype(np.float32).reshape(weights.shape + (1,) * (image.ndim - 1))
+    for tap in range(indices.shape[1]):
+        result += weights[:, tap] * image[indices[:, tap]]
+    return np.moveaxis(result, 0, axis)
+
+
+def resize(pixels, width, height, channels, new_width, new_height, filter='LANCZOS'):
+    """Resample pixels to new_width x new_height with a Lanczos (a = 3) or
+    box filter, applied to rows and columns in turn.
+
+    Colors are weighted by alpha, so transparent pixels do not bleed into
+    their neighbours. Returns a flat float32 array. Requires NumPy.
+    """
+    kernel, support = _FILTERS[filter]
+    image = np.asarray(pixels, dtype=np.float32).reshape(height, width, channels)
+
+    has_alpha = channels in (2, 4)
+    if has_alpha:
+        image = np.concatenate((image[..., :-1] * image[..., -1:], image[..., -1:]), axis=2)
+
+    # Shrink the axis that shrinks most first, so the second pass has
+    # fewer pixels to go through
+    axes = [(0, new_height, height / new_height), (1, new_width, width / new_width)]
+    for axis, new_size, _ in sorted(axes, key=lambda item: -item[2]):
+        if image.shape[axis] != new_size:
+            image = _resample_axis(image, axis, new_size, kernel, support)
+
+    # Lanczos overshoots at sharp edges
+    image = np.clip(image, 0.0, 1.0)
+    if has_alpha:
+        alpha = image[..., -1:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            colors = np.where(alpha > 0, image[..., :-1] / alpha, 0.0)
+        image = np.concatenate((np.clip(colors, 0.0, 1.0), alpha), axis=2)
+    return image.astype(np.float32).ravel()
+
+
+def _png_chunk(tag, data):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+
+def _filter_rows(rows, previous, bpp):
+    """Filter a (count, row size) uint8 array of rows for PNG, picking per
+    row the filter type with the smallest sum of absolute differences.
+
+    previous is the unfiltered row above the first one. Returns the
+    filtered rows, each prefixed with its filter type.
+    """
+    count, row_size = rows.shape
+    raw = rows.astype(np.int16)
+    up = np.vstack((previous[None, :].astype(np.int16), raw[:-1]))
+    left = np.zeros_like(raw)
+    left[:, bpp:] = raw[:, :-bpp]
+    up_left = np.zeros_like(raw)
+    up_left[:, bpp:] = up[:, :-bpp]
+
+    # Paeth picks whichever of left, up and up left is closest to
+    # left + up - up left, preferring them in that order on ties
+    to_left = np.abs(up - up_left)
+    to_up = np.abs(left - up_left)
+    to_up_left = np.abs(left + up - 2 * up_left)
+    paeth = np.where((to_left <= to_up) & (to_left <= to_up_left), left,
+                     np.where(to_up <= to_up_left, up, up_left))
+
+    filtered = np.stack((
+        raw,
+        raw - left,
+        raw - up,
+        raw - ((left + up) >> 1),
+        raw - paeth,
+    )).astype(np.uint8)
+
+    # Filtered bytes are read as signed for the heuristic, so small
+    # negative differences count as small
+    costs = np.abs(filtered.view(np.int8).astype(np.int32)).sum(axis=2)
+    choice = costs.argmin(axis=0)
+
+    result = np.empty((count, row_size + 1), dtype=np.uint8)
+    result[:, 0] = choice
+    result[:, 1:] = filtered[choice, np.arange(count)]
+    return result
+
+
+def iter_png(pixels, width, height, channels, level=6):
+    """Encode pixels as an 8-bit PNG, yielding the file a piece at a time.
+
+    Rows are flipped, since PNG stores the top row first. With NumPy every
+    row is filtered with the best of the five PNG filter types, without it
+    rows are left unfiltered.
+    """
+    color_type = _COLOR_TYPES[channels]
+    yield PNG_SIGNATURE + _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0))
+
+    row_size = width * channels
+    strip_rows = max(1, STRIP_SIZE // max(row_size, 1))
+    compressor = zlib.compressobj(level)
+    previous = np.zeros(row_size, dtype=np.uint8) if np is not None else None
+    if np is not None:
+        pixels = np.asarray(pixels).reshape(height, row_size)
+
+    for top in range(0, height, strip_rows):
+        # Rows top to top + count of the PNG, from the end of pixels
+        count = min(strip_rows, height - top)
+        first = height - top - count
+        if np is not None:
+            rows = to_bytes(pixels[first:first + count][::-1])
+            data = _filter_rows(rows, previous, channels).tobytes()
+            previous = rows[-1]
+        else:
+            data = bytearray()
+            for row in range(first + count - 1, first - 1, -1):
+                data.append(0)
+                data += to_bytes(pixels[row * row_size:(row + 1) * row_size])
+
+        compressed = compressor.compress(data)
+        if compressed:
+            yield _png_chunk(b'IDAT', compressed)
+
+    yield _png_chunk(b'IDAT', compressor.flush())
+    yield _png_chunk(b'IEND', b'')
+
+
+def encode_png(pixels, width, height, channels, level=6):
+    """Return pixels encoded as an 8-bit PNG, see iter_png."""
+    return b''.join(iter_png(pixels, width, height, channels, level))
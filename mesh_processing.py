@@ -0,0 +1,540 @@
+"""Mesh processing stages that operate on plain arrays.
+
+Nothing in here touches bpy, so these functions can be used (and measured)
+outside of Blender. NumPy is used when it is available, otherwise the
+functions fall back to plain Python lists.
+"""
+
+import collections
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def weld_vertices(records, epsilon=None):
+    """Merge identical vertex records.
+
+    records holds one fixed-width record per loop, for example position,
+    normal and UVs side by side. It is a (count, width) float array, or a
+    list of equal length tuples when NumPy is not available.
+
+    epsilon is an optional quantization step, either a single value or one
+    value per column. Columns with a non-zero step are snapped to multiples
+    of it before they are compared, so nearly identical values can merge.
+    The surviving vertex keeps the unsnapped values of its first record.
+
+    Returns (first, remap): the index of the first record of every unique
+    vertex in order of first use, and the vertex index of every record.
+    """
+    if np is not None:
+        return _weld_vertices_numpy(records, epsilon)
+
+    width = len(records[0]) if records else 0
+    steps = None
+    if epsilon is not None:
+        steps = list(epsilon) if hasattr(epsilon, '__len__') else [epsilon] * width
+        if not any(steps):
+            steps = None
+
+    first = []
+    remap = []
+    index = {}
+    for i, record in enumerate(records):
+        if steps:
+            key = tuple(round(v / step) if step else v for v, step in zip(record, steps))
+        else:
+            key = tuple(record)
+
+        vertex = index.setdefault(key, len(first))
+        if vertex == len(first):
+            first.append(i)
+        remap.append(vertex)
+
+    return first, remap
+
+
+def _weld_vertices_numpy(records, epsilon):
+    keys = np.asarray(records, dtype=np.float32)
+    if keys.ndim != 2:
+        keys = keys.reshape(len(keys), -1)
+
+    if epsilon is not None:
+        steps = np.broadcast_to(np.asarray(epsilon, dtype=np.float64), (keys.shape[1],))
+        snapped = steps > 0
+        if snapped.any():
+            keys = keys.astype(np.float64)
+            keys[:, snapped] = np.round(keys[:, snapped] / steps[snapped])
+
+    # Adding zero turns -0.0 into 0.0 so that comparing the raw bytes of a
+    # record agrees with comparing its values.
+    keys = np.ascontiguousarray(keys + keys.dtype.type(0.0))
+    keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+    # np.unique sorts the records, put them back in order of first use
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    return first[order], rank[inverse.ravel()]
+
+
+def triangulate(loop_starts, loop_totals):
+    """Fan triangulate polygons given by their first loop and loop count.
+
+    Triangles are kept as they are. Every other polygon with n loops
+    becomes n - 2 triangles made of its last loop and each pair of
+    consecutive loops, in polygon order.
+
+    Returns (triangles, polygons): the three loop indices of every triangle
+    and the polygon each triangle came from.
+    """
+    if np is not None:
+        starts = np.asarray(loop_starts, dtype=np.int64)
+        totals = np.asarray(loop_totals, dtype=np.int64)
+        if (totals < 3).any():
+            raise RuntimeError(
+                "Invalid polygon with {} vertices.".format(totals[totals < 3][0])
+            )
+
+        counts = totals - 2
+        polygons = np.repeat(np.arange(len(totals)), counts)
+        corners = np.arange(len(polygons)) - (np.cumsum(counts) - counts)[polygons]
+        starts = starts[polygons]
+        triangles = np.stack((
+            starts + totals[polygons] - 1,
+            starts + corners,
+            starts + corners + 1,
+        ), axis=1)
+        is_triangle = totals[polygons] == 3
+        triangles[is_triangle] = starts[is_triangle, None] + np.arange(3)
+        return triangles, polygons
+
+    triangles = []
+    polygons = []
+    for poly, (start, total) in enumerate(zip(loop_starts, loop_totals)):
+        if total < 3:
+            raise RuntimeError(
+                "Invalid polygon with {} vertices.".format(total)
+            )
+        if total == 3:
+            triangles.append((start, start + 1, start + 2))
+            polygons.append(poly)
+            continue
+        last = start + total - 1
+        for i in range(start, last - 1):
+            triangles.append((last, i, i + 1))
+            polygons.append(poly)
+    return triangles, polygons
+
+
+def process_mesh(data):
+    """Weld, triangulate and split a mesh into primitives by material.
+
+    data is the plain description of a mesh produced on the Blender side:
+
+        records: per loop vertex records (position, normal, UVs)
+        loop_vertices: the Blender vertex index of every loop
+        loop_starts, loop_totals, material_indices: one entry per polygon
+        materials: the material name of every slot ('' for empty slots)
+        joints, weights: four influences per Blender vertex, or None
+        normal_epsilon: quantization step used to weld normals
+        optimize_vertex_cache: reorder triangles and vertices for the GPU
+        measure_vertex_cache: report the ACMR before and after optimizing
+        max_vertices: split primitives so their indices stay below this
+            (0 to never split)
+
+    Only plain arrays go in and out, so this can run in a worker process.
+    Returns a dict with the unique 'vertex_data' rows, their 'joints' and
+    'weights' (or None), the 'prims' as (material name, vertex indices)
+    pairs in material slot order, the 'vertex_ranges' the prims index into
+    (see split_primitives), the largest vertex index used and the 'acmr'
+    before and after optimizing (or None).
+    """
+    records = data['records']
+    num_columns = len(records[0]) if len(records) else 0
+    epsilon = None
+    if data['normal_epsilon'] and num_columns:
+        epsilon = [0.0] * 3 + [data['normal_epsilon']] * 3 + [0.0] * (num_columns - 6)
+
+    first, remap = weld_vertices(records, epsilon)
+
+    # For each material, make an empty primitive set. Slots sharing a
+    # material share the primitive.
+    prim_names = list(collections.OrderedDict.fromkeys(data['materials'])) or ['']
+    slot_prims = [prim_names.index(name) for name in data['materials']] or [0]
+
+    triangles, polygons = triangulate(data['loop_starts'], data['loop_totals'])
+
+    if np is not None:
+        vertex_data = records[first]
+        joints = weights = None
+        if data['joints'] is not None:
+            vertices = data['loop_vertices'][first]
+            joints = data['joints'][vertices]
+            weights = data['weights'][vertices]
+
+        material_indices = np.asarray(data['material_indices'], dtype=np.int64)
+        if len(data['materials']) == 0:
+            material_indices = np.zeros_like(material_indices)
+        triangle_prims = np.asarray(slot_prims)[material_indices][polygons]
+        indices = remap[triangles]
+        prims = [(name, indices[triangle_prims == i].ravel()) for i, name in enumerate(prim_names)]
+        max_index = int(indices.max()) if indices.size else 0
+    else:
+        vertex_data = [records[i] for i in first]
+        joints = weights = None
+        if data['joints'] is not None:
+            vertices = [data['loop_vertices'][i] for i in first]
+            joints = [data['joints'][v] for v in vertices]
+            weights = [data['weights'][v] for v in vertices]
+
+        material_indices = data['material_indices'] if data['materials'] else [0] * len(data['loop_starts'])
+        prims = [(name, []) for name in prim_names]
+        max_index = 0
+        for triangle, poly in zip(triangles, polygons):
+            indices = [remap[i] for i in triangle]
+            max_index = max(max_index, max(indices))
+            prims[slot_prims[material_indices[poly]]][1].extend(indices)
+
+    acmr = None
+    if data['optimize_vertex_cache']:
+        if data['measure_vertex_cache']:
+            acmr = [_prims_acmr(prims)]
+
+        num_vertices = len(vertex_data)
+        prims = [(name, optimize_vertex_cache(indices, num_vertices)) for name, indices in prims]
+        order, remap = reorder_vertices([indices for _, indices in prims], num_vertices)
+        vertex_data, joints, weights = (_take(rows, order) for rows in (vertex_data, joints, weights))
+        prims = [(name, _take(remap, indices)) for name, indices in prims]
+
+        if acmr is not None:
+            acmr.append(_prims_acmr(prims))
+
+    vertex_ranges = [None] * len(prims)
+    if data['max_vertices'] and max_index >= data['max_vertices']:
+        order, prims, vertex_ranges = split_primitives(prims, data['max_vertices'])
+        vertex_data, joints, weights = (_take(rows, order) for rows in (vertex_data, joints, weights))
+        max_index = len(order) - 1
+
+    return {
+        'vertex_data': vertex_data,
+        'joints': joints,
+        'weights': weights,
+        'prims': prims,
+        'vertex_ranges': vertex_ranges,
+        'max_index': max_index,
+        'acmr': acmr,
+    }
+
+
+def _take(rows, order):
+    """Return rows (an array, a list or None) picked in order."""
+    if rows is None:
+        return None
+    if np is not None:
+        return rows[np.asarray(order, dtype=np.int64)]
+    return [rows[i] for i in order]
+
+
+def split_primitives(prims, max_vertices):
+    """Split primitives indexing max_vertices or more vertices into chunks
+    that each use fewer than max_vertices, e.g. 65536 for UNSIGNED_SHORT
+    indices.
+
+    Triangles are taken in order and a new chunk is started whenever the
+    next triangle would bring in too many vertices. Every chunk gets its
+    own copy of the vertices it uses, so its indices start at 0. Vertices
+    used by primitives that do not need splitting stay in front.
+
+    Returns (order, prims, vertex_ranges): the old index of every vertex in
+    the new vertex list, the new (material name, vertex indices) pairs and,
+    for every new pair, the (first, count) range of vertices it indexes
+    relative to first, or None for the vertices in front.
+    """
+    shared = collections.OrderedDict()
+    chunks = []
+    for name, indices in prims:
+        indices = [int(i) for i in indices]
+        if not indices or max(indices) < max_vertices:
+            chunks.append((name, indices, None))
+            for vertex in indices:
+                shared.setdefault(vertex, len(shared))
+            continue
+
+        local = {}
+        vertices = []
+        chunk_indices = []
+        for start in range(0, len(indices), 3):
+            triangle = indices[start:start + 3]
+            new = sum(1 for vertex in set(triangle) if vertex not in local)
+            if len(vertices) + new > max_vertices:
+                chunks.append((name, chunk_indices, vertices))
+                local = {}
+                vertices = []
+                chunk_indices = []
+            for vertex in triangle:
+                if vertex not in local:
+                    local[vertex] = len(vertices)
+                    vertices.append(vertex)
+                chunk_indices.append(local[vertex])
+        chunks.append((name, chunk_indices, vertices))
+
+    order = list(shared)
+    new_prims = []
+    vertex_ranges = []
+    for name, indices, vertices in chunks:
+        if vertices is None:
+            new_prims.append((name, [shared[i] for i in indices]))
+            vertex_ranges.append(None)
+        else:
+            new_prims.append((name, indices))
+            vertex_ranges.append((len(order), len(vertices)))
+            order.extend(vertices)
+
+    if np is not None:
+        new_prims = [(name, np.asarray(indices, dtype=np.int64)) for name, indices in new_prims]
+    return order, new_prims, vertex_ranges
+
+
+def _prims_acmr(prims):
+    # Every primitive is a separate draw call starting with an empty cache
+    num_triangles = sum(len(indices) // 3 for _, indices in prims)
+    if not num_triangles:
+        return 0.0
+    misses = sum(average_cache_miss_ratio(indices) * (len(indices) // 3) for _, indices in prims)
+    return misses / num_triangles
+
+
+def quantize_unit(values, max_value):
+    """Map components in [-1, 1] to the nearest integers in
+    [-max_value, max_value], e.g. normals to SHORT with max_value 32767.
+
+    values is a NumPy array or a flat list of components. Values outside
+    [-1, 1] are clamped.
+    """
+    if np is not None:
+        values = np.asarray(values, dtype=np.float64)
+        return np.rint(np.clip(values, -1.0, 1.0) * max_value).astype(np.int64)
+    return [int(round(min(max(value, -1.0), 1.0) * max_value)) for value in values]
+
+
+def quantize_range(values, width, max_value):
+    """Map every column of values onto the integers 0 to max_value,
+    spreading each column's own range over them.
+
+    values is a (count, width) NumPy array or a flat list of components.
+    Returns (quantized, offsets, scales), with value ~= offset + q * scale
+    per column. Columns that do not vary get a scale of 1.
+    """
+    if np is not None:
+        values = np.asarray(values, dtype=np.float64).reshape(-1, width)
+        if not len(values):
+            return values.astype(np.int64), [0.0] * width, [1.0] * width
+        lows = values.min(axis=0)
+        highs = values.max(axis=0)
+        scales = np.where(highs > lows, (highs - lows) / max_value, 1.0)
+        quantized = np.rint((values - lows) / scales).astype(np.int64)
+        return quantized, lows.tolist(), scales.tolist()
+
+    offsets = []
+    scales = []
+    for i in range(width):
+        column = values[i::width]
+        low = min(column) if column else 0.0
+        high = max(column) if column else 0.0
+        offsets.append(low)
+        scales.append((high - low) / max_value if high > low else 1.0)
+    quantized = [
+        int(round((value - offsets[i % width]) / scales[i % width]))
+        for i, value in enumerate(values)
+    ]
+    return quantized, offsets, scales
+
+
+def quantize_weights(weights, max_value):
+    """Map skin weights in [0, 1] to the nearest integers in [0, max_value].
+
+    weights holds four weights per vertex, as a (count, 4) NumPy array or a
+    flat list. Rows that sum to one still sum to exactly max_value after
+    rounding: the difference is added to their largest weight.
+    """
+    if np is not None:
+        weights = np.asarray(weights, dtype=np.float64).reshape(-1, 4)
+        quantized = np.rint(np.clip(weights, 0.0, 1.0) * max_value).astype(np.int64)
+        normalized = np.abs(weights.sum(axis=1) - 1.0) < 1e-3
+        rows = np.nonzero(normalized)[0]
+        largest = quantized[rows].argmax(axis=1)
+        quantized[rows, largest] += max_value - quantized[rows].sum(axis=1)
+        return quantized
+
+    quantized = []
+    for i in range(0, len(weights), 4):
+        row = weights[i:i + 4]
+        qrow = [int(round(min(max(weight, 0.0), 1.0) * max_value)) for weight in row]
+        if abs(sum(row) - 1.0) < 1e-3:
+            largest = qrow.index(max(qrow))
+            qrow[largest] += max_value - sum(qrow)
+        quantized.extend(qrow)
+    return quantized
+
+
+# Scoring constants of Tom Forsyth's "Linear-Speed Vertex Cache Optimisation"
+VERTEX_CACHE_SIZE = 32
+_CACHE_DECAY_POWER = 1.5
+_LAST_TRIANGLE_SCORE = 0.75
+_VALENCE_BOOST_SCALE = 2.0
+_VALENCE_BOOST_POWER = 0.5
+
+
+def _score_tables(max_valence):
+    """Return Forsyth's vertex scores as two lookup tables: one for each
+    cache position, offset by one so index 0 is for vertices not in the
+    cache, and one for each count of triangles still to be added."""
+    cache_scores = [0.0]
+    for position in range(VERTEX_CACHE_SIZE):
+        if position < 3:
+            # The last triangle's vertices get a fixed score, so the next
+            # triangle does not just reuse the same edge
+            cache_scores.append(_LAST_TRIANGLE_SCORE)
+        else:
+            scale = 1.0 / (VERTEX_CACHE_SIZE - 3)
+            cache_scores.append((1.0 - (position - 3) * scale) ** _CACHE_DECAY_POWER)
+
+    # A vertex without triangles left must never make a triangle win
+    valence_scores = [-1.0 - VERTEX_CACHE_SIZE]
+    for remaining in range(1, max_valence + 1):
+        valence_scores.append(_VALENCE_BOOST_SCALE * remaining ** -_VALENCE_BOOST_POWER)
+    return cache_scores, valence_scores
+
+
+def optimize_vertex_cache(indices, num_vertices):
+    """Reorder triangles so vertices are reused while they are still in
+    the GPU's post-transform cache, using Tom Forsyth's algorithm.
+
+    indices is a flat list or array of triangle vertex indices. Triangles
+    keep their winding. Returns the reordered indices as a list.
+    """
+    indices = [int(i) for i in indices]
+    num_triangles = len(indices) // 3
+    if num_triangles == 0:
+        return indices
+
+    vertex_triangles = [[] for _ in range(num_vertices)]
+    for triangle in range(num_triangles):
+        for vertex in indices[triangle * 3:triangle * 3 + 3]:
+            vertex_triangles[vertex].append(triangle)
+
+    remaining = [len(triangles) for triangles in vertex_triangles]
+    cache_scores, valence_scores = _score_tables(max(remaining))
+
+    vertex_scores = [cache_scores[0] + valence_scores[count] for count in remaining]
+    triangle_scores = [
+        vertex_scores[indices[t * 3]] + vertex_scores[indices[t * 3 + 1]] + vertex_scores[indices[t * 3 + 2]]
+        for t in range(num_triangles)
+    ]
+    added = [False] * num_triangles
+
+    cache = []
+    result = []
+    best = max(range(num_triangles), key=triangle_scores.__getitem__)
+    next_unadded = 0
+    for _ in range(num_triangles):
+        if best < 0:
+            # Nothing in the cache has triangles left, move on to the next
+            # triangle in the original order
+            while added[next_unadded]:
+                next_unadded += 1
+            best = next_unadded
+
+        triangle = indices[best * 3:best * 3 + 3]
+        added[best] = True
+        result.extend(triangle)
+        for vertex in triangle:
+            remaining[vertex] -= 1
+            vertex_triangles[vertex].remove(best)
+
+        cache = triangle + [vertex for vertex in cache if vertex not in triangle]
+        for vertex in cache[VERTEX_CACHE_SIZE:]:
+            score = cache_scores[0] + valence_scores[remaining[vertex]]
+            delta = score - vertex_scores[vertex]
+            vertex_scores[vertex] = score
+            for t in vertex_triangles[vertex]:
+                triangle_scores[t] += delta
+        del cache[VERTEX_CACHE_SIZE:]
+
+        for position, vertex in enumerate(cache):
+            score = cache_scores[position + 1] + valence_scores[remaining[vertex]]
+            delta = score - vertex_scores[vertex]
+            vertex_scores[vertex] = score
+            for t in vertex_triangles[vertex]:
+                triangle_scores[t] += delta
+
+        # Only triangles of vertices in the cache changed score, so the best
+        # of them is picked once they are all up to date
+        best = -1
+        best_score = -1.0
+        for vertex in cache:
+            for t in vertex_triangles[vertex]:
+                if triangle_scores[t] > best_score:
+                    best = t
+                    best_score = triangle_scores[t]
+
+    return result
+
+
+def reorder_vertices(index_lists, num_vertices):
+    """Number vertices in the order the index lists first use them.
+
+    Returns (order, remap): the old index of every vertex in its new place,
+    with vertices no index uses at the end, and the new index of every old
+    vertex.
+    """
+    if np is not None:
+        used = np.concatenate([np.asarray(indices, dtype=np.int64) for indices in index_lists] or [[]]).astype(np.int64)
+        first_use = np.full(num_vertices, len(used), dtype=np.int64)
+        unique, positions = np.unique(used, return_index=True)
+        first_use[unique] = positions
+        order = np.argsort(first_use, kind='stable')
+        remap = np.empty(num_vertices, dtype=np.int64)
+        remap[order] = np.arange(num_vertices)
+        return order, remap
+
+    remap = [-1] * num_vertices
+    order = []
+    for indices in index_lists:
+        for vertex in indices:
+            if remap[vertex] < 0:
+                remap[vertex] = len(order)
+                order.append(vertex)
+    for vertex in range(num_vertices):
+        if remap[vertex] < 0:
+            remap[vertex] = len(order)
+            order.append(vertex)
+    return order, remap
+
+
+def average_cache_miss_ratio(indices, cache_size=VERTEX_CACHE_SIZE):
+    """Return the average number of vertices transformed per triangle when
+    drawing indices through a first-in first-out vertex cache of cache_size
+    entries. 3 is the worst possible ratio, 0.5 about the best for a
+    regular grid."""
+    num_triangles = len(indices) // 3
+    if not num_triangles:
+        return 0.0
+
+    cached = set()
+    fifo = collections.deque()
+    misses = 0
+    for vertex in indices:
+        vertex = int(vertex)
+        if vertex not in cached:
+            misses += 1
+            cached.add(vertex)
+            fifo.append(vertex)
+            if len(fifo) > cache_size:
+                cached.discard(fifo.popleft())
+    return misses / num_triangles
@@ -0,0 +1,131 @@
+"""Wall time, call count and peak memory instrumentation for the exporter.
+
+A Profiler collects statistics for named stages. Stages may be nested and
+may name a target (a mesh, an object, an action, ...) to get a per-object
+breakdown. Other measurements, such as how well a mesh was optimized, can be
+recorded as metrics. A disabled Profiler has the same interface and does
+nothing, so the exporter can be instrumented unconditionally.
+"""
+
+import contextlib
+import time
+import tracemalloc
+
+
+class Profiler:
+    def __init__(self, enabled=True, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages = {}
+        self.objects = {}
+        self.metrics = {}
+        self.total_time = 0.0
+        self.total_peak = 0
+        self._stack = []
+        self._start_time = None
+        self._started_tracing = False
+
+    def start(self):
+        if not self.enabled:
+            return
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._start_time = time.perf_counter()
+        self._reset_peak()
+
+    def stop(self):
+        if not self.enabled or self._start_time is None:
+            return
+
+        self.total_time = time.perf_counter() - self._start_time
+        self.total_peak = max(self.total_peak, self._peak())
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._start_time = None
+
+    def _peak(self):
+        return tracemalloc.get_traced_memory()[1] if self.trace_memory else 0
+
+    def _reset_peak(self):
+        # tracemalloc.reset_peak() only exists in Python 3.9+, without it
+        # peaks are measured from the start of the export.
+        if self.trace_memory and hasattr(tracemalloc, 'reset_peak'):
+            self.total_peak = max(self.total_peak, self._peak())
+            tracemalloc.reset_peak()
+
+    @contextlib.contextmanager
+    def stage(self, name, target=None):
+        """Time the body of the with statement as stage name.
+
+        If target is given the cost is also added to the per-object
+        breakdown of the stage.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], self._peak())
+        self._reset_peak()
+        entry = [time.perf_counter(), 0]
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - entry[0]
+            peak = max(entry[1], self._peak())
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+
+            self._add(self.stages.setdefault(name, {}), elapsed, peak)
+            if target is not None:
+                self._add(self.objects.setdefault(name, {}).setdefault(target, {}), elapsed, peak)
+
+    def call(self, func, *args, **kwargs):
+        """Call func inside a stage named after it and return its result."""
+        with self.stage(func.__name__):
+            return func(*args, **kwargs)
+
+    def record(self, name, target=None, **values):
+        """Record values measured for target under the metric name,
+        replacing any values recorded for the same target before."""
+        if not self.enabled:
+            return
+
+        self.metrics.setdefault(name, {})[target] = values
+
+    def _add(self, stats, elapsed, peak):
+        stats['calls'] = stats.get('calls', 0) + 1
+        stats['time'] = stats.get('time', 0.0) + elapsed
+        if self.trace_memory:
+            stats['peak_memory'] = max(stats.get('peak_memory', 0), peak)
+
+    def report(self):
+        """Return the collected statistics as a JSON serializable dict.
+
+        Stages are sorted by total time and every per-object breakdown by
+        cost, most expensive first.
+        """
+        def by_time(items):
+            return sorted(items, key=lambda item: item[1]['time'], reverse=True)
+
+        total = {'time': self.total_time}
+        if self.trace_memory:
+            total['peak_memory'] = self.total_peak
+
+        return {
+            'total': total,
+            'stages': [dict(stats, name=name) for name, stats in by_time(self.stages.items())],
+            'objects': {
+                stage: [dict(stats, name=target) for target, stats in by_time(targets.items())]
+                for stage, targets in self.objects.items()
+            },
+            'metrics': {
+                name: [dict(values, name=target) for target, values in targets.items()]
+                for name, targets in self.metrics.items()
+            },
+        }
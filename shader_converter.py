@@ -1,69 +1,170 @@
+import collections
+import hashlib
 import re
 
 import gpu
 
 
-def vs_to_130(data):
+# How many conversions convert() remembers
+CONVERSION_CACHE_SIZE = 32
+
+_conversions = collections.OrderedDict()
+
+
+VS_130_HEADER = '#version 130\nin vec4 bl_Vertex;\nin vec3 bl_Normal;\nuniform mat4 bl_ModelViewMatrix;\nuniform mat4 bl_ProjectionMatrix;\nuniform mat3 bl_NormalMatrix;\n'
+FS_130_HEADER = '#version 130\nout vec4 frag_color;\nuniform mat4 bl_ProjectionMatrix;\nuniform mat4 bl_ModelViewMatrix;\nuniform mat4 bl_ModelViewMatrixInverse;\nuniform mat3 bl_NormalMatrix;\nuniform mat4 bl_ProjectionMatrixInverse;\n'
+
+PRECISION_BLOCK = '\nprecision mediump float;\nprecision mediump int;\n'
+VS_WEB_VERSION = '#version 100\n' + PRECISION_BLOCK
+FS_WEB_VERSION = '#version 100\n#extension GL_OES_standard_derivatives: enable\n' + PRECISION_BLOCK
+
+
+def _word_start(text):
+    # \b before text is checked after its first letter, so that every
+    # alternative of a Rewriter pattern starts with a literal and re can skip
+    # straight to the places they could match
+    return r'{}(?<!\w\w){}'.format(re.escape(text[0]), re.escape(text[1:]))
+
+
+class Rewriter:
+    """Rewrites GLSL source in a single pass.
+
+    Everything a conversion changes is found by one precompiled pattern, so
+    the source is scanned once however many rewrites there are. remove is
+    a sequence of patterns of text to remove, keep a pattern of which only
+    the 'body' group is kept (and rewritten), replace maps text to replace
+    wherever it appears, words maps whole words to rename and prefix is an
+    (old, new, exclude) tuple to rename words starting with old, unless
+    old is followed by exclude. Where two rewrites could apply at the same
+    place, the first in that order wins.
+
+    Unlike rewriting with one re.sub after another, words are found where
+    they are in src. Removing or replacing text right next to a word does
+    not join it to or split it from what was on the other side, which never
+    happens in the shaders Blender generates.
+    """
+
+    def __init__(self, remove=(), keep=None, replace=None, words=None, prefix=None):
+        self.replace = replace or {}
+        self.words = words or {}
+        self.prefix = prefix
+
+        alternatives = list(remove)
+        if keep:
+            alternatives.append(keep)
+        alternatives.extend(map(re.escape, sorted(self.replace, key=len, reverse=True)))
+        alternatives.extend(_word_start(word) + r'\b' for word in self.words)
+        if prefix:
+            old, _, exclude = prefix
+            alternatives.append('{}(?!{})'.format(_word_start(old), re.escape(exclude)))
+        self.pattern = re.compile('|'.join(alternatives))
+
+    def _rewrite(self, match):
+        text = match.group()
+        if text in self.words:
+            return self.words[text]
+        if text in self.replace:
+            return self.replace[text]
+        if self.prefix and text == self.prefix[0]:
+            return self.prefix[1]
+        if match.lastindex:
+            return self(match.group('body'))
+        return ''
+
+    def __call__(self, src):
+        return self.pattern.sub(self._rewrite, src)
+
+
+# Blender wraps code for OpenSubdiv and a clipping workaround in these
+# blocks. The clipping block is removed up to the first #endif that does not
+# close an OpenSubdiv block inside it.
+_OPENSUBDIV_BLOCK = r'#ifn?def USE_OPENSUBDIV[^#]*#endif'
+_OPENSUBDIV = r'#ifdef USE_OPENSUBDIV[^#]*#endif'
+_NOT_OPENSUBDIV = r'#ifndef USE_OPENSUBDIV(?P<body>[^#]*)#endif'
+_CLIP_WORKAROUND = r'#ifdef CLIP_WORKAROUND(?:{0}|(?!{0})[\s\S])*?#endif'.format(_OPENSUBDIV_BLOCK)
+
+# Cannot support node_bsdf functions without resolving use of gl_Light, they
+# are removed up to the first } at the start of a line
+_NODE_BSDF = r'void node_(?:bsdf|subsurface)_[\s\S]*?\n}'
+
+_FS_WEB_REPLACE = {
+    '#version 130': FS_WEB_VERSION,
+    'out vec4 frag_color;\n': '',
+
+    #TODO: This should be fixed in Blender
+    'blend = (normalize(vec).z + 1)': 'blend = (normalize(vec).z + 1.0)',
+
+    #TODO: This likely breaks shadows
+    'sampler2DShadow': 'sampler2D',
+    'shadow2DProj': 'texture2DProj',
+}
+
+_VS_130 = Rewriter(
+    remove=(_OPENSUBDIV, _CLIP_WORKAROUND),
+    keep=_NOT_OPENSUBDIV,
+    words={'varying': 'out'},
+    prefix=('gl_', 'bl_', 'Position'),
+)
+
+_FS_130 = Rewriter(
+    remove=(_NODE_BSDF, r'\r\r\n'),
+    words={'varying': 'in', 'gl_FragColor': 'frag_color'},
+    prefix=('gl_', 'bl_', 'FrontFacing'),
+)
+
+_VS_WEB = Rewriter(
+    replace={'#version 130': VS_WEB_VERSION},
+    words={'in': 'attribute', 'out': 'varying'},
+)
+
+_FS_WEB = Rewriter(
+    replace=_FS_WEB_REPLACE,
+    words={'in': 'varying', 'frag_color': 'gl_FragColor'},
+)
+
+# to_web in a single pass: the 130 rewrites followed by the web rewrites of
+# what they produce. varying becomes out or in and then varying again, so it
+# is left alone, as is gl_FragColor, which becomes frag_color and then
+# gl_FragColor again.
+_FS_TO_WEB_REPLACE = dict(_FS_WEB_REPLACE)
+_FS_TO_WEB_REPLACE['out vec4 gl_FragColor;\n'] = ''
+
+_VS_TO_WEB = Rewriter(
+    remove=(_OPENSUBDIV, _CLIP_WORKAROUND),
+    keep=_NOT_OPENSUBDIV,
+    replace={'#version 130': VS_WEB_VERSION},
+    words={'in': 'attribute', 'out': 'varying'},
+    prefix=('gl_', 'bl_', 'Position'),
+)
+
+_FS_TO_WEB = Rewriter(
+    remove=(_NODE_BSDF,),
+    replace=_FS_TO_WEB_REPLACE,
+    words={'in': 'varying', 'frag_color': 'gl_FragColor', 'gl_FragColor': 'gl_FragColor'},
+    prefix=('gl_', 'bl_', 'FrontFacing'),
+)
+
+
+def _add_130_attributes(data):
     data['attributes'].append({'varname': 'bl_Vertex', 'type': gpu.CD_ORCO, 'datatype': gpu.GPU_DATA_3F})
     data['attributes'].append({'varname': 'bl_Normal', 'type': -1, 'datatype': gpu.GPU_DATA_3F})
-    src = data['vertex']
-    src = '#version 130\nin vec4 bl_Vertex;\nin vec3 bl_Normal;\nuniform mat4 bl_ModelViewMatrix;\nuniform mat4 bl_ProjectionMatrix;\nuniform mat3 bl_NormalMatrix;\n' + src
-    src = re.sub(r'#ifdef USE_OPENSUBDIV([^#]*)#endif', '', src)
-    src = re.sub(r'#ifndef USE_OPENSUBDIV([^#]*)#endif', r'\1', src)
-    src = re.sub(r'#ifdef CLIP_WORKAROUND(.*?)#endif', '', src, 0, re.DOTALL)
-    src = re.sub(r'\bvarying\b', 'out', src)
-    src = re.sub(r'\bgl_(?!Position)(.*?)\b', r'bl_\1', src)
 
-    data['vertex'] = src
 
+def vs_to_130(data):
+    _add_130_attributes(data)
+    data['vertex'] = _VS_130(VS_130_HEADER + data['vertex'])
 
-def fs_to_130(data):
-    src = data['fragment']
-    src = '#version 130\nout vec4 frag_color;\nuniform mat4 bl_ProjectionMatrix;\nuniform mat4 bl_ModelViewMatrix;\nuniform mat4 bl_ModelViewMatrixInverse;\nuniform mat3 bl_NormalMatrix;\nuniform mat4 bl_ProjectionMatrixInverse;\n' + src
-    src = re.sub(r'\bvarying\b', 'in', src)
-    src = re.sub(r'\bgl_FragColor\b', 'frag_color', src)
-    src = re.sub(r'\bgl_(?!FrontFacing)(.*?)\b', r'bl_\1', src)
-
-    # Cannot support node_bsdf functions without resolving use of gl_Light
-    src = re.sub(r'void node_((bsdf)|(subsurface))_.*?^}', '', src, 0, re.DOTALL|re.MULTILINE)
 
-    data['fragment'] = src.replace('\r\r\n', '')
+def fs_to_130(data):
+    data['fragment'] = _FS_130(FS_130_HEADER + data['fragment'])
 
 
 def vs_to_web(data):
-    src = data['vertex']
-
-    precision_block = '\n'
-    for data_type in ('float','int'):
-        precision_block += 'precision mediump {};\n'.format(data_type)
-
-    src = src.replace('#version 130', '#version 100\n' + precision_block)
-    src = re.sub(r'\bin\b', 'attribute', src)
-    src = re.sub(r'\bout\b', 'varying', src)
-
-    data['vertex'] = src
+    data['vertex'] = _VS_WEB(data['vertex'])
 
 
 def fs_to_web(data):
-    src = data['fragment']
-
-    precision_block = '\n'
-    for data_type in ('float','int'):
-        precision_block += 'precision mediump {};\n'.format(data_type)
-
-    src = src.replace('#version 130', '#version 100\n#extension GL_OES_standard_derivatives: enable\n' + precision_block)
-    src = re.sub(r'\bin\b', 'varying', src)
-    src = src.replace('out vec4 frag_color;\n', '')
-    src = re.sub(r'\bfrag_color\b', 'gl_FragColor', src)
-
-    #TODO: This should be fixed in Blender
-    src = src.replace('blend = (normalize(vec).z + 1)', 'blend = (normalize(vec).z + 1.0)')
-
-    #TODO: This likely breaks shadows
-    src = src.replace('sampler2DShadow', 'sampler2D')
-    src = src.replace('shadow2DProj', 'texture2DProj')
-
-    data['fragment'] = src
+    data['fragment'] = _FS_WEB(data['fragment'])
 
 
 def to_130(data):
@@ -72,6 +173,58 @@ def to_130(data):
 
 
 def to_web(data):
-    to_130(data)
-    vs_to_web(data)
-    fs_to_web(data)
+    _add_130_attributes(data)
+    data['vertex'] = _VS_TO_WEB(VS_130_HEADER + data['vertex'])
+
+    fragment = FS_130_HEADER + data['fragment']
+    if '\r\r\n' in fragment:
+        # fs_to_130 removes these, joining lines, and the web rewrites have
+        # to see the words that makes
+        data['fragment'] = _FS_WEB(_FS_130(fragment))
+    else:
+        data['fragment'] = _FS_TO_WEB(fragment)
+
+
+def conversion_key(data, profile):
+    """Return a hash of the shader sources in data (as returned by
+    gpu.export_shader) and the asset profile they are converted for."""
+    fingerprint = hashlib.sha1(profile.encode())
+    for stage in ('vertex', 'fragment'):
+        src = data[stage].encode()
+        fingerprint.update('{}:{}:'.format(stage, len(src)).encode())
+        fingerprint.update(src)
+    return fingerprint.hexdigest()
+
+
+def convert(data, profile, key=None):
+    """Return the conversion of the shaders in data for profile: to_130 for
+    'DESKTOP', to_web otherwise, as a dict of the converted 'vertex' and
+    'fragment' sources and the 'attributes' the conversion adds.
+
+    data is not changed, see apply_conversion. Blender generates the same
+    shaders for many materials, so the most recent conversions are
+    remembered by conversion_key (key, if it is already known).
+    """
+    key = key or conversion_key(data, profile)
+    conversion = _conversions.get(key)
+    if conversion is not None:
+        _conversions.move_to_end(key)
+        return conversion
+
+    converted = {'vertex': data['vertex'], 'fragment': data['fragment'], 'attributes': []}
+    if profile == 'DESKTOP':
+        to_130(converted)
+    else:
+        to_web(converted)
+
+    _conversions[key] = converted
+    while len(_conversions) > CONVERSION_CACHE_SIZE:
+        _conversions.popitem(last=False)
+    return converted
+
+
+def apply_conversion(data, conversion):
+    """Replace the shaders in data with a conversion returned by convert."""
+    data['vertex'] = conversion['vertex']
+    data['fragment'] = conversion['fragment']
+    data['attributes'].extend(dict(attribute) for attribute in conversion['attributes'])
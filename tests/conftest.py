@@ -0,0 +1,45 @@
+"""Fixtures shared by the tests.
+
+The processing modules are imported straight from the repository root. The
+exporter itself needs bpy, so it is imported as part of the add-on package.
+Outside of Blender the stand-ins of the benchmarks take the place of its
+modules.
+"""
+
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+import animation_processing
+import image_processing
+import mesh_processing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = 'blendergltf_tests'
+
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+sys.path.append(os.path.join(ROOT, 'benchmarks', 'stubs'))
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    """Run a test with NumPy and again with the plain Python fallbacks."""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        for module in (animation_processing, image_processing, mesh_processing):
+            monkeypatch.setattr(module, 'np', None)
+    return request.param
+
+
+@pytest.fixture(scope='session')
+def blendergltf():
+    """The blendergltf module."""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [ROOT]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(PACKAGE + '.blendergltf')
@@ -0,0 +1,17 @@
+"""pytest plugin collecting the repository root as a plain directory.
+
+pytest imports the __init__.py of packages it collects tests from, and the
+one at the root registers the add-on with Blender.
+"""
+
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pytest_collect_directory(path, parent):
+    if str(path) == ROOT:
+        return pytest.Dir.from_parent(parent, path=path)
+    return None
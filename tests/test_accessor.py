@@ -0,0 +1,92 @@
+import pytest
+
+
+@pytest.fixture
+def gltf(blendergltf, backend, monkeypatch):
+    if backend == 'python':
+        monkeypatch.setattr(blendergltf, 'np', None)
+    return blendergltf
+
+
+def _flat(values):
+    # read_array returns a NumPy array or a flat list, depending on backend
+    return [value for value in (values.ravel().tolist() if hasattr(values, 'ravel') else values)]
+
+
+def _interleaved(gltf, count):
+    """Return a buffer with a view of count positions and UVs side by side."""
+    Buffer = gltf.Buffer
+    buf = Buffer('interleaved')
+    view = buf.add_view(20 * count, Buffer.ARRAY_BUFFER)
+    positions = buf.add_accessor(view, 0, 20, Buffer.FLOAT, count, Buffer.VEC3)
+    uvs = buf.add_accessor(view, 12, 20, Buffer.FLOAT, count, Buffer.VEC2)
+    return buf, view, positions, uvs
+
+
+def test_write_array_matches_item_writes(gltf):
+    positions = [0.25 * i - 1.5 for i in range(12)]
+    uvs = [0.125 * i for i in range(8)]
+
+    buf, view, position_data, uv_data = _interleaved(gltf, 4)
+    position_data.write_array(positions)
+    uv_data.write_array(uvs)
+
+    expected, expected_view, expected_positions, expected_uvs = _interleaved(gltf, 4)
+    for i, value in enumerate(positions):
+        expected_positions[i] = value
+    for i, value in enumerate(uvs):
+        expected_uvs[i] = value
+
+    assert buf.buffer_views[view]['data'] == expected.buffer_views[expected_view]['data']
+    assert buf.export_accessors() == expected.export_accessors()
+
+
+def test_read_array_round_trip(gltf):
+    positions = [0.25 * i - 1.5 for i in range(12)]
+    uvs = [0.125 * i for i in range(8)]
+
+    buf, view, position_data, uv_data = _interleaved(gltf, 4)
+    position_data.write_array(positions)
+    uv_data.write_array(uvs)
+
+    assert _flat(position_data.read_array()) == positions
+    assert _flat(uv_data.read_array()) == uvs
+    assert [position_data[i] for i in range(12)] == positions
+
+
+@pytest.mark.parametrize('component_type, values', [
+    ('UNSIGNED_SHORT', [0, 1, 65535, 2, 3, 4]),
+    ('SHORT', [-32767, 0, 32767, -1, 1, 2]),
+    ('UNSIGNED_INT', [0, 70000, 4294967295, 1, 2, 3]),
+])
+def test_write_array_integers(gltf, component_type, values):
+    Buffer = gltf.Buffer
+    component_type = getattr(Buffer, component_type)
+    accessors = []
+    for name in ('bulk', 'items'):
+        buf = Buffer(name)
+        view = buf.add_view(4 * len(values), Buffer.ELEMENT_ARRAY_BUFFER)
+        accessors.append(buf.add_accessor(view, 0, 0, component_type, len(values) // 3, Buffer.VEC3))
+    bulk, items = accessors
+
+    bulk.write_array(values)
+    for i, value in enumerate(values):
+        items[i] = value
+
+    assert [int(value) for value in _flat(bulk.read_array())] == values
+    assert (bulk.min, bulk.max) == (items.min, items.max)
+
+
+def test_write_array_checks_the_length(gltf):
+    buf, view, positions, uvs = _interleaved(gltf, 2)
+
+    with pytest.raises(ValueError):
+        positions.write_array([0.0] * 9)
+
+
+def test_empty_accessor(gltf):
+    buf, view, positions, uvs = _interleaved(gltf, 0)
+
+    positions.write_array([])
+
+    assert len(_flat(positions.read_array())) == 0
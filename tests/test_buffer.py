@@ -0,0 +1,53 @@
+import struct
+
+import pytest
+
+
+def test_add_buffer_aligns_views(blendergltf):
+    Buffer = blendergltf.Buffer
+    first = Buffer('first')
+    index_view = first.add_view(6, Buffer.ELEMENT_ARRAY_BUFFER)
+    indices = first.add_accessor(index_view, 0, 2, Buffer.UNSIGNED_SHORT, 3, Buffer.SCALAR)
+    indices.write_array([0, 1, 2])
+    second = Buffer('second')
+    vertex_view = second.add_view(12, Buffer.ARRAY_BUFFER)
+    positions = second.add_accessor(vertex_view, 0, 12, Buffer.FLOAT, 1, Buffer.VEC3)
+    positions.write_array([1.0, 2.0, 3.0])
+
+    combined = Buffer('combined')
+    combined.add_buffer(first)
+    combined.add_buffer(second)
+
+    views = combined.export_views()
+    assert views[index_view]['byteOffset'] == 0
+    assert views[vertex_view]['byteOffset'] == 8
+    assert {view['buffer'] for view in views.values()} == {combined.name}
+    assert combined.bytelength == 20
+    assert set(combined.export_accessors()) == {indices.name, positions.name}
+    assert indices.buffer is combined and positions.buffer is combined
+    assert not first.buffer_views and not first.accessors and first.bytelength == 0
+
+    data = b''.join(combined.iter_data())
+    assert len(data) == combined.bytelength
+    assert struct.unpack_from('<3H', data, 0) == (0, 1, 2)
+    assert data[6:8] == b'\0\0'
+    assert struct.unpack_from('<3f', data, 8) == (1.0, 2.0, 3.0)
+
+
+@pytest.mark.parametrize('alignment', [1, 4, 16])
+def test_add_buffer_alignment(blendergltf, alignment):
+    Buffer = blendergltf.Buffer
+    combined = Buffer('combined')
+    views = []
+    for length in (3, 5, 8):
+        buf = Buffer('part{}'.format(length))
+        views.append(buf.add_view(length, None))
+        buf.buffer_views[views[-1]]['data'][:] = bytes([length]) * length
+        combined.add_buffer(buf, alignment)
+
+    offsets = [combined.buffer_views[view]['byteoffset'] for view in views]
+    assert all(offset % alignment == 0 for offset in offsets)
+
+    data = b''.join(combined.iter_data())
+    for view, offset, length in zip(views, offsets, (3, 5, 8)):
+        assert data[offset:offset + length] == bytes([length]) * length
@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+np = pytest.importorskip('numpy')
+mathutils = pytest.importorskip('mathutils')
+
+import animation_processing
+
+
+def _scale_matrix(x, y, z):
+    return mathutils.Matrix(((x, 0, 0, 0), (0, y, 0, 0), (0, 0, z, 0), (0, 0, 0, 1)))
+
+
+def _matrices():
+    """Return transforms covering every branch of the quaternion conversion,
+    with uniform, non-uniform and mirroring scales."""
+    Matrix = mathutils.Matrix
+    rotations = [Matrix.Identity(4)]
+    for axis in 'XYZ':
+        for angle in (0.3, -1.2, 2.9, math.pi):
+            rotations.append(Matrix.Rotation(angle, 4, axis))
+    rotations.append(Matrix.Rotation(2.5, 4, 'X') * Matrix.Rotation(-2.0, 4, 'Y') * Matrix.Rotation(1.0, 4, 'Z'))
+
+    scales = [(1, 1, 1), (2, 2, 2), (0.5, 3, 1.5), (-1, 1, 1), (1, -2, 0.5), (-1, -1, -1)]
+    return [
+        Matrix.Translation((i * 0.5, -1.0, 2.0)) * rotation * _scale_matrix(*scale)
+        for i, (rotation, scale) in enumerate((r, s) for r in rotations for s in scales)
+    ]
+
+
+def test_decompose_matrices_matches_mathutils():
+    matrices = _matrices()
+
+    locs, rots, scales = animation_processing.decompose_matrices([[list(row) for row in mat] for mat in matrices])
+
+    for mat, loc, rot, scale in zip(matrices, locs, rots, scales):
+        expected_loc, expected_rot, expected_scale = mat.decompose()
+        assert loc == pytest.approx(list(expected_loc), abs=1e-6)
+        assert scale == pytest.approx(list(expected_scale), abs=1e-6)
+        # q and -q are the same rotation, rotations are made continuous
+        assert abs(np.dot(rot, list(expected_rot))) == pytest.approx(1.0, abs=1e-6)
+
+
+def test_decompose_matrices_mirrors_with_negative_scales():
+    mirrored = [[list(row) for row in _scale_matrix(-1, 2, 3)]]
+
+    locs, rots, scales = animation_processing.decompose_matrices(mirrored)
+
+    # All three scales are negated, leaving half a turn about X
+    assert scales[0] == pytest.approx([-1, -2, -3])
+    assert abs(rots[0][0]) == pytest.approx(0.0, abs=1e-12)
+    assert abs(rots[0][1]) == pytest.approx(1.0)
+
+
+def test_decompose_matrices_keeps_rotations_continuous():
+    matrices = [
+        [list(row) for row in mathutils.Matrix.Rotation(angle, 4, 'Z')]
+        for angle in np.linspace(0, 4 * math.pi, 17)
+    ]
+
+    locs, rots, scales = animation_processing.decompose_matrices(matrices)
+
+    assert (np.einsum('ij,ij->i', rots[1:], rots[:-1]) > 0).all()
@@ -0,0 +1,75 @@
+import os
+import pickle
+
+import export_cache
+
+
+def test_fingerprint_tags_values():
+    Fingerprint = export_cache.Fingerprint
+
+    assert Fingerprint([1, 2]).hexdigest() != Fingerprint([12]).hexdigest()
+    assert Fingerprint('1').hexdigest() != Fingerprint(1).hexdigest()
+    assert Fingerprint(b'ab').hexdigest() != Fingerprint('ab').hexdigest()
+    assert Fingerprint({'a': 1, 'b': 2}).hexdigest() == Fingerprint({'b': 2, 'a': 1}).hexdigest()
+    assert Fingerprint('a', 'b').hexdigest() == Fingerprint('a').update('b').hexdigest()
+
+
+def test_round_trip(tmpdir):
+    cache = export_cache.ExportCache(str(tmpdir), 1 << 20)
+    value = {'name': 'Cube', 'data': b'\x00\x01', 'values': [1.5, None, 'x']}
+
+    assert cache.get('meshes', 'key') is None
+    cache.put('meshes', 'key', value)
+
+    assert cache.get('meshes', 'key') == value
+    assert export_cache.ExportCache(str(tmpdir), 1 << 20).get('meshes', 'key') == value
+    assert cache.stats()['kinds'] == {'meshes': {'hits': 1, 'misses': 1}}
+
+
+def test_salt_separates_entries(tmpdir):
+    export_cache.ExportCache(str(tmpdir), 1 << 20, salt='1').put('meshes', 'key', 'old')
+
+    assert export_cache.ExportCache(str(tmpdir), 1 << 20, salt='2').get('meshes', 'key') is None
+    assert export_cache.ExportCache(str(tmpdir), 1 << 20, salt='1').get('meshes', 'key') == 'old'
+
+
+def test_unreadable_entries_are_misses(tmpdir, caplog):
+    cache = export_cache.ExportCache(str(tmpdir), 1 << 20)
+    cache.put('meshes', 'key', 'value')
+    with open(cache._path('key'), 'wb') as fout:
+        fout.write(b'not a pickle')
+
+    assert cache.get('meshes', 'key') is None
+    assert cache.misses['meshes'] == 1
+    assert [record.name for record in caplog.records] == [export_cache.__name__]
+    assert 'unreadable cache entry' in caplog.records[0].getMessage()
+
+
+def test_evict_removes_least_recently_used(tmpdir):
+    cache = export_cache.ExportCache(str(tmpdir), 1 << 20)
+    for i, key in enumerate(('a', 'b', 'c')):
+        cache.put('meshes', key, bytes(1000))
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    entry_size = os.path.getsize(cache._path('a'))
+
+    # Reading a marks it as recently used, which leaves b the oldest
+    cache.get('meshes', 'a')
+    cache.max_size = 2 * entry_size
+    cache.evict()
+
+    assert not os.path.exists(cache._path('b'))
+    assert cache.get('meshes', 'a') == bytes(1000)
+    assert cache.get('meshes', 'c') == bytes(1000)
+    assert cache.stats()['entries'] == 2
+
+
+def test_close_adds_up_totals(tmpdir):
+    for _ in range(2):
+        cache = export_cache.ExportCache(str(tmpdir), 1 << 20)
+        cache.get('images', 'key')
+        cache.put('images', 'key', 'value')
+        cache.get('images', 'key')
+        stats = cache.close()
+
+    assert stats['totals'] == {'images': {'hits': 3, 'misses': 1}}
+    assert stats['hit_rate'] == 1.0
@@ -0,0 +1,53 @@
+import base64
+import io
+import json
+import struct
+
+import pytest
+
+
+@pytest.fixture
+def make_scene(blendergltf):
+    # Scenes are built with the bpy stand-ins of the benchmarks
+    synthetic = pytest.importorskip('synthetic')
+    return lambda: synthetic.build_scene(num_objects=2, grid_size=3, uv_layers=1, materials=2)
+
+
+def _read_glb(data):
+    """Return the header, the JSON content and the body of a binary glTF."""
+    header = struct.unpack_from('<4sIIII', data)
+    content_length = header[3]
+    content = json.loads(data[20:20 + content_length].decode('utf-8'))
+    return header, content, data[20 + content_length:]
+
+
+def test_export_glb_layout(blendergltf, make_scene):
+    fout = io.BytesIO()
+    blendergltf.export_glb(make_scene(), {}, fout)
+    data = fout.getvalue()
+
+    (magic, version, length, content_length, content_format), content, body = _read_glb(data)
+    assert (magic, version, content_format) == (b'glTF', 1, 0)
+    assert length == len(data)
+    assert (20 + content_length) % 4 == 0
+    assert 'KHR_binary_glTF' in content['extensionsUsed']
+    assert content['buffers'] == {
+        'binary_glTF': {'byteLength': len(body), 'type': 'arraybuffer', 'uri': 'data:,'},
+    }
+    for view in content['bufferViews'].values():
+        assert view['buffer'] == 'binary_glTF'
+        assert view['byteOffset'] + view['byteLength'] <= len(body)
+
+
+def test_export_glb_body_matches_combined_buffer(blendergltf, make_scene):
+    fout = io.BytesIO()
+    blendergltf.export_glb(make_scene(), {}, fout)
+    header, content, body = _read_glb(fout.getvalue())
+
+    gltf = blendergltf.export_gltf(make_scene(), {'buffers_combine_data': True})
+
+    buf, = gltf['buffers'].values()
+    assert base64.b64decode(buf['uri'].split(',', 1)[1]) == body
+    assert gltf['accessors'] == content['accessors']
+    assert [(view['byteOffset'], view['byteLength']) for _, view in sorted(gltf['bufferViews'].items())] == \
+        [(view['byteOffset'], view['byteLength']) for _, view in sorted(content['bufferViews'].items())]
@@ -0,0 +1,77 @@
+import base64
+import math
+import struct
+
+import pytest
+
+
+@pytest.fixture
+def scene(blendergltf):
+    # Scenes are built with the bpy stand-ins of the benchmarks
+    synthetic = pytest.importorskip('synthetic')
+    import bpy
+
+    scene_delta = synthetic.build_scene(num_objects=4, grid_size=2, materials=1)
+    objects = {obj.name: obj for obj in scene_delta['objects']}
+
+    animated = objects['Object1']
+    animated.animation_data = bpy.AnimData(synthetic.make_object_action('Move', 10))
+    scene_delta['actions'] = list(bpy.data.actions)
+
+    parent, child = objects['Object2'], objects['Object3']
+    child.parent = parent
+    parent.children.append(child)
+    return scene_delta, objects
+
+
+def _global_matrix():
+    import mathutils
+    return mathutils.Matrix.Rotation(-math.pi / 2, 4, 'X')
+
+
+def _togl(mat):
+    return [value for col in zip(*[list(row) for row in mat]) for value in col]
+
+
+def _positions(gltf, mesh_name):
+    accessor = gltf['accessors'][gltf['meshes'][mesh_name]['primitives'][0]['attributes']['POSITION']]
+    view = gltf['bufferViews'][accessor['bufferView']]
+    data = base64.b64decode(gltf['buffers'][view['buffer']]['uri'].split(',', 1)[1])
+    offset = view['byteOffset'] + accessor['byteOffset']
+    stride = accessor['byteStride'] or 12
+    return [struct.unpack_from('<3f', data, offset + i * stride) for i in range(accessor['count'])]
+
+
+def _transform(gl_matrix, position):
+    # gl_matrix is column major
+    return tuple(sum(gl_matrix[col * 4 + row] * value for col, value in enumerate(list(position) + [1.0]))
+                 for row in range(3))
+
+
+def test_world_positions_include_the_global_matrix(blendergltf, scene):
+    scene_delta, objects = scene
+    global_matrix = _global_matrix()
+
+    gltf = blendergltf.export_gltf(scene_delta, {'global_matrix': global_matrix})
+
+    for name, obj in objects.items():
+        node = gltf['nodes'][name]
+        world = sorted(_transform(node['matrix'], position) for position in _positions(gltf, node['meshes'][0]))
+        expected = sorted(tuple(global_matrix * obj.matrix_world * vertex.co) for vertex in obj.data.vertices)
+        assert len(world) == len(expected)
+        for position, expected_position in zip(world, expected):
+            assert position == pytest.approx(expected_position, abs=1e-5), name
+
+
+def test_global_matrix_is_baked_for_animated_and_parented_meshes(blendergltf, scene):
+    scene_delta, objects = scene
+    global_matrix = _global_matrix()
+
+    gltf = blendergltf.export_gltf(scene_delta, {'global_matrix': global_matrix})
+
+    # Action channels and child nodes use the plain transforms of objects,
+    # so their nodes must not carry the global matrix
+    for name in ('Object1', 'Object2', 'Object3'):
+        assert gltf['nodes'][name]['matrix'] == pytest.approx(_togl(objects[name].matrix_world))
+    assert gltf['nodes']['Object0']['matrix'] == pytest.approx(_togl(global_matrix * objects['Object0'].matrix_world))
+    assert any(channel['id'] == 'Object1' for channel in gltf['extensions']['BLENDER_actions']['actions']['Object1|Move']['channels'])
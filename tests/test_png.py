@@ -0,0 +1,118 @@
+import random
+import struct
+import zlib
+
+import pytest
+
+import image_processing
+
+
+def _paeth(left, up, up_left):
+    estimate = left + up - up_left
+    to_left, to_up, to_up_left = abs(estimate - left), abs(estimate - up), abs(estimate - up_left)
+    if to_left <= to_up and to_left <= to_up_left:
+        return left
+    return up if to_up <= to_up_left else up_left
+
+
+def _decode_png(data):
+    """Return (width, height, channels, filter types, rows) of an 8-bit PNG,
+    decoded with zlib and the unfiltering rules of the PNG specification."""
+    assert data.startswith(image_processing.PNG_SIGNATURE)
+    position = len(image_processing.PNG_SIGNATURE)
+    chunks = []
+    while position < len(data):
+        length, = struct.unpack('>I', data[position:position + 4])
+        tag = data[position + 4:position + 8]
+        body = data[position + 8:position + 8 + length]
+        crc, = struct.unpack('>I', data[position + 8 + length:position + 12 + length])
+        assert crc == zlib.crc32(tag + body) & 0xffffffff
+        chunks.append((tag, body))
+        position += 12 + length
+
+    assert chunks[0][0] == b'IHDR'
+    assert chunks[-1] == (b'IEND', b'')
+    width, height, depth, color_type, _, _, _ = struct.unpack('>IIBBBBB', chunks[0][1])
+    assert depth == 8
+    channels = {0: 1, 4: 2, 2: 3, 6: 4}[color_type]
+
+    raw = zlib.decompress(b''.join(body for tag, body in chunks if tag == b'IDAT'))
+    row_size = width * channels
+    assert len(raw) == height * (row_size + 1)
+
+    filter_types = []
+    rows = []
+    previous = [0] * row_size
+    for y in range(height):
+        start = y * (row_size + 1)
+        filter_type = raw[start]
+        row = []
+        for i, value in enumerate(raw[start + 1:start + 1 + row_size]):
+            left = row[i - channels] if i >= channels else 0
+            up = previous[i]
+            up_left = previous[i - channels] if i >= channels else 0
+            predictor = [0, left, up, (left + up) >> 1, _paeth(left, up, up_left)][filter_type]
+            row.append((value + predictor) & 0xff)
+        filter_types.append(filter_type)
+        rows.append(row)
+        previous = row
+
+    return width, height, channels, filter_types, rows
+
+
+def _to_pixels(rows):
+    # Blender stores the bottom row first
+    return [value / 255 for row in reversed(rows) for value in row]
+
+
+def _filter_test_rows(width):
+    """Return grey rows, top first, meant to be filtered with each of the
+    five PNG filter types."""
+    rng = random.Random(0)
+    ramp = [10 + 5 * x for x in range(width)]
+    noise = [rng.randrange(256) for _ in range(width)]
+    average = []
+    for x in range(width):
+        average.append(((average[-1] if average else 0) + noise[x]) >> 1)
+    columns = [rng.randrange(100) for _ in range(width)]
+    additive = [[offset + column for column in columns] for offset in (17, 80, 3, 120)]
+    return [[0] * width, ramp, ramp, noise, average] + additive
+
+
+def test_encode_png_uses_every_filter_type(backend):
+    width = 32
+    rows = _filter_test_rows(width)
+
+    data = image_processing.encode_png(_to_pixels(rows), width, len(rows), 1)
+
+    decoded_width, height, channels, filter_types, decoded = _decode_png(data)
+    assert (decoded_width, height, channels) == (width, len(rows), 1)
+    assert decoded == rows
+    if backend == 'numpy':
+        assert filter_types[:5] == [0, 1, 2, 0, 3]
+        assert set(filter_types[6:]) == {4}
+    else:
+        assert set(filter_types) == {0}
+
+
+@pytest.mark.parametrize('channels', [1, 2, 3, 4])
+def test_encode_png_round_trip(backend, channels):
+    rng = random.Random(channels)
+    width, height = 7, 5
+    rows = [[rng.randrange(256) for _ in range(width * channels)] for _ in range(height)]
+
+    data = image_processing.encode_png(_to_pixels(rows), width, height, channels)
+
+    assert _decode_png(data)[:3] == (width, height, channels)
+    assert _decode_png(data)[4] == rows
+
+
+def test_encode_png_in_strips(backend, monkeypatch):
+    # Filtering continues from the last row of the previous strip
+    monkeypatch.setattr(image_processing, 'STRIP_SIZE', 64)
+    width = 32
+    rows = _filter_test_rows(width)
+
+    data = image_processing.encode_png(_to_pixels(rows), width, len(rows), 1)
+
+    assert _decode_png(data)[4] == rows
@@ -0,0 +1,66 @@
+import pytest
+
+import mesh_processing
+
+
+def test_triangulate_keeps_triangles(backend):
+    triangles, polygons = mesh_processing.triangulate([0, 3, 7], [3, 4, 3])
+
+    assert [tuple(int(i) for i in triangle) for triangle in triangles] == [
+        (0, 1, 2),
+        (6, 3, 4), (6, 4, 5),
+        (7, 8, 9),
+    ]
+    assert [int(poly) for poly in polygons] == [0, 1, 1, 2]
+
+
+def test_triangulate_fans_from_the_last_loop(backend):
+    triangles, polygons = mesh_processing.triangulate([0], [6])
+
+    assert [tuple(int(i) for i in triangle) for triangle in triangles] == [
+        (5, 0, 1), (5, 1, 2), (5, 2, 3), (5, 3, 4),
+    ]
+
+
+def test_triangulate_rejects_degenerate_polygons(backend):
+    with pytest.raises(RuntimeError):
+        mesh_processing.triangulate([0, 3], [3, 2])
+
+
+def _mesh_data(backend, records, loop_starts, loop_totals, material_indices, materials):
+    if backend == 'numpy':
+        import numpy as np
+        records = np.asarray(records, dtype=np.float32)
+    return {
+        'records': records,
+        'loop_vertices': list(range(len(records))),
+        'loop_starts': loop_starts,
+        'loop_totals': loop_totals,
+        'material_indices': material_indices,
+        'materials': materials,
+        'joints': None,
+        'weights': None,
+        'normal_epsilon': 0.0,
+        'optimize_vertex_cache': False,
+        'measure_vertex_cache': False,
+        'max_vertices': 65536,
+    }
+
+
+def test_process_mesh_triangles_and_ngons(backend):
+    # A triangle, a quad and a pentagon, the last loop of the quad repeats
+    # the first loop of the triangle
+    records = [(float(i), 0.0, 0.0, 0.0, 0.0, 1.0) for i in range(3)]
+    records += [(float(i), 1.0, 0.0, 0.0, 0.0, 1.0) for i in range(3)] + [records[0]]
+    records += [(float(i), 2.0, 0.0, 0.0, 0.0, 1.0) for i in range(5)]
+    data = _mesh_data(backend, records, [0, 3, 7], [3, 4, 5], [0, 1, 0], ['A', 'B'])
+
+    result = mesh_processing.process_mesh(data)
+
+    assert len(result['vertex_data']) == 11
+    prims = [(name, [int(i) for i in indices]) for name, indices in result['prims']]
+    assert prims == [
+        ('A', [0, 1, 2, 10, 6, 7, 10, 7, 8, 10, 8, 9]),
+        ('B', [0, 3, 4, 0, 4, 5]),
+    ]
+    assert result['max_index'] == 10
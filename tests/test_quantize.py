@@ -0,0 +1,53 @@
+import pytest
+
+import mesh_processing
+
+
+def _flat(values):
+    # Quantized values are NumPy arrays or flat lists, depending on backend
+    return [int(value) for value in (values.ravel() if hasattr(values, 'ravel') else values)]
+
+
+@pytest.mark.parametrize('max_value', [127, 32767])
+def test_quantize_unit_round_trip(backend, max_value):
+    values = [-1.0, -0.7071, -0.001, 0.0, 0.3333, 0.9999, 1.0]
+
+    quantized = mesh_processing.quantize_unit(values, max_value)
+
+    for value, q in zip(values, _flat(quantized)):
+        assert abs(q / max_value - value) <= 0.5 / max_value
+
+
+def test_quantize_unit_clamps(backend):
+    assert _flat(mesh_processing.quantize_unit([-2.0, 2.0], 127)) == [-127, 127]
+
+
+def test_quantize_range_round_trip(backend):
+    values = [0.0, -3.0, 5.0, 0.25, 12.5, 5.0, 0.75, 1.0, 5.0]
+
+    quantized, offsets, scales = mesh_processing.quantize_range(values, 3, 65535)
+
+    quantized = _flat(quantized)
+    assert min(quantized) == 0
+    assert max(quantized) == 65535
+    # The last column does not vary and keeps a scale of 1
+    assert scales[2] == 1.0
+    for i, (value, q) in enumerate(zip(values, quantized)):
+        column = i % 3
+        assert abs(offsets[column] + q * scales[column] - value) <= scales[column] / 2 + 1e-12
+
+
+def test_quantize_weights_sums_to_max_value(backend):
+    weights = [1 / 3, 1 / 3, 1 / 3, 0.0, 0.5, 0.25, 0.125, 0.125, 0.2, 0.1, 0.0, 0.0]
+
+    quantized = mesh_processing.quantize_weights(weights, 255)
+
+    quantized = _flat(quantized)
+    rows = [quantized[i:i + 4] for i in range(0, 12, 4)]
+    assert sum(rows[0]) == 255
+    assert sum(rows[1]) == 255
+    # Rows that do not sum to one are only rounded
+    assert rows[2] == [51, 26, 0, 0]
+    for row, original in zip(rows, [weights[i:i + 4] for i in range(0, 12, 4)]):
+        for q, weight in zip(row, original):
+            assert abs(q / 255 - weight) <= 1 / 255
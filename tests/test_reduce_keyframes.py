@@ -0,0 +1,69 @@
+import math
+
+import pytest
+
+import animation_processing
+
+
+def _lerp(start, end, t):
+    return [a + (b - a) * t for a, b in zip(start, end)]
+
+
+def _slerp(start, end, t):
+    theta = math.acos(max(-1.0, min(1.0, sum(a * b for a, b in zip(start, end)))))
+    if theta < 1e-9:
+        return _lerp(start, end, t)
+    return [(a * math.sin((1 - t) * theta) + b * math.sin(t * theta)) / math.sin(theta)
+            for a, b in zip(start, end)]
+
+
+def _worst_error(times, values, keep, slerp):
+    """Return the largest error of interpolating values between the kept
+    samples."""
+    interpolate = _slerp if slerp else _lerp
+    worst = 0.0
+    for first, last in zip(keep, keep[1:]):
+        for i in range(first, last + 1):
+            t = (times[i] - times[first]) / (times[last] - times[first])
+            expected = interpolate(values[first], values[last], t)
+            worst = max(worst, animation_processing.channel_error(expected, values[i], slerp))
+    return worst
+
+
+@pytest.mark.parametrize('tolerance', [0.1, 0.01, 0.001])
+def test_reduce_keyframes_stays_within_tolerance(backend, tolerance):
+    times = [i / 24 for i in range(97)]
+    values = [(math.sin(3 * t), t * t, 1.0) for t in times]
+
+    keep = animation_processing.reduce_keyframes(times, values, tolerance)
+
+    assert keep[0] == 0
+    assert keep[-1] == len(values) - 1
+    assert keep == sorted(set(keep))
+    assert _worst_error(times, values, keep, False) <= tolerance
+
+
+@pytest.mark.parametrize('tolerance', [0.05, 0.001])
+def test_reduce_keyframes_stays_within_tolerance_with_slerp(backend, tolerance):
+    times = [i / 24 for i in range(49)]
+    values = []
+    for t in times:
+        # Rotation about an axis that turns, at a changing speed
+        angle = 2 * t * t
+        axis = (math.cos(t), math.sin(t), 0.0)
+        values.append((math.cos(angle / 2),) + tuple(c * math.sin(angle / 2) for c in axis))
+
+    keep = animation_processing.reduce_keyframes(times, values, tolerance, slerp=True)
+
+    assert _worst_error(times, values, keep, True) <= tolerance
+
+
+def test_reduce_keyframes_keeps_lines_and_constants_short(backend):
+    times = [0.0, 1.0, 2.0, 3.0]
+
+    line = animation_processing.reduce_keyframes(times, [(0.0,), (1.0,), (2.0,), (3.0,)], 1e-6)
+    constant = animation_processing.reduce_keyframes(times, [(1.0,), (1.0,), (1.0,), (1.0,)], 1e-6)
+
+    assert list(line) == [0, 3]
+    assert list(constant) == [0]
+    assert animation_processing.reduce_keyframes([], [], 0.1) == []
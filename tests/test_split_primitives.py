@@ -0,0 +1,27 @@
+import mesh_processing
+
+
+def test_split_primitives_keeps_primitives_below_the_limit(backend):
+    indices = [0, 1, 65535]
+
+    order, prims, ranges = mesh_processing.split_primitives([('mat', indices)], 65536)
+
+    assert [order[i] for i in prims[0][1]] == indices
+    assert ranges == [None]
+
+
+def test_split_primitives_splits_at_the_limit(backend):
+    # 21846 triangles using the vertices 0 to 65537
+    indices = list(range(65538))
+
+    order, prims, ranges = mesh_processing.split_primitives([('mat', indices)], 65536)
+
+    assert len(prims) == 2
+    triangles = []
+    for (name, chunk), (first, count) in zip(prims, ranges):
+        chunk = [int(i) for i in chunk]
+        assert name == 'mat'
+        assert max(chunk) < 65536
+        assert max(chunk) < count
+        triangles.extend(order[first + i] for i in chunk)
+    assert triangles == indices
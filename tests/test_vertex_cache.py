@@ -0,0 +1,58 @@
+import random
+
+import mesh_processing
+
+
+def _grid(size):
+    """Return the triangle indices of a size x size quad grid."""
+    indices = []
+    for y in range(size):
+        for x in range(size):
+            base = y * (size + 1) + x
+            indices += [base, base + 1, base + size + 2, base, base + size + 2, base + size + 1]
+    return indices, (size + 1) * (size + 1)
+
+
+def _triangles(indices):
+    return sorted(tuple(indices[i:i + 3]) for i in range(0, len(indices), 3))
+
+
+def _shuffled(indices, seed=0):
+    triangles = [indices[i:i + 3] for i in range(0, len(indices), 3)]
+    random.Random(seed).shuffle(triangles)
+    return [vertex for triangle in triangles for vertex in triangle]
+
+
+def test_optimize_vertex_cache_keeps_the_triangles():
+    indices, num_vertices = _grid(20)
+    indices = _shuffled(indices)
+
+    optimized = mesh_processing.optimize_vertex_cache(indices, num_vertices)
+
+    # Every triangle is kept once, with its winding
+    assert _triangles(optimized) == _triangles(indices)
+
+
+def test_optimize_vertex_cache_lowers_acmr():
+    acmr = mesh_processing.average_cache_miss_ratio
+    indices, num_vertices = _grid(40)
+    shuffled = _shuffled(indices)
+
+    optimized = mesh_processing.optimize_vertex_cache(shuffled, num_vertices)
+
+    assert acmr(optimized) < acmr(shuffled)
+    assert acmr(optimized) <= acmr(indices)
+    assert acmr(mesh_processing.optimize_vertex_cache(indices, num_vertices)) <= acmr(indices)
+
+
+def test_optimize_vertex_cache_empty():
+    assert mesh_processing.optimize_vertex_cache([], 0) == []
+
+
+def test_reorder_vertices(backend):
+    index_lists = [[4, 2, 4, 0], [2, 5]]
+
+    order, remap = mesh_processing.reorder_vertices(index_lists, 7)
+
+    assert list(order) == [4, 2, 0, 5, 1, 3, 6]
+    assert [int(remap[vertex]) for vertex in order] == list(range(7))
@@ -0,0 +1,25 @@
+import mesh_processing
+
+
+def test_weld_vertices_merges_exact_duplicates(backend):
+    records = [(0.0, 0.0, 1.0), (1.0, 0.0, 1.0), (0.0, 0.0, 1.0)]
+
+    first, remap = mesh_processing.weld_vertices(records)
+
+    assert list(first) == [0, 1]
+    assert list(remap) == [0, 1, 0]
+
+
+def test_weld_vertices_with_epsilon(backend):
+    records = [(0.0, 0.0, 1.0), (0.0004, 0.0, 1.0), (0.0, 0.0, 0.9996), (0.5, 0.0, 1.0)]
+
+    assert len(mesh_processing.weld_vertices(records)[0]) == 4
+
+    first, remap = mesh_processing.weld_vertices(records, 0.01)
+    assert list(first) == [0, 3]
+    assert list(remap) == [0, 0, 0, 1]
+
+    # A zero step compares that column exactly
+    first, remap = mesh_processing.weld_vertices(records, [0.0, 0.01, 0.01])
+    assert list(first) == [0, 1, 3]
+    assert list(remap) == [0, 1, 0, 2]
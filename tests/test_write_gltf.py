@@ -0,0 +1,36 @@
+import io
+import json
+
+import pytest
+
+
+@pytest.fixture
+def make_scene(blendergltf):
+    # Scenes are built with the bpy stand-ins of the benchmarks
+    synthetic = pytest.importorskip('synthetic')
+    return lambda: synthetic.build_scene(num_objects=2, grid_size=3, uv_layers=2, materials=2)
+
+
+@pytest.mark.parametrize('indent', [None, 4])
+@pytest.mark.parametrize('settings', [
+    {},
+    {'buffers_combine_data': True},
+])
+def test_write_gltf_matches_export_gltf(blendergltf, make_scene, indent, settings):
+    expected = blendergltf.export_gltf(make_scene(), dict(settings))
+
+    fout = io.StringIO()
+    blendergltf.write_gltf(make_scene(), dict(settings), fout, indent=indent)
+
+    # Round trip through JSON, export_gltf may return tuples
+    assert json.loads(fout.getvalue()) == json.loads(json.dumps(expected))
+
+
+def test_write_gltf_indents(blendergltf, make_scene):
+    fout = io.StringIO()
+    blendergltf.write_gltf(make_scene(), {}, fout, indent=4)
+    lines = fout.getvalue().splitlines()
+
+    assert lines[0] == '{'
+    assert lines[-1] == '}'
+    assert all(line.startswith('    ') for line in lines[1:-1])